@@ -1,35 +1,94 @@
-from flask import Flask, render_template, request, jsonify
-from rapidfuzz import process
-import base64
-import whisper
-import ast
-import tempfile
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 import os
-from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives import serialization
 from dotenv import load_dotenv
 import uuid
-from clients import KalshiHttpClient, KalshiWebSocketClient, Environment
-import os
+from clients import KalshiHttpClient, KalshiTransport, Environment
+from catalog import KalshiCatalog
+from fanout import FanOut
+from ratelimit import RateLimiter
+from signing import RequestSigner
+from singleflight import SingleFlight
+from shared_state import SharedCache, SharedDB
+from orders import OrderRouter
+from portfolio import Portfolio, PortfolioFeed, RiskRejected, SharedHolds
+from market_state import MarketBook, MarketFeed
+from intent import parse_intent, rule_intent
+from transcription import TranscriptionService, QueueFull
+from resources import Resources
+from conversations import open_store
+from llm_cache import LLMCache
+from embeddings import load_embedder
+from event_index import EventIndex
+from search import STOPWORDS
+from tracing import profiler, tracer
 import json
+import time
 from datetime import datetime, timezone
-from openai import OpenAI
 from config import (
     OPENAI_API_KEY, 
+    OPENAI_BASE_URL,
+    KALSHI_API_URL,
+    KALSHI_WS_URL,
     DEFAULT_MODEL, 
     MAX_TOKENS, 
-    TEMPERATURE, 
-    SYSTEM_PROMPT,
-    CATEGORY_PROMPT,
-    EXTRACT_VOLUME_AND_SIDE_PROMPT,
-    TRIM_PROMPT,
     EVENTS_PROMPT,
     CATEGORIES,
+    CATALOG_SERIES_TTL,
+    CATALOG_EVENTS_TTL,
+    KALSHI_TIMEOUT,
+    FANOUT_MAX_WORKERS,
+    FANOUT_PER_HOST,
+    HTTP_POOL_MAXSIZE,
+    HTTP_MAX_RETRIES,
+    HTTP2,
+    SINGLE_FLIGHT,
+    SHARED_STATE,
+    KALSHI_READ_RATE,
+    KALSHI_WRITE_RATE,
+    KALSHI_READ_BURST,
+    KALSHI_WRITE_BURST,
+    ORDER_WORKERS,
+    ORDER_BATCH_SIZE,
+    ORDER_MAX_RETRIES,
+    TRANSCRIPTION_WORKERS,
+    TRANSCRIPTION_QUEUE,
+    TRANSCRIPTION_ADDRESS,
+    WS_QUEUE_SIZE,
+    WHISPER_MODEL,
+    WHISPER_DEVICE,
+    STARTUP_MODE,
+    ORDER_ACK_TIMEOUT,
+    PORTFOLIO_CHECKS,
+    PORTFOLIO_RECONCILE,
+    PORTFOLIO_FEED,
+    MAX_MARKET_EXPOSURE,
+    MAX_TOTAL_EXPOSURE,
+    MIN_BALANCE,
+    CONVERSATION_DB,
+    CONVERSATION_CACHE_SIZE,
+    CONVERSATION_CACHE_MESSAGES,
+    CONVERSATION_TTL,
+    CONVERSATION_PAGE_SIZE,
+    LLM_CACHE_SIZE,
+    LLM_CACHE_TTL,
+    LLM_CACHE_SEMANTIC,
+    LLM_CACHE_SIMILARITY,
+    PROMPT_VERSION,
+    INTENT_RULES,
+    EVENT_MATCHER,
+    EMBEDDING_MODEL,
+    EVENT_MATCH_MIN_SCORE,
+    EVENT_MATCH_MARGIN,
+    EVENT_MATCH_TOP_K,
+    TRACING,
+    TRACE_BUFFER,
+    PROFILER_INTERVAL,
+    PROFILER_START,
     FLASK_HOST,
     FLASK_PORT,
     FLASK_DEBUG
 )
-import requests
 
 app = Flask(__name__)
 
@@ -39,31 +98,215 @@ env = Environment.DEMO # toggle environment here
 KEYID = os.getenv('DEMO_KEYID') if env == Environment.DEMO else os.getenv('PROD_KEYID')
 KEYFILE = os.getenv('DEMO_KEYFILE') if env == Environment.DEMO else os.getenv('PROD_KEYFILE')
 
-# Initialize OpenAI client
 if not OPENAI_API_KEY:
     print("Warning: OPENAI_API_KEY not found. Please set it in your environment or .env file.")
-    client = None
-else:
-    client = OpenAI(api_key=OPENAI_API_KEY)
-
-# Store conversation history (in a real app, you'd use a database)
-url = "https://api.elections.kalshi.com/trade-api/v2/markets"
-response = requests.get(url)
-markets_data = response.json()
-conversations = {}
-
-model = whisper.load_model("turbo")
-
-try:
-    with open(KEYFILE, "rb") as key_file:
-        private_key = serialization.load_pem_private_key(
-            key_file.read(),
-            password=None
-        )
-except FileNotFoundError:
-    raise FileNotFoundError(f"Private key file not found at {KEYFILE}")
-except Exception as e:
-    raise Exception(f"Error loading private key: {str(e)}")
+
+# Heavy resources are built on first use, or by the warm-up thread started below,
+# so importing this module needs neither the network nor the private key.
+resources = Resources()
+
+@resources.register("openai_client")
+def openai_client():
+    # The openai package is slow to import, so it is only imported when first needed
+    from openai import OpenAI
+    return OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
+
+# Repeated requests skip OpenAI: intents are cached for LLM_CACHE_TTL, event choices until the catalog refreshes
+@resources.register("llm_cache")
+def llm_cache():
+    return LLMCache(LLM_CACHE_SIZE, LLM_CACHE_TTL, PROMPT_VERSION, LLM_CACHE_SEMANTIC, LLM_CACHE_SIMILARITY)
+
+@resources.register("private_key")
+def private_key():
+    try:
+        with open(KEYFILE, "rb") as key_file:
+            return serialization.load_pem_private_key(
+                key_file.read(),
+                password=None
+            )
+    except (FileNotFoundError, TypeError):
+        raise FileNotFoundError(f"Private key file not found at {KEYFILE}")
+    except Exception as e:
+        raise Exception(f"Error loading private key: {str(e)}")
+
+# One pooled, keep-alive transport and one header signer shared by every Kalshi client
+@resources.register("signer")
+def signer():
+    return RequestSigner(KEYID, private_key())
+
+@resources.register("transport")
+def transport():
+    return KalshiTransport(pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=HTTP_MAX_RETRIES, timeout=KALSHI_TIMEOUT, http2=HTTP2)
+
+# With several worker processes (gunicorn.conf.py), catalog responses and the rate-limit budget are shared through SHARED_STATE
+@resources.register("shared_db")
+def shared_db():
+    return SharedDB(SHARED_STATE) if SHARED_STATE else None
+
+@resources.register("shared_cache")
+def shared_cache():
+    return SharedCache(shared_db()) if SHARED_STATE else None
+
+# Concurrent identical GETs (e.g. many users asking about one event while the catalog is cold) go upstream once
+@resources.register("single_flight")
+def single_flight():
+    return SingleFlight() if SINGLE_FLIGHT else None
+
+def with_host(client):
+    # KALSHI_API_URL points every Kalshi client at one host, such as a local mock exchange
+    if KALSHI_API_URL:
+        client.host = KALSHI_API_URL.rstrip("/")
+    return client
+
+@resources.register("kalshi_client")
+def kalshi_client():
+    return with_host(KalshiHttpClient(
+        key_id=KEYID,
+        private_key=private_key(),
+        environment=env,
+        transport=transport(),
+        rate_limiter=RateLimiter(KALSHI_READ_RATE, KALSHI_WRITE_RATE, KALSHI_READ_BURST, KALSHI_WRITE_BURST,
+                                 shared=shared_db(), name='trading'),
+        signer=signer(),
+        single_flight=single_flight()
+    ))
+
+# Market data is read from production, orders go to the selected environment
+@resources.register("market_data_client")
+def market_data_client():
+    return with_host(KalshiHttpClient(
+        key_id=KEYID,
+        private_key=private_key(),
+        environment=Environment.PROD,
+        transport=transport(),
+        rate_limiter=RateLimiter(KALSHI_READ_RATE, KALSHI_WRITE_RATE, KALSHI_READ_BURST, KALSHI_WRITE_BURST,
+                                 shared=shared_db(), name='market_data'),
+        signer=signer(),
+        single_flight=single_flight()
+    ))
+
+# Orders are sent from a background queue; the reply is ready as soon as one is queued
+@resources.register("order_router")
+def order_router():
+    return OrderRouter(kalshi_client(), workers=ORDER_WORKERS, batch_size=ORDER_BATCH_SIZE, max_retries=ORDER_MAX_RETRIES)
+
+def fetch_portfolio(path, params=None):
+    client = kalshi_client()
+    return client.get(client.api_url + path, params=params or {})
+
+# Balance, positions and open orders of the trading account, seeded from REST when it is built and reconciled
+# every PORTFOLIO_RECONCILE seconds, so pre-trade checks do not cost a signed round trip per order.
+# Worker processes sharing SHARED_STATE hold the cost of the orders they place there, so the limits apply
+# to the account rather than to each worker.
+@resources.register("portfolio")
+def portfolio():
+    account = Portfolio(fetch_portfolio, max_market_exposure=MAX_MARKET_EXPOSURE, max_total_exposure=MAX_TOTAL_EXPOSURE,
+                        reconcile_interval=PORTFOLIO_RECONCILE, min_balance=MIN_BALANCE,
+                        holds=SharedHolds(shared_db()) if SHARED_STATE else None)
+    account.start()
+    return account
+
+# Fills and position changes between reconciles; without the feed the portfolio only learns of them from REST
+@resources.register("portfolio_feed", critical=False)
+def portfolio_feed():
+    if not PORTFOLIO_FEED:
+        return None
+    feed = PortfolioFeed(KEYID, private_key(), portfolio(), environment=env, queue_size=WS_QUEUE_SIZE, signer=signer())
+    if KALSHI_WS_URL:
+        feed.WS_BASE_URL = KALSHI_WS_URL.rstrip("/")
+    feed.start()
+    return feed
+
+# Conversation history: SQLite on disk with the latest messages of recent conversations in memory
+@resources.register("conversations")
+def conversations():
+    return open_store(CONVERSATION_DB, CONVERSATION_CACHE_SIZE, CONVERSATION_CACHE_MESSAGES, CONVERSATION_TTL,
+                      shared=bool(SHARED_STATE and CONVERSATION_DB))
+
+def add_message(conversation_id, role, content):
+    conversations().append(conversation_id, role, content)
+
+def conversation_page(conversation_id, args):
+    # ?limit=N&before=<id>: the N messages before that id, oldest first; ids start at 0 per conversation
+    limit = min(max(args.get('limit', CONVERSATION_PAGE_SIZE, type=int), 0), 1000)
+    before = args.get('before', type=int)
+    return [message.to_dict() for message in conversations().page(conversation_id, limit, before)]
+
+def fetch_market_data(path, params=None):
+    client = market_data_client()
+    return client.get(client.api_url + path, params=params or {})
+
+# Live market state from the WebSocket ticker feed, seeded by each catalog refresh
+@resources.register("market_book")
+def market_book():
+    return MarketBook()
+
+# Embeddings of open events, updated by each catalog refresh, for matching a trade without the LLM
+@resources.register("event_index")
+def event_index():
+    return EventIndex(load_embedder(EMBEDDING_MODEL, STOPWORDS), EVENT_MATCH_MIN_SCORE, EVENT_MATCH_MARGIN)
+
+# Series, events and markets are served from memory and refreshed in the background
+@resources.register("catalog")
+def catalog():
+    fetch = fetch_market_data
+    if shared_cache() is not None:
+        # Each worker refreshes on its own schedule; caching for half a TTL lets the others reuse one
+        # worker's responses while keeping the data any worker serves under 1.5 TTLs old
+        fetch = shared_cache().wrap(fetch, {'/series': CATALOG_SERIES_TTL / 2, '/events': CATALOG_EVENTS_TTL / 2})
+    kalshi_catalog = KalshiCatalog(
+        fetch,
+        CATEGORIES,
+        series_ttl=CATALOG_SERIES_TTL,
+        events_ttl=CATALOG_EVENTS_TTL,
+        fanout=FanOut(max_workers=FANOUT_MAX_WORKERS, per_host=FANOUT_PER_HOST, timeout=2 * KALSHI_TIMEOUT),
+        on_markets=market_book().seed,
+        on_events=event_index().update
+    )
+    kalshi_catalog.start()
+    return kalshi_catalog
+
+# Without the feed the book still has the catalog's REST prices, so this is not critical
+@resources.register("market_feed", critical=False)
+def market_feed():
+    feed = MarketFeed(KEYID, private_key(), market_book(), environment=Environment.PROD, queue_size=WS_QUEUE_SIZE, signer=signer())
+    if KALSHI_WS_URL:
+        feed.WS_BASE_URL = KALSHI_WS_URL.rstrip("/")
+    feed.start()
+    return feed
+
+# Whisper runs in a persistent model server process with a bounded queue.
+# Text chat works without it, so it does not hold back readiness.
+@resources.register("transcriber", critical=False)
+def transcriber():
+    service = TranscriptionService(
+        model_name=WHISPER_MODEL,
+        device=WHISPER_DEVICE,
+        workers=TRANSCRIPTION_WORKERS,
+        max_queue=TRANSCRIPTION_QUEUE,
+        address=TRANSCRIPTION_ADDRESS
+    )
+    service.warm()
+    return service
+
+# Counters of the loaded resources are exported next to the span histograms on /metrics;
+# a resource that has not been built yet is skipped rather than built by a scrape
+def loaded_stats(resource):
+    built = resource.peek()
+    return built.stats() if built is not None else None
+
+tracer.configure(enabled=TRACING, max_traces=TRACE_BUFFER)
+profiler.interval = PROFILER_INTERVAL
+for name, resource in [('llm_cache', llm_cache), ('catalog', catalog), ('event_index', event_index), ('market_book', market_book),
+                       ('transport', transport), ('single_flight', single_flight), ('shared_cache', shared_cache), ('signer', signer),
+                       ('orders', order_router), ('portfolio', portfolio), ('conversations', conversations)]:
+    tracer.gauges(name, lambda resource=resource: loaded_stats(resource))
+if PROFILER_START:
+    profiler.start()
+
+# Under the debug reloader only the serving child warms up, not the file watcher.
+if STARTUP_MODE != 'lazy' and not (__name__ == '__main__' and FLASK_DEBUG and os.environ.get('WERKZEUG_RUN_MAIN') != 'true'):
+    resources.warm(background=STARTUP_MODE != 'eager')
 
 @app.route('/')
 def index():
@@ -75,22 +318,13 @@ def chat():
     message = data.get('message', '')
     conversation_id = data.get('conversation_id', 'default')
     
-    # Initialize conversation if it doesn't exist
-    if conversation_id not in conversations:
-        conversations[conversation_id] = []
-    
     # Add user message to conversation
-    user_message = {
-        'role': 'user',
-        'content': message,
-        'timestamp': datetime.now().isoformat()
-    }
-    conversations[conversation_id].append(user_message)
+    add_message(conversation_id, 'user', message)
     
     # Call OpenAI API if available
-    if client:
+    if OPENAI_API_KEY:
         try:            
-            ai_response = get_response(message)
+            ai_response = get_response(message, conversation_id)
             
         except Exception as e:
             print(f"OpenAI API Error: {e}")
@@ -99,18 +333,42 @@ def chat():
         ai_response = f"I received your message: '{message}'. This is where your logic would go. (Note: OpenAI API key not configured)"
     
     # Add assistant response to conversation
-    assistant_message = {
-        'role': 'assistant',
-        'content': ai_response,
-        'timestamp': datetime.now().isoformat()
-    }
-    conversations[conversation_id].append(assistant_message)
+    add_message(conversation_id, 'assistant', ai_response)
     
     return jsonify({
         'response': ai_response,
         'conversation_id': conversation_id
     })
 
+def sse(stage, payload):
+    return f"event: {stage}\ndata: {json.dumps(payload)}\n\n"
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    # Server-Sent Events, one per stage of the trade pipeline with its timing
+    data = request.get_json()
+    message = data.get('message', '')
+    conversation_id = data.get('conversation_id', 'default')
+    add_message(conversation_id, 'user', message)
+
+    def generate():
+        try:
+            if not OPENAI_API_KEY:
+                raise RuntimeError('OpenAI API key not configured')
+            for stage, payload in response_stages(message, conversation_id):
+                if stage == 'reply':
+                    add_message(conversation_id, 'assistant', payload['text'])
+                yield sse(stage, payload)
+        except Exception as e:
+            print(f"OpenAI API Error: {e}")
+            text = f"Sorry, I couldn't process this trade. Error: {str(e)}"
+            add_message(conversation_id, 'assistant', text)
+            yield sse('error', {'text': text})
+        yield sse('done', {})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/audio', methods=['POST'])
 def audio():
     # Handle audio file upload
@@ -120,39 +378,22 @@ def audio():
     audio_file = request.files['audio']
     conversation_id = request.form.get('conversation_id', 'default')
     
-    # Add to conversation
-    if conversation_id not in conversations:
-        conversations[conversation_id] = []
-    
+    transcribed_text = ''
     try:
-        file_extension = os.path.splitext(audio_file.filename)[1] if audio_file.filename else '.wav'
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-            audio_file.save(temp_file.name)
-            temp_file_path = temp_file.name
-        
-        result = model.transcribe(temp_file_path)
-        transcribed_text = result["text"]
-        user_message = {
-            'role': 'user',
-            'content': transcribed_text,
-            'timestamp': datetime.now().isoformat()
-        }
-        conversations[conversation_id].append(user_message)
-        response = get_response(transcribed_text)
-
-        # Clean up the temporary file
-        os.unlink(temp_file_path)
+        with tracer.span('whisper.transcribe') as span:
+            data = audio_file.read()
+            span.set(bytes=len(data))
+            transcribed_text = transcriber().transcribe(data)
+        add_message(conversation_id, 'user', transcribed_text)
+        response = get_response(transcribed_text, conversation_id)
 
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         print(f"Audio transcription error: {e}")
         response = f"Sorry, I couldn't transcribe your audio message. Error: {str(e)}"
 
-    assistant_message = {
-        'role': 'assistant',
-        'content': response,
-        'timestamp': datetime.now().isoformat()
-    }
-    conversations[conversation_id].append(assistant_message)
+    add_message(conversation_id, 'assistant', response)
     
     return jsonify({
         'transcribed_text': transcribed_text,
@@ -160,161 +401,273 @@ def audio():
         'conversation_id': conversation_id
     })
 
-def shortlist_series(series, msg):
-    scored = []
-    for s in series:
-        title = s[1].lower()
-        tags  = " ".join(s[2]).lower() if s[2] else ""
-        # score = process.extractOne(msg, [title + " " + tags])[1]
-        score = sum(t in msg for t in title.lower().split()) + sum(t in msg for t in tags.lower().split())
-        scored.append((score, s))
-    scored.sort(reverse=True, key=lambda x: x[0])
-    scored = scored[:min(len(scored), 25)]
-    scored = [x[1] for x in scored]
-    return scored
-
-def sign_request(private_key, timestamp, method, path):
-    # Create the message to sign
-    message = f"{timestamp}{method}{path}".encode('utf-8')
-    
-    # Sign with RSA-PSS
-    signature = private_key.sign(
-        message,
-        padding.PSS(
-            mgf=padding.MGF1(hashes.SHA256()),
-            salt_length=padding.PSS.DIGEST_LENGTH
-        ),
-        hashes.SHA256()
-    )
-    
-    # Return base64 encoded
-    return base64.b64encode(signature).decode('utf-8')
-
-def get_response(message):
-    response = client.chat.completions.create(
-        model=DEFAULT_MODEL,
-        messages=[
-            {"role": "system", "content": EXTRACT_VOLUME_AND_SIDE_PROMPT},
-            {"role": "user", "content": message}
-        ],
-    ).choices[0].message.content
-    
-    # Parse the string representation of array back to actual array
-    parsed_response = ast.literal_eval(response)
-    
-    volume = parsed_response[0]
-    side = parsed_response[1]
-
-    message = client.chat.completions.create(
-        model=DEFAULT_MODEL,
-        messages=[
-            {"role": "system", "content": TRIM_PROMPT},
-            {"role": "user", "content": message}
-        ],
-    ).choices[0].message.content
-    print(message)
-
-    response = client.chat.completions.create(
-        model=DEFAULT_MODEL,
-        messages=[
-            {"role": "system", "content": CATEGORY_PROMPT + ", ".join(CATEGORIES)},
-            {"role": "user", "content": message}
-        ],
-        max_tokens=MAX_TOKENS,
-        temperature=TEMPERATURE
-    )
+@app.route('/api/audio/stream', methods=['POST'])
+def audio_stream():
+    # Streams partial transcripts as newline-delimited JSON, one line per chunk
+    if 'audio' not in request.files:
+        return jsonify({'error': 'No audio file provided'}), 400
+    data = request.files['audio'].read()
 
-    key_words = client.chat.completions.create(
-        model=DEFAULT_MODEL,
-        messages=[
-            {"role": "system", "content": "Extract the key words from the user's input and return them in lowercase as a comma separated list."},
-            {"role": "user", "content": message}
-        ],
-        max_tokens=MAX_TOKENS,
-        temperature=TEMPERATURE
-    )
+    def generate():
+        try:
+            for i, text in enumerate(transcriber().stream(data)):
+                yield json.dumps({'chunk': i, 'text': text}) + '\n'
+        except Exception as e:
+            # QueueFull, a decode failure or a lost model server; end the stream with a line saying so
+            if not isinstance(e, QueueFull):
+                print(f"Audio transcription error: {e}")
+            yield json.dumps({'error': str(e)}) + '\n'
 
-    key_words = set(key_words.choices[0].message.content.split(", "))
-    
-    # Extract the response content
-    categories = response.choices[0].message.content.split(", ")
-
-    series = []
-    for category in categories:
-        s = requests.get(f"https://api.elections.kalshi.com/trade-api/v2/series?category={category}")
-        data = s.json()
-        if data["series"]:
-            series += [[item["ticker"], item["title"], item["tags"]] for item in data["series"]]
-
-    shortlisted_series = shortlist_series(series, key_words)
-    events = []
-    for ticker, _, _ in shortlisted_series:
-        e = requests.get(f"https://api.elections.kalshi.com/trade-api/v2/events?series_ticker={ticker}&min_close_ts=1")
-        data = e.json()
-        for item in data["events"]:
-            events.append([item["title"], item["event_ticker"]])
-
-    response = client.chat.completions.create(
-        model=DEFAULT_MODEL,
-        messages=[
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/audio/status')
+def audio_status():
+    return jsonify(transcriber().stats())
+
+def shortlist_events(intent):
+    # Candidate events for the trade, from the in-memory catalog
+    shortlisted_series = catalog().search_series(" ".join(intent.keywords), intent.categories, k=25)
+    return [[item["title"], item["event_ticker"]] for item in catalog().events_for_series(s["ticker"] for s in shortlisted_series)]
+
+def event_choice_request(events, query):
+    return {
+        "model": DEFAULT_MODEL,
+        "messages": [
             {"role": "system", "content": EVENTS_PROMPT},
             {"role": "system", "content": json.dumps(events)},
-            {"role": "user", "content": message}
+            {"role": "user", "content": query}
         ],
-        max_tokens=MAX_TOKENS,
-        temperature=0
-    )
-    
-    best_ticker = response.choices[0].message.content
-
-    market_ticker = None
-    m = requests.get(f"https://api.elections.kalshi.com/trade-api/v2/markets?event_ticker={best_ticker}")
-    data = m.json()
-    for item in data["markets"]:
-        open_time = datetime.fromisoformat(item["open_time"].replace("Z", "+00:00"))
-        close_time = datetime.fromisoformat(item["close_time"].replace("Z", "+00:00"))
-        if open_time < datetime.now(timezone.utc) < close_time:
-            market_ticker = item["ticker"]
-            break
-
-    if market_ticker != None:
-        timestamp = str(int(datetime.now(timezone.utc).timestamp() * 1000))
-        method = "POST"
-        path = "/trade-api/v2/portfolio/orders"
-        signature = sign_request(private_key, timestamp, method, path)
-
-        headers = {
-            'KALSHI-ACCESS-KEY': KEYID,
-            'KALSHI-ACCESS-SIGNATURE': signature,
-            'KALSHI-ACCESS-TIMESTAMP': timestamp,
-            'Content-Type': 'application/json'
-        }
-
-        order_data = {
-            "ticker": market_ticker,
-            "action": "buy",
-            "side": side,
-            "count": volume,
-            "type": "limit",
-            "yes_price": 99,
-            "client_order_id": str(uuid.uuid4())
-        }
-        print(market_ticker)
-        response = requests.post("https://demo-api.kalshi.co/trade-api/v2/portfolio/orders", headers=headers, json=order_data)
-        if response.status_code == 201:
-            order = response.json()['order']
-            ai_response = f"Order placed successfully! Order ID: {order['order_id']} Client Order ID: {order_data['client_order_id']} Status: {order['status']}"
-
-        else:
-            ai_response = f"Error: {response.status_code} - {response.text}"
+        "max_tokens": MAX_TOKENS,
+        "temperature": 0
+    }
+
+def match_event(events, query):
+    # Returns (event ticker, None) when the local match is clear-cut, else (None, the top candidates for the LLM)
+    if EVENT_MATCHER != 'embedding' or not events:
+        return None, events
+    index = event_index()
+    matches = index.search(query, events, k=EVENT_MATCH_TOP_K)
+    best = index.choose(matches)
+    if best is not None:
+        return best, None
+    titles = {ticker: title for title, ticker in events}
+    return None, [[titles[m.event_ticker], m.event_ticker] for m in matches]
+
+def pick_market(markets):
+    # Open status comes from the live market book; REST times are the fallback
+    book = market_book()
+    for item in markets:
+        is_open = book.is_open(item["ticker"])
+        if is_open is None:
+            open_time = datetime.fromisoformat(item["open_time"].replace("Z", "+00:00"))
+            close_time = datetime.fromisoformat(item["close_time"].replace("Z", "+00:00"))
+            is_open = open_time < datetime.now(timezone.utc) < close_time
+        if is_open:
+            return item["ticker"]
+    return None
+
+def place_order(market_ticker, side, volume, conversation_id, action="buy"):
+    # Limit at the current best price, or the most marketable one (99 cents to buy, 1 to sell) when there is no quote
+    order_data = {
+        "ticker": market_ticker,
+        "action": action,
+        "side": side,
+        "count": volume,
+        "type": "limit",
+        f"{side}_price": market_book().quote(market_ticker, side, action) or (1 if action == "sell" else 99),
+        "client_order_id": str(uuid.uuid4())
+    }
+    if PORTFOLIO_CHECKS:
+        # Raises RiskRejected before anything is sent; the cost stays held until the exchange answers
+        account = portfolio()
+        with tracer.span('risk.check'):
+            account.reserve(order_data)
+    future = order_router().submit(order_data)
+    if PORTFOLIO_CHECKS:
+        future.add_done_callback(lambda f: account.record_ack(order_data, f))
+    future.add_done_callback(lambda f: report_order(conversation_id, order_data['client_order_id'], f))
+    return order_data, future
+
+def rejected_reply(error):
+    return f"Order not placed: it {error}."
+
+def submitted_reply(order_data):
+    # The exchange's answer follows as the 'ack' stage when streaming; report_order adds it to the history
+    return f"Order submitted! Client Order ID: {order_data['client_order_id']}. The exchange's answer will be added to this conversation."
+
+NO_MARKET_REPLY = "Currently no markets found for this trade."
+
+class StageTimer:
+    # Builds stream events carrying the stage's own duration and the time since the request started
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+
+    def __call__(self, stage, **payload):
+        now = time.perf_counter()
+        payload['stage_ms'] = round(1000 * (now - self.last), 1)
+        payload['elapsed_ms'] = round(1000 * (now - self.start), 1)
+        self.last = now
+        return stage, payload
+
+def ack_payload(future):
+    if not future.done():
+        return {'error': "Timed out waiting for the exchange; its answer will be added to this conversation's history"}
+    if future.exception() is None:
+        order = future.result()
+        return {'order_id': order['order_id'], 'status': order['status']}
+    return {'error': str(future.exception())}
+
+def response_stages(message, conversation_id='default'):
+    # Yields (stage, payload) as each step completes. 'reply' carries the chat answer;
+    # when an order was placed, 'ack' follows once the exchange answers.
+    stage = StageTimer()
+    # The trace spans the yields, so each step names it as parent rather than relying on the current span
+    trace = tracer.start('chat')
+    try:
+        # Volume, side and action are read by rules when they can be; otherwise one structured call returns
+        # them with the trimmed query, categories and keywords
+        with tracer.span('intent.rules', parent=trace):
+            intent = rule_intent(message) if INTENT_RULES else None
+        parsed_by = 'rules' if intent else 'llm'
+        if intent is None:
+            with tracer.span('openai.intent', parent=trace):
+                intent = parse_intent(llm_cache().view(openai_client()), message)
+        trace.set(query=intent.query, parsed_by=parsed_by)
+        yield stage('intent', parsed_by=parsed_by, **intent._asdict())
+
+        with tracer.span('events.shortlist', parent=trace):
+            events = shortlist_events(intent)
+        yield stage('events', count=len(events), events=events[:10])
+
+        with tracer.span('events.match', parent=trace):
+            best_ticker, candidates = match_event(events, intent.query)
+        if best_ticker is None:
+            with tracer.span('openai.event_choice', parent=trace):
+                chooser = llm_cache().view(openai_client(), catalog().events_expire_at)
+                response = chooser.chat.completions.create(**event_choice_request(candidates, intent.query))
+            best_ticker = response.choices[0].message.content
+        with tracer.span('market.pick', parent=trace):
+            market_ticker = pick_market(catalog().markets_for_event(best_ticker))
+        trace.set(event_ticker=best_ticker, market_ticker=market_ticker)
+        yield stage('market', event_ticker=best_ticker, market_ticker=market_ticker, matched_by='embedding' if candidates is None else 'llm')
+
+        if market_ticker == None:
+            yield stage('reply', text=NO_MARKET_REPLY)
+            return
+        try:
+            with tracer.span('order.submit', parent=trace):
+                order_data, future = place_order(market_ticker, intent.side, intent.volume, conversation_id, intent.action)
+        except RiskRejected as e:
+            yield stage('risk', reason=e.reason, detail=str(e))
+            yield stage('reply', text=rejected_reply(e))
+            return
+        yield stage('order', **order_data)
+        yield stage('reply', text=submitted_reply(order_data))
+        with tracer.span('order.ack', parent=trace):
+            try:
+                future.result(timeout=ORDER_ACK_TIMEOUT)
+            except Exception:
+                pass
+        yield stage('ack', **ack_payload(future))
+    except Exception as e:
+        tracer.end(trace, e)
+        raise
+    finally:
+        tracer.end(trace)
+
+def get_response(message, conversation_id='default'):
+    # Returns at the reply, without waiting for the exchange's answer
+    for stage, payload in response_stages(message, conversation_id):
+        if stage == 'reply':
+            return payload['text']
+
+def report_order(conversation_id, client_order_id, future):
+    # Runs on an order router thread once the exchange has answered
+    if future.exception() is None:
+        order = future.result()
+        content = f"Order placed successfully! Order ID: {order['order_id']} Client Order ID: {client_order_id} Status: {order['status']}"
     else:
-        ai_response = "Currently no markets found for this trade."
-    
-    return ai_response
+        content = f"Error placing order {client_order_id}: {future.exception()}"
+    add_message(conversation_id, 'assistant', content)
+
+@app.route('/api/ready')
+def ready():
+    # 200 once the chat path's resources are loaded, 503 while warming up or after a load failure
+    status = resources.status()
+    return jsonify(status), 200 if status['ready'] else 503
 
 @app.route('/api/conversations/<conversation_id>')
 def get_conversation(conversation_id):
-    return jsonify(conversations.get(conversation_id, []))
+    return jsonify(conversation_page(conversation_id, request.args))
+
+@app.route('/api/llm/stats')
+def llm_stats():
+    return jsonify(llm_cache().stats())
+
+@app.route('/api/events/index/stats')
+def event_index_stats():
+    return jsonify(event_index().stats())
+
+@app.route('/api/catalog/stats')
+def catalog_stats():
+    return jsonify(catalog().stats())
+
+@app.route('/api/markets/stats')
+def markets_stats():
+    feed = market_feed.peek()
+    return jsonify({**market_book().stats(), 'feed': feed.stats() if feed else None})
+
+@app.route('/api/markets/<ticker>')
+def market(ticker):
+    state = market_book().get(ticker)
+    if state is None:
+        return jsonify({'error': 'Unknown market'}), 404
+    return jsonify(state.to_dict())
+
+@app.route('/api/portfolio')
+def portfolio_snapshot():
+    feed = portfolio_feed.peek()
+    return jsonify({**portfolio().snapshot(), 'stats': portfolio().stats(), 'feed': feed.stats() if feed else None})
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus text format: span latency histograms, span errors and resource counters
+    return Response(tracer.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/traces')
+def traces():
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+    return jsonify({'traces': tracer.traces(limit, request.args.get('name')), 'latency': tracer.summary()})
+
+@app.route('/api/profiler', methods=['GET', 'POST'])
+def sampling_profiler():
+    # POST {"enabled": true, "interval": 0.005, "reset": true} starts sampling, {"enabled": false} stops it.
+    # GET ?format=folded returns the stacks for flamegraph.pl or speedscope.
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if data.get('reset'):
+            profiler.reset()
+        if data.get('enabled'):
+            profiler.start(data.get('interval'))
+        elif 'enabled' in data:
+            profiler.stop()
+        return jsonify(profiler.stats())
+    if request.args.get('format') == 'folded':
+        return Response(profiler.folded(request.args.get('limit', type=int)), mimetype='text/plain')
+    return jsonify({**profiler.stats(), 'top': profiler.top(request.args.get('limit', 20, type=int))})
+
+@app.route('/api/transport/stats')
+def transport_stats():
+    return jsonify({
+        **transport().stats(),
+        'rate_limits': {
+            'trading': kalshi_client().rate_limiter.stats(),
+            'market_data': market_data_client().rate_limiter.stats()
+        },
+        'single_flight': loaded_stats(single_flight),
+        'signing': signer().stats(),
+        'orders': order_router().stats()
+    })
 
 if __name__ == '__main__':
     app.run(debug=FLASK_DEBUG, host=FLASK_HOST, port=FLASK_PORT)
\ No newline at end of file
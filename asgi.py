@@ -0,0 +1,245 @@
+"""
+Async serving mode for Talk2Trade.
+
+/api/chat, /api/chat/stream, /api/audio and /api/conversations/<id> are served by a Quart app
+whose handlers never block the event loop: OpenAI is called through
+AsyncOpenAI, catalog lookups (memory, or a live fetch on a miss), event
+matching, risk checks and history writes run on a thread pool, and
+transcription and orders are awaited as futures. Every
+other route is passed to the Flask app in app.py, which shares the same
+resources and conversation history.
+
+Run from the repository root:
+    python -m asgi
+    hypercorn asgi:application --bind 0.0.0.0:5001
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from quart import Quart, jsonify, request
+from werkzeug.exceptions import HTTPException
+
+import app as wsgi
+from config import ASGI_THREADS, FLASK_HOST, FLASK_PORT, INTENT_RULES, OPENAI_API_KEY, OPENAI_BASE_URL, ORDER_ACK_TIMEOUT
+from intent import parse_intent_async, rule_intent
+from portfolio import RiskRejected
+from tracing import tracer
+from transcription import QueueFull
+
+quart_app = Quart(__name__)
+
+
+@wsgi.resources.register("async_openai_client")
+def async_openai_client():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
+
+
+async def load(resource):
+    # Building a resource may block (key file, Whisper server); using a built one does not
+    return resource() if resource.loaded else await asyncio.to_thread(resource)
+
+
+async def add_message(conversation_id, role, content):
+    # Appending writes the message to SQLite, so it runs off the event loop like the page reads do
+    await asyncio.to_thread(wsgi.add_message, conversation_id, role, content)
+
+
+@quart_app.before_serving
+async def start():
+    # Catalog misses and resource builds run here, so size it for many requests in flight
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(ASGI_THREADS, thread_name_prefix="asgi"))
+
+
+async def response_stages(message, conversation_id='default'):
+    # Async twin of app.response_stages
+    stage = wsgi.StageTimer()
+    trace = tracer.start('chat')
+    try:
+        client = await load(async_openai_client)
+        cache = await load(wsgi.llm_cache)
+        with tracer.span('intent.rules', parent=trace):
+            intent = rule_intent(message) if INTENT_RULES else None
+        parsed_by = 'rules' if intent else 'llm'
+        if intent is None:
+            with tracer.span('openai.intent', parent=trace):
+                intent = await parse_intent_async(cache.view(client), message)
+        trace.set(query=intent.query, parsed_by=parsed_by)
+        yield stage('intent', parsed_by=parsed_by, **intent._asdict())
+
+        with tracer.span('events.shortlist', parent=trace):
+            events = await asyncio.to_thread(wsgi.shortlist_events, intent)
+        yield stage('events', count=len(events), events=events[:10])
+
+        catalog = await load(wsgi.catalog)
+        with tracer.span('events.match', parent=trace):
+            # May build the event index's embedder and encodes the query
+            best_ticker, candidates = await asyncio.to_thread(wsgi.match_event, events, intent.query)
+        if best_ticker is None:
+            with tracer.span('openai.event_choice', parent=trace):
+                chooser = cache.view(client, catalog.events_expire_at)
+                response = await chooser.chat.completions.create(**wsgi.event_choice_request(candidates, intent.query))
+            best_ticker = response.choices[0].message.content
+        with tracer.span('market.pick', parent=trace):
+            markets = await asyncio.to_thread(catalog.markets_for_event, best_ticker)
+            market_ticker = wsgi.pick_market(markets)
+        trace.set(event_ticker=best_ticker, market_ticker=market_ticker)
+        yield stage('market', event_ticker=best_ticker, market_ticker=market_ticker, matched_by='embedding' if candidates is None else 'llm')
+
+        if market_ticker == None:
+            yield stage('reply', text=wsgi.NO_MARKET_REPLY)
+            return
+        try:
+            with tracer.span('order.submit', parent=trace):
+                # The risk check and the router's queue take locks, and shared holds are a SQLite transaction
+                order_data, future = await asyncio.to_thread(
+                    wsgi.place_order, market_ticker, intent.side, intent.volume, conversation_id, intent.action)
+        except RiskRejected as e:
+            yield stage('risk', reason=e.reason, detail=str(e))
+            yield stage('reply', text=wsgi.rejected_reply(e))
+            return
+        yield stage('order', **order_data)
+        yield stage('reply', text=wsgi.submitted_reply(order_data))
+        with tracer.span('order.ack', parent=trace):
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), ORDER_ACK_TIMEOUT)
+            except Exception:
+                pass
+        yield stage('ack', **wsgi.ack_payload(future))
+    except Exception as e:
+        tracer.end(trace, e)
+        raise
+    finally:
+        tracer.end(trace)
+
+
+async def get_response(message, conversation_id='default'):
+    stages = response_stages(message, conversation_id)
+    try:
+        async for stage, payload in stages:
+            if stage == 'reply':
+                return payload['text']
+    finally:
+        await stages.aclose()
+
+
+@quart_app.route('/api/chat', methods=['POST'])
+async def chat():
+    data = await request.get_json()
+    message = data.get('message', '')
+    conversation_id = data.get('conversation_id', 'default')
+    await add_message(conversation_id, 'user', message)
+
+    if OPENAI_API_KEY:
+        try:
+            ai_response = await get_response(message, conversation_id)
+        except Exception as e:
+            print(f"OpenAI API Error: {e}")
+            ai_response = f"I received your message: '{message}'. This is where your logic would go. (Note: OpenAI API call failed - {str(e)})"
+    else:
+        ai_response = f"I received your message: '{message}'. This is where your logic would go. (Note: OpenAI API key not configured)"
+
+    await add_message(conversation_id, 'assistant', ai_response)
+    return jsonify({
+        'response': ai_response,
+        'conversation_id': conversation_id
+    })
+
+
+@quart_app.route('/api/chat/stream', methods=['POST'])
+async def chat_stream():
+    data = await request.get_json()
+    message = data.get('message', '')
+    conversation_id = data.get('conversation_id', 'default')
+    await add_message(conversation_id, 'user', message)
+
+    async def generate():
+        try:
+            if not OPENAI_API_KEY:
+                raise RuntimeError('OpenAI API key not configured')
+            async for stage, payload in response_stages(message, conversation_id):
+                if stage == 'reply':
+                    await add_message(conversation_id, 'assistant', payload['text'])
+                yield wsgi.sse(stage, payload)
+        except Exception as e:
+            print(f"OpenAI API Error: {e}")
+            text = f"Sorry, I couldn't process this trade. Error: {str(e)}"
+            await add_message(conversation_id, 'assistant', text)
+            yield wsgi.sse('error', {'text': text})
+        yield wsgi.sse('done', {})
+
+    return generate(), 200, {'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+@quart_app.route('/api/audio', methods=['POST'])
+async def audio():
+    files = await request.files
+    if 'audio' not in files:
+        return jsonify({'error': 'No audio file provided'}), 400
+    form = await request.form
+    conversation_id = form.get('conversation_id', 'default')
+    data = files['audio'].read()
+
+    transcribed_text = ''
+    try:
+        transcriber = await load(wsgi.transcriber)
+        with tracer.span('whisper.transcribe') as span:
+            span.set(bytes=len(data))
+            transcribed_text = await asyncio.wrap_future(transcriber.submit(data))
+        await add_message(conversation_id, 'user', transcribed_text)
+        response = await get_response(transcribed_text, conversation_id)
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        print(f"Audio transcription error: {e}")
+        response = f"Sorry, I couldn't transcribe your audio message. Error: {str(e)}"
+
+    await add_message(conversation_id, 'assistant', response)
+    return jsonify({
+        'transcribed_text': transcribed_text,
+        'response': response,
+        'conversation_id': conversation_id
+    })
+
+
+@quart_app.route('/api/conversations/<conversation_id>')
+async def get_conversation(conversation_id):
+    # A cached page is served from memory; a miss reads SQLite
+    return jsonify(await asyncio.to_thread(wsgi.conversation_page, conversation_id, request.args))
+
+
+class Router:
+    """ASGI app sending the routes Quart defines to Quart and the rest to Flask."""
+    def __init__(self, async_app, flask_app):
+        self.async_app = async_app
+        self.wsgi_app = AsyncioWSGIMiddleware(flask_app)
+        self.urls = async_app.url_map.bind("")
+
+    def is_async(self, scope):
+        try:
+            endpoint, _ = self.urls.match(scope["path"], method=scope["method"])
+        except HTTPException:
+            return False
+        return endpoint != "static"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not self.is_async(scope):
+            return await self.wsgi_app(scope, receive, send)
+        return await self.async_app(scope, receive, send)
+
+
+application = Router(quart_app, wsgi.app)
+
+
+def main():
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    config = Config()
+    config.bind = [f"{FLASK_HOST}:{FLASK_PORT}"]
+    asyncio.run(serve(application, config))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Conversation store: memory per conversation, and append and page-read
+latency with a million stored messages.
+
+Memory compares the old dict-of-lists format (one dict with an ISO
+timestamp string per message) with MemoryStore's compact records. Latency
+runs against a TieredStore over a temporary SQLite file: cold reads go to
+SQLite, warm reads are answered from the in-memory tier.
+
+Run from the repository root:
+    python -m benchmarks.bench_conversations --conversations 10000 --messages 100
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from conversations import ROLES, MemoryStore, SQLiteStore, TieredStore
+
+SAMPLE = "Buy 10 yes contracts on whether the Fed cuts rates in December"
+
+
+def content(i):
+    return f"{SAMPLE} #{i}"
+
+
+def measure(build):
+    tracemalloc.start()
+    kept = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def old_format(conversations, messages):
+    store = {}
+    for c in range(conversations):
+        for i in range(messages):
+            store.setdefault(f"conv-{c}", []).append({
+                "role": ROLES[i % 2],
+                "content": content(i),
+                "timestamp": datetime.now().isoformat(),
+            })
+    return store
+
+
+def memory_store(conversations, messages):
+    store = MemoryStore(max_conversations=conversations, max_messages=messages)
+    for c in range(conversations):
+        for i in range(messages):
+            store.append(f"conv-{c}", ROLES[i % 2], content(i))
+    return store
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples) * 1e6, samples[int(0.99 * (len(samples) - 1))] * 1e6
+
+
+def timed(calls):
+    samples = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=100, help="messages per conversation")
+    parser.add_argument("--memory-conversations", type=int, default=1000, help="conversations in the memory comparison")
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--reads", type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    n = args.memory_conversations
+    old = measure(lambda: old_format(n, args.messages)) / n
+    new = measure(lambda: memory_store(n, args.messages)) / n
+    print(f"memory per conversation ({args.messages} messages): dicts {old / 1024:7.1f} KiB  "
+          f"MemoryStore {new / 1024:7.1f} KiB  ({old / new:.1f}x smaller)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "conversations.db")
+        durable = SQLiteStore(path)
+        total = args.conversations * args.messages
+        start = time.perf_counter()
+        conn = durable._connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO messages VALUES (?, ?, ?, ?, ?)",
+                ((f"conv-{c}", i, time.time(), i % 2, content(i))
+                 for c in range(args.conversations) for i in range(args.messages)),
+            )
+        elapsed = time.perf_counter() - start
+        print(f"bulk load: {total} messages in {elapsed:.1f}s, {os.path.getsize(path) / 2 ** 20:.0f} MiB on disk")
+
+        store = TieredStore(MemoryStore(max_conversations=args.conversations), durable)
+        ids = [f"conv-{c}" for c in range(args.conversations)]
+
+        p50, p99 = timed(lambda: store.append(rng.choice(ids), "user", SAMPLE) for _ in range(args.reads))
+        print(f"append:          p50 {p50:8.1f}us  p99 {p99:8.1f}us")
+
+        cold = rng.sample(ids, min(args.reads, len(ids)))
+        p50, p99 = timed(lambda: store.page(c, args.page) for c in cold)
+        print(f"cold page read:  p50 {p50:8.1f}us  p99 {p99:8.1f}us  (SQLite, then cached)")
+
+        p50, p99 = timed(lambda: store.page(c, args.page) for c in cold)
+        print(f"warm page read:  p50 {p50:8.1f}us  p99 {p99:8.1f}us  (memory tier)")
+
+        p50, p99 = timed(lambda: store.page(c, args.page, before=args.page) for c in cold)
+        print(f"older page read: p50 {p50:8.1f}us  p99 {p99:8.1f}us  (?before=, from the cached tail)")
+        print(store.memory.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Bulk trade download against the local mock exchange: records per second
+and peak RSS of collecting every page into a list versus streaming pages
+through the cursor iterator into a columnar file, with and without
+prefetching the next page.
+
+Each mode runs in its own process so its peak RSS is measured alone.
+Prefetching overlaps the next request with whatever the caller does with
+a page, so --work-ms adds simulated per-page processing (e.g. an upload or
+a database write) to show that; with none, the download is bound by the
+page round trip either way.
+
+Run from the repository root:
+    python -m benchmarks.bench_download --trades 300000 --latency-ms 30
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.mock_exchange import MockExchange
+from clients import KalshiHttpClient, KalshiTransport
+from columnar import TRADE_COLUMNS, ColumnarWriter, read_columnar
+from ratelimit import RateLimiter
+
+MODES = ("list", "stream", "stream+prefetch")
+
+
+def make_client(url):
+    client = KalshiHttpClient("bench", None, transport=KalshiTransport(max_retries=0),
+                              rate_limiter=RateLimiter(read_rate=1e6, write_rate=1e6))
+    client.host = url
+    return client
+
+
+def pages_with_work(pages, work):
+    for page in pages:
+        if work:
+            time.sleep(work)
+        yield from page
+
+
+def run_mode(mode, url, out, format, work):
+    """Downloads the tape in one mode and returns its measurements."""
+    client = make_client(url)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == "list":
+        # What callers had to do before: gather every page, then process
+        trades, cursor = [], None
+        while True:
+            page = client.get_trades(limit=1000, cursor=cursor)
+            trades.extend(page["trades"])
+            if work:
+                time.sleep(work)
+            cursor = page.get("cursor")
+            if not cursor:
+                break
+        rows = len(trades)
+        with ColumnarWriter(out, TRADE_COLUMNS, format=format) as writer:
+            writer.write_many(trades)
+    else:
+        with ColumnarWriter(out, TRADE_COLUMNS, format=format) as writer:
+            pages = client.iter_pages(client.markets_url + "/trades", "trades", {"limit": 1000}, prefetch=mode.endswith("prefetch"))
+            rows = writer.write_many(pages_with_work(pages, work))
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"mode": mode, "rows": rows, "seconds": elapsed, "peak_rss_mb": peak / 1024, "growth_mb": (peak - baseline) / 1024}
+
+
+def disk_size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trades", type=int, default=300000)
+    parser.add_argument("--latency-ms", type=float, default=30, help="mock exchange latency per page")
+    parser.add_argument("--work-ms", type=float, default=0, help="simulated processing per page")
+    parser.add_argument("--format", choices=["auto", "parquet", "numpy"], default="auto")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.url, args.out, args.format, args.work_ms / 1000)))
+        return
+
+    exchange = MockExchange(latency=args.latency_ms / 1000, trades=args.trades).start()
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in MODES:
+            out = os.path.join(tmp, mode.replace("+", "_"))
+            child = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_download", "--mode", mode, "--url", exchange.url,
+                 "--out", out, "--format", args.format, "--work-ms", str(args.work_ms)],
+                capture_output=True, text=True, check=True,
+            )
+            result = json.loads(child.stdout.strip().splitlines()[-1])
+            print(f"{mode:16} {result['rows'] / result['seconds']:9.0f} records/s  "
+                  f"peak RSS {result['peak_rss_mb']:6.1f}MB (+{result['growth_mb']:6.1f}MB while downloading)  "
+                  f"{disk_size(out) / result['rows']:5.1f} bytes/record on disk")
+        start = time.perf_counter()
+        table = read_columnar(os.path.join(tmp, "stream_prefetch"))
+        print(f"read back: {len(table['ticker'])} trades in {(time.perf_counter() - start) * 1000:.0f}ms, "
+              f"{len(set(table['ticker'].tolist()))} tickers, last at {table['created_time'][-1]}")
+    exchange.stop()
+
+
+if __name__ == "__main__":
+    main()
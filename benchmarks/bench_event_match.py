@@ -0,0 +1,195 @@
+"""
+Event selection: local embedding match vs the EVENTS_PROMPT LLM call.
+
+Builds a catalog of templated events with many near-identical neighbours
+(same question, different person, month, asset or threshold) and a labeled
+set of user-style requests with rewordings and typos. Reports top-1
+accuracy, how often the match is confident enough to skip the LLM, top-k
+recall (whether the LLM fallback is given the right event), p50/p99 match
+latency and the prompt size the LLM path would have sent.
+
+With --openai and OPENAI_API_KEY set, the same requests are also sent
+through the current LLM path for an accuracy and latency comparison.
+
+Run from the repository root:
+    python -m benchmarks.bench_event_match --events 1000 --queries 500
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from config import DEFAULT_MODEL, EVENT_MATCH_MARGIN, EVENT_MATCH_MIN_SCORE, EVENT_MATCH_TOP_K, EVENTS_PROMPT
+from embeddings import HashingEmbedder
+from event_index import EventIndex
+from search import STOPWORDS
+
+PEOPLE = ["Donald Trump", "Kamala Harris", "Gavin Newsom", "Ron DeSantis", "Josh Shapiro", "JD Vance",
+          "Gretchen Whitmer", "Pete Buttigieg", "Marco Rubio", "Alexandria Ocasio-Cortez"]
+RACES = ["presidential election", "Democratic primary", "Republican primary", "popular vote"]
+MONTHS = ["January", "March", "May", "June", "July", "September", "October", "December"]
+ASSETS = ["Bitcoin", "Ethereum", "the S&P 500", "Nasdaq", "gold", "oil", "Tesla stock", "Nvidia stock"]
+COMPANIES = ["Apple", "Nvidia", "Tesla", "Microsoft", "Amazon", "Meta", "Google", "Netflix"]
+TEAMS = ["Lakers", "Celtics", "Warriors", "Knicks", "Chiefs", "Eagles", "Yankees", "Dodgers", "Bills", "Nuggets"]
+LEAGUES = {"Lakers": "NBA", "Celtics": "NBA", "Warriors": "NBA", "Knicks": "NBA", "Nuggets": "NBA",
+           "Chiefs": "NFL", "Eagles": "NFL", "Bills": "NFL", "Yankees": "MLB", "Dodgers": "MLB"}
+CITIES = ["New York", "Chicago", "Miami", "Denver", "Austin", "Seattle", "Los Angeles", "Boston"]
+YEARS = [2025, 2026, 2027]
+
+
+def catalog(count, rng):
+    """Returns [(event_ticker, title, [request, ...])] with several requests per event."""
+    events = []
+    seen = set()
+    attempts = 0
+    while len(events) < count and attempts < 50 * count:
+        attempts += 1
+        kind = rng.randrange(6)
+        if kind == 0:
+            person, race, year = rng.choice(PEOPLE), rng.choice(RACES), rng.choice([2026, 2028])
+            title = f"Will {person} win the {year} {race}?"
+            last = person.split()[-1]
+            asks = [f"{last} wins the {year} {race}", f"{person} {race} {year}", f"{last.lower()} to win {race} in {year}"]
+        elif kind == 1:
+            action, month, year = rng.choice(["cut", "raise", "hold"]), rng.choice(MONTHS), rng.choice(YEARS)
+            title = f"Will the Fed {action} interest rates in {month} {year}?"
+            asks = [f"fed {action}s rates in {month} {year}", f"Fed {action} {month} {year}",
+                    f"rate {action} at the {month} {year} fomc meeting"]
+        elif kind == 2:
+            asset, month = rng.choice(ASSETS), rng.choice(MONTHS)
+            price = rng.choice([100, 120, 150, 200, 5000, 6000, 20000, 100000])
+            title = f"Will {asset} close above {price} at the end of {month}?"
+            asks = [f"{asset} above {price} end of {month}", f"{asset.lower()} over {price} in {month}",
+                    f"{asset} closes above {price} {month}"]
+        elif kind == 3:
+            company, quarter, year = rng.choice(COMPANIES), rng.randint(1, 4), rng.choice(YEARS)
+            title = f"Will {company} beat earnings estimates in Q{quarter} {year}?"
+            asks = [f"{company} beats earnings Q{quarter} {year}", f"{company.lower()} q{quarter} {year} earnings beat",
+                    f"{company} earnings beat in Q{quarter} {year}"]
+        elif kind == 4:
+            team, year = rng.choice(TEAMS), rng.choice(YEARS)
+            title = f"Will the {team} win the {year} {LEAGUES[team]} championship?"
+            asks = [f"{team} win the {year} {LEAGUES[team]} title", f"{team.lower()} championship {year}",
+                    f"{team} to win it all in {year}"]
+        else:
+            city, temp, month = rng.choice(CITIES), rng.choice([70, 80, 90, 100]), rng.choice(MONTHS)
+            title = f"Will the high temperature in {city} exceed {temp}F in {month}?"
+            asks = [f"{city} above {temp} degrees in {month}", f"{city.lower()} high over {temp}F {month}",
+                    f"temperature in {city} hits {temp} in {month}"]
+        if title in seen:
+            continue
+        seen.add(title)
+        events.append((f"KXBENCH-{len(events):05d}", title, asks))
+    return events
+
+
+def typo(text, rng):
+    words = text.split()
+    i = rng.randrange(len(words))
+    word = words[i]
+    if len(word) > 4:
+        j = rng.randrange(1, len(word) - 2)
+        words[i] = word[:j] + word[j + 1] + word[j] + word[j + 2:]
+    return " ".join(words)
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[int(q * (len(samples) - 1))]
+
+
+def llm_choice(client, candidates, query):
+    response = client.chat.completions.create(
+        model=DEFAULT_MODEL,
+        messages=[
+            {"role": "system", "content": EVENTS_PROMPT},
+            {"role": "system", "content": json.dumps(candidates)},
+            {"role": "user", "content": query},
+        ],
+        max_tokens=50,
+        temperature=0,
+    )
+    return response.choices[0].message.content.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--shortlist", type=int, default=50, help="candidate events per request, as shortlist_events returns")
+    parser.add_argument("--openai", action="store_true", help="also run the LLM path (needs OPENAI_API_KEY)")
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    events = catalog(args.events, rng)
+    titles = {ticker: title for ticker, title, _ in events}
+    index = EventIndex(HashingEmbedder(stopwords=STOPWORDS), EVENT_MATCH_MIN_SCORE, EVENT_MATCH_MARGIN)
+    start = time.perf_counter()
+    index.update({t: {"title": title} for t, title, _ in events}, {})
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    index.update({t: {"title": title} for t, title, _ in events}, {})
+    print(f"index: {len(index)} events embedded in {built * 1000:.0f}ms; "
+          f"unchanged refresh {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    # Requests: a user-style wording of one event, sometimes with a typo, ranked
+    # against a shortlist holding the target and its nearest neighbours.
+    by_prefix = {}
+    for ticker, title, _ in events:
+        by_prefix.setdefault(title.split()[2], []).append(ticker)
+    labeled = []
+    for _ in range(args.queries):
+        ticker, title, asks = rng.choice(events)
+        query = rng.choice(asks)
+        if rng.random() < 0.3:
+            query = typo(query, rng)
+        neighbours = [t for t in by_prefix[title.split()[2]] if t != ticker]
+        others = rng.sample(neighbours, min(len(neighbours), args.shortlist - 1))
+        shortlist = [[titles[t], t] for t in others + [ticker]]
+        rng.shuffle(shortlist)
+        labeled.append((query, ticker, shortlist))
+
+    correct = confident = confident_correct = recalled = fallback_recalled = 0
+    latencies = []
+    for query, ticker, shortlist in labeled:
+        start = time.perf_counter()
+        matches = index.search(query, shortlist, k=EVENT_MATCH_TOP_K)
+        best = index.choose(matches)
+        latencies.append(time.perf_counter() - start)
+        correct += matches[0].event_ticker == ticker
+        recalled += any(m.event_ticker == ticker for m in matches)
+        if best is not None:
+            confident += 1
+            confident_correct += best == ticker
+        else:
+            fallback_recalled += any(m.event_ticker == ticker for m in matches)
+
+    n = len(labeled)
+    full_chars = statistics.mean(len(json.dumps(s)) for _, _, s in labeled)
+    topk_chars = statistics.mean(len(json.dumps(s[:EVENT_MATCH_TOP_K])) for _, _, s in labeled)
+    print(f"embedding: top-1 accuracy {correct / n:6.1%}  confident {confident / n:6.1%} "
+          f"(accuracy when confident {confident_correct / max(confident, 1):6.1%})  top-{EVENT_MATCH_TOP_K} recall {recalled / n:6.1%}")
+    print(f"           latency p50 {percentile(latencies, 0.5) * 1e6:7.1f}us  p99 {percentile(latencies, 0.99) * 1e6:7.1f}us "
+          f"over {args.shortlist} candidates")
+    print(f"hybrid:    at most {(confident_correct + fallback_recalled) / n:6.1%} right, if the LLM always picks "
+          f"correctly from the top {EVENT_MATCH_TOP_K} when asked")
+    print(f"LLM prompt: ~{full_chars / 4:.0f} tokens of candidates per request today, "
+          f"~{topk_chars / 4:.0f} when only the top {EVENT_MATCH_TOP_K} are sent; "
+          f"{n - confident}/{n} requests still need the call")
+
+    if args.openai:
+        from openai import OpenAI
+        from config import OPENAI_API_KEY
+        client = OpenAI(api_key=OPENAI_API_KEY)
+        llm_correct, llm_latencies = 0, []
+        for query, ticker, shortlist in labeled:
+            start = time.perf_counter()
+            llm_correct += llm_choice(client, shortlist, query) == ticker
+            llm_latencies.append(time.perf_counter() - start)
+        print(f"LLM:       top-1 accuracy {llm_correct / n:6.1%}  latency p50 {percentile(llm_latencies, 0.5) * 1000:7.1f}ms  "
+              f"p99 {percentile(llm_latencies, 0.99) * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
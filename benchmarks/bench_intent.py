@@ -0,0 +1,105 @@
+"""
+Latency and token cost of intent extraction: the legacy four sequential
+completions (volume/side, trim, categories, keywords) versus the single
+structured-output call in intent.parse_intent.
+
+The OpenAI client is mocked: every completion sleeps a fixed round-trip time
+plus a per-token cost, so no network or API key is needed.
+
+Run from the repository root:
+    python -m benchmarks.bench_intent --rtt-ms 400
+"""
+import argparse
+import json
+import time
+from types import SimpleNamespace
+
+from config import CATEGORIES
+from intent import parse_intent
+
+# Prompts used by get_response before the intent stage was introduced.
+LEGACY_PROMPTS = [
+    "You are Talk2Trade, an AI-powered trading assistant for the Kalshi platform. Extract the amount of contracts the user wants to trade and the side of the trade ('yes' or 'no'). Return the volume and side as an array of size two. For example, if the user's input is 'Buy 10 yes contracts that Trump will run for a third term', return [10, 'yes']. If no number is found, default to 1. If no side is found default to 'yes'.",
+    "Remove the volume and side from the user's input. Return the result as plain text. For example, if the user's input is 'Buy 10 yes contracts that Trump will run for a third term ', return 'Trump will run for a third term'.",
+    "Here is a list of categories that are currently available on the platform. The user's input is a trade they want to make on Kalshi.\nUse this list to return only the most relevant category(ies) for the user's input. Categories: " + ", ".join(CATEGORIES),
+    "Extract the key words from the user's input and return them in lowercase as a comma separated list.",
+]
+
+MESSAGE = "Buy 10 yes contracts that Trump will run for a third term"
+
+
+def count_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class MockCompletions:
+    def __init__(self, rtt, per_token):
+        self.rtt = rtt
+        self.per_token = per_token
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def create(self, model, messages, **kwargs):
+        system = messages[0]["content"]
+        if "response_format" in kwargs:
+            content = json.dumps({
+                "volume": 10, "side": "yes", "action": "buy", "query": "Trump will run for a third term",
+                "categories": ["Politics", "Elections"], "keywords": ["trump", "third", "term"],
+            })
+        elif system == LEGACY_PROMPTS[0]:
+            content = "[10, 'yes']"
+        elif system == LEGACY_PROMPTS[1]:
+            content = "Trump will run for a third term"
+        elif system == LEGACY_PROMPTS[2]:
+            content = "Politics, Elections"
+        else:
+            content = "trump, third, term"
+        prompt = sum(count_tokens(m["content"]) for m in messages)
+        completion = count_tokens(content)
+        self.calls += 1
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        time.sleep(self.rtt + completion * self.per_token)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def mock_client(rtt, per_token):
+    return SimpleNamespace(chat=SimpleNamespace(completions=MockCompletions(rtt, per_token)))
+
+
+def legacy(client, message):
+    for prompt in LEGACY_PROMPTS:
+        client.chat.completions.create(model="gpt-4", messages=[
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": message},
+        ])
+
+
+def run(name, fn, client, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(client, MESSAGE)
+    elapsed = (time.perf_counter() - start) / iterations
+    c = client.chat.completions
+    print(f"{name:<12} {elapsed * 1000:8.1f}ms/request  {c.calls / iterations:.0f} calls  "
+          f"{c.prompt_tokens / iterations:.0f} prompt + {c.completion_tokens / iterations:.0f} completion tokens")
+    return elapsed, c.prompt_tokens + c.completion_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rtt-ms", type=float, default=400, help="simulated round trip per completion")
+    parser.add_argument("--ms-per-token", type=float, default=10, help="simulated generation cost per output token")
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+    rtt, per_token = args.rtt_ms / 1000, args.ms_per_token / 1000
+
+    old_latency, old_tokens = run("legacy", legacy, mock_client(rtt, per_token), args.iterations)
+    new_latency, new_tokens = run("structured", parse_intent, mock_client(rtt, per_token), args.iterations)
+    print(f"latency saved: {(old_latency - new_latency) * 1000:.0f}ms ({1 - new_latency / old_latency:.0%})  "
+          f"tokens saved: {(old_tokens - new_tokens) / args.iterations:.0f}/request")
+
+
+if __name__ == "__main__":
+    main()
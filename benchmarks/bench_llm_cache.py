@@ -0,0 +1,117 @@
+"""
+OpenAI response cache: latency of a repeated trade request end to end, and
+hit rate and model time saved per tier on a workload of reworded requests,
+and how many near-duplicates asking for a different size or market the
+semantic tier wrongly answers.
+
+OpenAI, the catalog and the order router are the stubs from
+benchmarks/stubs.py, with each completion taking --latency seconds.
+
+Run from the repository root:
+    python -m benchmarks.bench_llm_cache --latency 0.3
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("STARTUP_MODE", "lazy")
+os.environ.setdefault("CONVERSATION_DB", "")
+
+import app
+from benchmarks import stubs
+from intent import parse_intent
+from llm_cache import LLMCache
+
+TRADES = [
+    "buy {n} yes on Trump third term",
+    "buy {n} no on the Fed cutting rates in December",
+    "{n} yes contracts that bitcoin closes above 100k this year",
+    "put {n} on no for a government shutdown",
+    "buy {n} yes on the Lakers winning the NBA finals",
+    "bet {n} yes that Nvidia beats earnings",
+    "{n} no on a recession in 2026",
+    "buy {n} yes on snow in New York on Christmas",
+]
+REWORDINGS = [
+    lambda s: s,
+    lambda s: s.upper(),
+    lambda s: "  " + s.replace(" ", "  ") + ".",
+    lambda s: s + " please",
+    lambda s: s.replace("buy ", "buy me "),
+    lambda s: s.replace("yes", "yes ").replace(" on ", " on the ", 1),
+]
+
+# Near-identical to BASE but asking for a different size or market; a semantic hit on any of these is wrong
+BASE = "I want ten yes contracts on whether Trump runs for a third term"
+VARIANTS = [
+    BASE.replace("ten", "twenty"),
+    BASE.replace("ten", "eleven"),
+    BASE.replace("ten", "10 no"),
+    BASE.replace("third", "fourth"),
+    BASE + ", or fewer",
+    BASE.replace("I want", "I want at least"),
+    BASE.replace("I want", "I don't want"),
+]
+
+
+def workload(count, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(REWORDINGS)(rng.choice(TRADES).format(n=rng.choice([1, 5, 10]))) for _ in range(count)]
+
+
+def end_to_end(latency, repeats):
+    stubs.install(app, latency)
+    message = "buy 10 yes on Trump third term"
+    start = time.perf_counter()
+    app.get_response(message)
+    cold = time.perf_counter() - start
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        app.get_response(message)
+        samples.append(time.perf_counter() - start)
+    print(f"end to end, {latency * 1000:.0f}ms per completion: first {cold * 1000:8.1f}ms  "
+          f"repeat p50 {statistics.median(samples) * 1000:6.2f}ms  max {max(samples) * 1000:6.2f}ms")
+
+
+def tiers(latency, messages):
+    for semantic in (False, True):
+        cache = LLMCache(semantic=semantic)
+        client = cache.view(stubs.FakeOpenAI(latency))
+        start = time.perf_counter()
+        for message in messages:
+            parse_intent(client, message)
+        elapsed = time.perf_counter() - start
+        stats = cache.stats()
+        print(f"{'exact + semantic' if semantic else 'exact only':16}  hit rate {stats['hit_rate']:5.1%}  "
+              f"exact {stats['exact_hits']:4}  semantic {stats['semantic_hits']:4}  misses {stats['misses']:4}  "
+              f"saved {stats['saved_seconds']:6.1f}s of model time  wall {elapsed:6.1f}s")
+
+
+def wrong_hits(latency):
+    """Semantic hits among near-duplicates that differ in quantity, ordinal or comparison; should be 0."""
+    cache = LLMCache(semantic=True)
+    client = cache.view(stubs.FakeOpenAI(latency))
+    parse_intent(client, BASE)
+    for message in VARIANTS:
+        parse_intent(client, message)
+    print(f"guard: {cache.stats()['semantic_hits']} of {len(VARIANTS)} different-quantity rewordings answered from the cache")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per stubbed completion")
+    parser.add_argument("--requests", type=int, default=300, help="requests in the reworded workload")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    end_to_end(args.latency, args.repeats)
+    # Hits cost microseconds, so a shorter stub latency keeps the tier comparison quick.
+    tiers(min(args.latency, 0.02), workload(args.requests))
+    wrong_hits(min(args.latency, 0.02))
+
+
+if __name__ == "__main__":
+    main()
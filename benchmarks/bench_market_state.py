@@ -0,0 +1,68 @@
+"""
+Market book ingest rate and per-update cost on synthetic WebSocket traffic:
+decode + apply of raw ticker messages, apply alone, and O(1) lookups.
+
+Run from the repository root:
+    python -m benchmarks.bench_market_state --markets 5000 --messages 500000
+"""
+import argparse
+import json
+import random
+import time
+
+from market_state import MarketBook
+
+
+def make_messages(markets, count, seed=0):
+    rng = random.Random(seed)
+    tickers = [f"KXBENCH-{i:05d}" for i in range(markets)]
+    messages = []
+    for i in range(count):
+        ticker = rng.choice(tickers)
+        bid = rng.randint(1, 97)
+        if i % 4:
+            # Mostly deltas, as the ticker_v2 channel sends
+            msg = {"type": "ticker_v2", "sid": 1, "seq": i, "msg": {
+                "market_ticker": ticker, "price": bid + 1, "yes_bid": bid, "yes_ask": bid + 2,
+                "volume_delta": rng.randint(1, 50), "ts": 1700000000 + i}}
+        else:
+            msg = {"type": "ticker", "sid": 1, "seq": i, "msg": {
+                "market_ticker": ticker, "price": bid + 1, "yes_bid": bid, "yes_ask": bid + 2,
+                "volume": rng.randint(0, 10 ** 6), "open_interest": rng.randint(0, 10 ** 5), "ts": 1700000000 + i}}
+        messages.append(msg)
+    return tickers, messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--markets", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=500000)
+    args = parser.parse_args()
+
+    tickers, decoded = make_messages(args.markets, args.messages)
+    raw = [json.dumps(m) for m in decoded]
+
+    book = MarketBook()
+    start = time.perf_counter()
+    for message in raw:
+        book.apply(json.loads(message))
+    elapsed = time.perf_counter() - start
+    print(f"decode + apply: {len(raw) / elapsed:10.0f} msgs/s  {1e6 * elapsed / len(raw):6.2f}us/msg")
+
+    book = MarketBook()
+    start = time.perf_counter()
+    for message in decoded:
+        book.apply(message)
+    elapsed = time.perf_counter() - start
+    print(f"apply only:     {len(decoded) / elapsed:10.0f} msgs/s  {1e6 * elapsed / len(decoded):6.2f}us/msg")
+
+    lookups = tickers * max(1, 200000 // len(tickers))
+    start = time.perf_counter()
+    for ticker in lookups:
+        book.quote(ticker, "no")
+    elapsed = time.perf_counter() - start
+    print(f"quote lookup:   {len(lookups) / elapsed:10.0f} /s       {1e6 * elapsed / len(lookups):6.2f}us each  ({len(book)} markets)")
+
+
+if __name__ == "__main__":
+    main()
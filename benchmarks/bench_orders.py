@@ -0,0 +1,83 @@
+"""
+Order submission throughput against the local mock exchange: synchronous
+POSTs one at a time (the old get_response path) versus the OrderRouter with
+and without the batched endpoint.
+
+Run from the repository root:
+    python -m benchmarks.bench_orders --orders 500 --latency-ms 20 --error-rate 0.02
+"""
+import argparse
+import time
+import uuid
+from concurrent.futures import wait
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from benchmarks.mock_exchange import MockExchange
+from clients import KalshiHttpClient, KalshiTransport
+from orders import OrderRouter
+from ratelimit import RateLimiter
+
+
+def make_order(i):
+    return {"ticker": f"KXBENCH-{i % 10}", "action": "buy", "side": "yes", "count": 1,
+            "type": "limit", "yes_price": 50, "client_order_id": str(uuid.uuid4())}
+
+
+def make_client(exchange, key):
+    client = KalshiHttpClient(
+        "bench", key,
+        transport=KalshiTransport(max_retries=0),
+        rate_limiter=RateLimiter(read_rate=1e6, write_rate=1e6),
+    )
+    client.host = exchange.url
+    return client
+
+
+def bench_sync(client, n):
+    start = time.perf_counter()
+    failed = 0
+    for i in range(n):
+        try:
+            client.post(client.portfolio_url + "/orders", make_order(i))
+        except Exception:
+            failed += 1
+    return time.perf_counter() - start, failed
+
+
+def bench_router(client, n, **kwargs):
+    router = OrderRouter(client, backoff=0.01, **kwargs)
+    start = time.perf_counter()
+    futures = [router.submit(make_order(i)) for i in range(n)]
+    submitted = time.perf_counter() - start
+    wait(futures)
+    elapsed = time.perf_counter() - start
+    router.close()
+    failed = sum(1 for f in futures if f.exception() is not None)
+    return elapsed, failed, submitted, router.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    n = args.orders
+
+    exchange = MockExchange(latency=args.latency_ms / 1000, error_rate=args.error_rate).start()
+    elapsed, failed = bench_sync(make_client(exchange, key), n)
+    print(f"sync post:           {n / elapsed:8.1f} orders/s  failed {failed}")
+
+    for name, batching in (("router", False), ("router + batched", True)):
+        elapsed, failed, submitted, stats = bench_router(
+            make_client(exchange, key), n, workers=args.workers, use_batch_endpoint=batching)
+        print(f"{name + ':':<20} {n / elapsed:8.1f} orders/s  failed {failed}  retries {stats['retries']}  "
+              f"batches {stats['batches']}  submit() returned after {1e6 * submitted / n:.1f}us/order")
+    exchange.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Replay of recorded WebSocket frames through the market book: inline
+decoding on the read loop versus the off-loop pipeline, with the stdlib and
+orjson parsers, plus a deliberately slow subscriber to show the read loop
+is not stalled by it.
+
+Frames are read from a file of one raw frame per line, as written by
+MessagePipeline(record_path=...). Without --frames a synthetic recording is
+generated first.
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline --messages 300000
+    python -m benchmarks.bench_pipeline --frames /tmp/kalshi-frames.ndjson
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.bench_market_state import make_messages
+from market_state import MarketBook
+from pipeline import MessagePipeline
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def load_frames(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def inline(frames):
+    book = MarketBook()
+    start = time.perf_counter()
+    for frame in frames:
+        book.apply(json.loads(frame))
+    return time.perf_counter() - start, None
+
+
+def piped(frames, parse, slow_seconds=0.0):
+    book = MarketBook()
+    pipeline = MessagePipeline(maxsize=len(frames) + 1, parse=parse)
+    # The synthetic feed is mostly ticker_v2 deltas, which must not be coalesced.
+    pipeline.subscribe(book.apply, types=MarketBook.TYPES, policy="block", name="book")
+    if slow_seconds:
+        pipeline.subscribe(lambda m: time.sleep(slow_seconds), policy="drop_oldest", maxsize=1000, name="slow")
+    pipeline.start()
+    start = time.perf_counter()
+    for frame in frames:
+        pipeline.submit(frame)
+    submitted = time.perf_counter() - start
+    pipeline.drain()
+    elapsed = time.perf_counter() - start
+    stats = pipeline.stats()
+    pipeline.stop()
+    return elapsed, (submitted, stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", help="recorded frame file; generated if omitted")
+    parser.add_argument("--markets", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=300000)
+    args = parser.parse_args()
+
+    path = args.frames
+    if path is None:
+        _, messages = make_messages(args.markets, args.messages)
+        fd, path = tempfile.mkstemp(suffix=".ndjson")
+        with os.fdopen(fd, "w") as f:
+            f.writelines(json.dumps(m) + "\n" for m in messages)
+    frames = load_frames(path)
+    print(f"{len(frames)} frames from {path}")
+
+    elapsed, _ = inline(frames)
+    print(f"inline json on read loop: {len(frames) / elapsed:10.0f} msgs/s")
+
+    parsers = [("json", json.loads)] + ([("orjson", orjson.loads)] if orjson else [])
+    for name, parse in parsers:
+        elapsed, (submitted, stats) = piped(frames, parse)
+        print(f"pipeline {name:<6} sustained: {len(frames) / elapsed:10.0f} msgs/s  "
+              f"read loop {1e6 * submitted / len(frames):.2f}us/frame")
+
+    parse = orjson.loads if orjson else json.loads
+    elapsed, (submitted, stats) = piped(frames, parse, slow_seconds=0.001)
+    slow = stats["subscribers"]["slow"]
+    print(f"with a 1ms subscriber:    {len(frames) / elapsed:10.0f} msgs/s  "
+          f"read loop {1e6 * submitted / len(frames):.2f}us/frame  slow dropped {slow['dropped']}")
+
+    if args.frames is None:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Cost of a pre-trade risk check made against the in-memory portfolio versus
+asking Kalshi for the balance and positions before every order, against
+the local mock exchange.
+
+Orders are sent through the OrderRouter to the mock, where marketable ones
+fill at once. With --feed the portfolio follows the fill and
+market_positions channels; without it, memory only learns of fills at the
+next reconcile. Either way the run ends with a reconcile, and the drift it
+reports (balance in cents, positions that differ) shows how far memory had
+moved from the exchange.
+
+Run from the repository root:
+    python -m benchmarks.bench_portfolio --orders 200 --latency-ms 30
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from benchmarks.mock_exchange import MockExchange
+from clients import KalshiHttpClient, KalshiTransport
+from orders import OrderRouter
+from portfolio import Portfolio, PortfolioFeed, RiskRejected
+from ratelimit import RateLimiter
+
+
+def make_order(exchange, i):
+    market = exchange.markets[i % 20]
+    # Alternate marketable buys, which fill, with bids below the quote, which rest
+    price = market["yes_ask"] if i % 2 else max(1, market["yes_bid"] - 5)
+    return {"ticker": market["ticker"], "action": "buy", "side": "yes", "count": 1 + i % 5, "type": "limit",
+            "yes_price": price, "client_order_id": str(uuid.uuid4())}
+
+
+def rest_check(client, order):
+    """The round trips a check costs without the portfolio: balance and the market's position."""
+    balance = client.get_balance()["balance"]
+    positions = client.get(client.portfolio_url + "/positions", {"ticker": order["ticker"]})["market_positions"]
+    return balance >= order["count"] * order["yes_price"] and positions is not None
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return 1e6 * statistics.median(samples), 1e6 * samples[int(len(samples) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=30, help="mock exchange latency per request")
+    parser.add_argument("--checks", type=int, default=100000, help="local checks timed on their own")
+    args = parser.parse_args()
+
+    exchange = MockExchange(latency=args.latency_ms / 1000, ws_port=0, tick_rate=5).start()
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    client = KalshiHttpClient("bench", key, transport=KalshiTransport(max_retries=0),
+                              rate_limiter=RateLimiter(read_rate=1e6, write_rate=1e6, read_burst=1e6, write_burst=1e6))
+    client.host = exchange.url
+
+    rest = []
+    for i in range(min(args.orders, 50)):
+        order = make_order(exchange, i)
+        start = time.perf_counter()
+        rest_check(client, order)
+        rest.append(time.perf_counter() - start)
+    p50, p99 = percentiles(rest)
+    print(f"REST check:   p50 {p50:10.1f}us  p99 {p99:10.1f}us  (2 signed GETs)")
+
+    for use_feed in (True, False):
+        portfolio = Portfolio(lambda path, params: client.get(client.api_url + path, params), reconcile_interval=3600)
+        portfolio.reconcile()
+        feed = None
+        if use_feed:
+            feed = PortfolioFeed("bench", key, portfolio)
+            feed.WS_BASE_URL = exchange.ws_url
+            feed.start()
+            while feed.stats()["subscriptions"] and len(feed.subscriptions[0].sids) < len(feed.CHANNELS):
+                time.sleep(0.01)
+        router = OrderRouter(client)
+        local, futures = [], []
+        for i in range(args.orders):
+            order = make_order(exchange, i)
+            start = time.perf_counter()
+            try:
+                portfolio.reserve(order)
+            except RiskRejected:
+                continue
+            finally:
+                local.append(time.perf_counter() - start)
+            future = router.submit(order)
+            future.add_done_callback(lambda f, order=order: portfolio.record_ack(order, f))
+            futures.append(future)
+        for future in futures:
+            future.exception()
+        router.close()
+        time.sleep(0.2)  # let the last fills arrive
+        p50, p99 = percentiles(local)
+        drift = portfolio.reconcile()
+        print(f"local check:  p50 {p50:10.1f}us  p99 {p99:10.1f}us  feed {'on ' if use_feed else 'off'}  "
+              f"fills applied {portfolio.fills:4}  drift at reconcile: balance {drift['balance']:6}¢ positions {drift['positions']:3}")
+        if feed is not None:
+            feed.stop()
+
+    portfolio = Portfolio(lambda path, params: {"balance": 10 ** 12} if path == "/portfolio/balance" else {},
+                          max_market_exposure=10 ** 9, max_total_exposure=10 ** 10)
+    portfolio.reconcile()
+    orders = [make_order(exchange, i) for i in range(args.checks)]
+    start = time.perf_counter()
+    for order in orders:
+        portfolio.reserve(order)
+    elapsed = time.perf_counter() - start
+    print(f"local checks alone: {args.checks / elapsed:10.0f} checks/s  {1e6 * elapsed / args.checks:6.2f}us/check")
+    exchange.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Scaling of /api/chat from 1 to N gunicorn workers (gunicorn.conf.py)
+against the mock exchange, with and without SHARED_STATE.
+
+For each worker count the app is started with the real OpenAI and Kalshi
+clients pointed at benchmarks/mock_exchange.py, loaded with --per-worker
+concurrent users per worker, and reported as throughput, p50/p99 latency
+and scaling efficiency (throughput over N times the 1-worker throughput).
+The upstream columns show what sharing buys: catalog GETs at startup stay
+at one worker's worth instead of growing with N, and order POSTs stay
+within one --write-rate budget. Afterwards a conversation written through several
+workers is read back to check every worker sees all of it.
+
+Run from the repository root:
+    python -m benchmarks.bench_scaling --workers 1,2,4 --seconds 5 --write-rate 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.loadtest import drive, mock_stats, mock_upstream
+
+
+def wait_until_ready(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url + "/api/ready", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not become ready")
+
+
+def wait_until_warm(url, workers, timeout=60):
+    """Waits until the catalog has loaded its events in (very likely) every worker, so load starts warm."""
+    deadline = time.monotonic() + timeout
+    warm = 0
+    while warm < 4 * workers:
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"catalog at {url} did not warm up")
+        with httpx.Client() as client:
+            warm = warm + 1 if client.get(url + "/api/catalog/stats", timeout=5).json().get("events_count") else 0
+        if not warm:
+            time.sleep(0.2)
+
+
+def check_conversation(url, messages=8):
+    """Writes one conversation through fresh connections (so several workers) and returns the user message counts read back."""
+    conversation_id = f"scaling-{time.time_ns()}"
+    for i in range(messages):
+        with httpx.Client() as client:
+            client.post(url + "/api/chat", json={"message": f"buy {i + 1} yes on the fed", "conversation_id": conversation_id},
+                        timeout=30)
+    seen = set()
+    for _ in range(messages):
+        with httpx.Client() as client:
+            messages = client.get(url + f"/api/conversations/{conversation_id}", timeout=10).json()
+            seen.add(sum(1 for m in messages if m["role"] == "user"))
+    return seen
+
+
+def upstream(before, after, prefix):
+    return sum(count - before["routes"].get(route, 0) for route, count in after["routes"].items() if route.startswith(prefix))
+
+
+def catalog_gets(before, after):
+    return upstream(before, after, "GET /series") + upstream(before, after, "GET /events") + upstream(before, after, "GET /markets")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--per-worker", type=int, default=16, help="concurrent users per worker")
+    parser.add_argument("--threads", type=int, default=16, help="gunicorn threads per worker")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--latency-ms", type=float, default=200, help="per OpenAI call")
+    parser.add_argument("--kalshi-latency-ms", type=float, default=30)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--write-rate", type=float, help="Kalshi order budget per second, for all workers together")
+    parser.add_argument("--port", type=int, default=8781, help="the mock exchange uses the next two ports")
+    parser.add_argument("--modes", default="shared,local", help="shared: SHARED_STATE set; local: every worker on its own")
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        exchange, exchange_url, env = mock_upstream(args, tmp)
+        if args.write_rate:
+            env.update(KALSHI_WRITE_RATE=str(args.write_rate), KALSHI_WRITE_BURST=str(args.write_rate))
+        try:
+            for mode in args.modes.split(","):
+                baseline = None
+                for workers in map(int, args.workers.split(",")):
+                    state = os.path.join(tmp, f"{mode}-{workers}")
+                    os.makedirs(state)
+                    worker_env = dict(env, CONVERSATION_DB=os.path.join(state, "conversations.db"),
+                                      SHARED_STATE=os.path.join(state, "shared.db") if mode == "shared" else "",
+                                      WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(args.threads),
+                                      GUNICORN_BIND=f"127.0.0.1:{args.port}", TRANSCRIPTION_ADDRESS=os.path.join(state, "whisper.sock"))
+                    before = mock_stats(exchange_url)
+                    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+                                              env=worker_env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                    try:
+                        wait_until_ready(url)
+                        wait_until_warm(url, workers)
+                        warmed = mock_stats(exchange_url)
+                        latencies, errors, elapsed = asyncio.run(drive(url, workers * args.per_worker, args.seconds))
+                        after = mock_stats(exchange_url)
+                        consistent = check_conversation(url) if mode == "shared" else None
+                    finally:
+                        server.terminate()
+                        server.wait()
+                    latencies.sort()
+                    throughput = len(latencies) / elapsed
+                    baseline = baseline or throughput
+                    p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+                    print(f"{mode:6} workers={workers:<2} {throughput:8.1f} req/s  efficiency {throughput / (workers * baseline):4.0%}  "
+                          f"p50 {1000 * statistics.median(latencies or [0]):6.0f}ms  p99 {1000 * p99:6.0f}ms  errors {errors}  "
+                          f"catalog GETs at startup {catalog_gets(before, warmed):4} under load {catalog_gets(warmed, after):4}  "
+                          f"orders {upstream(warmed, after, 'POST /portfolio/orders') / elapsed:6.1f}/s"
+                          + (f"  user messages seen {sorted(consistent)} of 8" if consistent else ""))
+        finally:
+            exchange.terminate()
+            exchange.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+RSA-PSS request signing throughput: inline signing and the public-endpoint
+fast path that skips signing.
+
+Run from the repository root:
+    python -m benchmarks.bench_signing --seconds 3
+"""
+import argparse
+import time
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from signing import RequestSigner
+
+PRIVATE_PATH = "/trade-api/v2/portfolio/orders"
+PUBLIC_PATH = "/trade-api/v2/markets?event_ticker=KXTEST"
+
+
+def inline(signer, path, seconds):
+    count, deadline = 0, time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        signer.headers("GET", path)
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--key-size", type=int, default=2048)
+    args = parser.parse_args()
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=args.key_size)
+
+    signer = RequestSigner("bench", key)
+    n = inline(signer, PRIVATE_PATH, args.seconds)
+    stats = signer.stats()
+    print(f"inline signing:      {n / args.seconds:9.0f} signs/s  mean {stats['mean_sign_ms']:.3f}ms")
+    n = inline(signer, PUBLIC_PATH, args.seconds)
+    print(f"public (unsigned):   {n / args.seconds:9.0f} headers/s")
+
+
+if __name__ == "__main__":
+    main()
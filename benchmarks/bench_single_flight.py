@@ -0,0 +1,106 @@
+"""
+Upstream load of concurrent identical Kalshi GETs against the local mock
+exchange, with and without single-flight: many users asking about the same
+few hot events while their markets are not cached.
+
+Each user repeatedly fetches the markets of one of --hot events, from a
+thread (the Flask path) or an asyncio task (asgi.py's path, which calls
+the blocking client from the default executor). The upstream rate should
+stay flat as users are added when requests are coalesced, and grow with
+them when they are not.
+
+Run from the repository root:
+    python -m benchmarks.bench_single_flight --users 1,8,32,128 --latency-ms 50
+"""
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from benchmarks.mock_exchange import MockExchange
+from clients import KalshiHttpClient, KalshiTransport
+from ratelimit import RateLimiter
+from singleflight import SingleFlight
+
+
+def make_client(exchange, key, single_flight):
+    client = KalshiHttpClient(
+        "bench", key,
+        transport=KalshiTransport(pool_maxsize=256, max_retries=0),
+        rate_limiter=RateLimiter(read_rate=1e6, write_rate=1e6, read_burst=1e6),
+        single_flight=single_flight,
+    )
+    client.host = exchange.url
+    return client
+
+
+def hot_events(exchange, hot):
+    return [e["event_ticker"] for e in exchange.events[:hot]]
+
+
+def run_threads(client, events, users, seconds):
+    deadline = time.perf_counter() + seconds
+    done = [0] * users
+
+    def user(i):
+        while time.perf_counter() < deadline:
+            client.get(client.markets_url, {"event_ticker": events[(i + done[i]) % len(events)]})
+            done[i] += 1
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(done)
+
+
+def run_tasks(client, events, users, seconds):
+    async def main():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(users))
+        deadline = time.perf_counter() + seconds
+        done = [0] * users
+
+        async def user(i):
+            while time.perf_counter() < deadline:
+                await asyncio.to_thread(client.get, client.markets_url, {"event_ticker": events[(i + done[i]) % len(events)]})
+                done[i] += 1
+
+        await asyncio.gather(*(user(i) for i in range(users)))
+        return sum(done)
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default="1,8,32,128")
+    parser.add_argument("--hot", type=int, default=3, help="distinct events the users ask about")
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--latency-ms", type=float, default=50, help="mock exchange latency per request")
+    args = parser.parse_args()
+
+    exchange = MockExchange(latency=args.latency_ms / 1000).start()
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    events = hot_events(exchange, args.hot)
+    for runner in (run_threads, run_tasks):
+        for coalesce in (False, True):
+            for users in map(int, args.users.split(",")):
+                flight = SingleFlight() if coalesce else None
+                client = make_client(exchange, key, flight)
+                before = exchange.requests
+                start = time.perf_counter()
+                served = runner(client, events, users, args.seconds)
+                elapsed = time.perf_counter() - start
+                upstream = exchange.requests - before
+                label = f"{'threads' if runner is run_threads else 'asyncio'} {'single-flight' if coalesce else 'direct':13}"
+                print(f"{label} users={users:<4} {served / elapsed:8.1f} lookups/s  {upstream / elapsed:7.1f} upstream req/s"
+                      + (f"  {flight.stats()['dedup_rate']:.0%} deduplicated" if flight else ""))
+    exchange.stop()
+
+
+if __name__ == "__main__":
+    main()
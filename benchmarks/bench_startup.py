@@ -0,0 +1,92 @@
+"""
+Cold start of app.py: import time, first-request latency and the time each
+lazily loaded resource takes to build.
+
+Each run imports the app in a fresh interpreter with a throwaway private
+key, so nothing is cached between runs. Resources that need the network
+or Whisper report their error instead of a load time when offline.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+CHILD = r"""
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+client = app.app.test_client()
+start = time.perf_counter()
+client.get('/api/conversations/bench')
+first_request = time.perf_counter() - start
+start = time.perf_counter()
+ready = client.get('/api/ready').status_code
+ready_request = time.perf_counter() - start
+result = {'import': imported, 'first_request': first_request, 'ready_request': ready_request, 'ready_status': ready}
+if LOAD:
+    # The transcriber starts a persistent Whisper server, which would outlive the bench.
+    for name in app.resources.status()['resources']:
+        if name != 'transcriber':
+            try:
+                getattr(app, name)()
+            except Exception:
+                pass
+    result['resources'] = {k: v for k, v in app.resources.status()['resources'].items() if k != 'transcriber'}
+print(json.dumps(result))
+"""
+
+
+def run(mode, keyfile, load):
+    env = dict(os.environ, STARTUP_MODE=mode, DEMO_KEYFILE=keyfile, DEMO_KEYID="bench")
+    env.setdefault("OPENAI_API_KEY", "sk-bench")
+    code = f"LOAD = {load}\n" + CHILD
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, timeout=120)
+    if out.returncode:
+        raise RuntimeError(out.stderr)
+    # Background threads may log after the result line.
+    return json.loads(next(line for line in out.stdout.splitlines() if line.startswith("{")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--load", action="store_true", help="also build every resource and report its load time")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        keyfile = os.path.join(tmp, "bench.pem")
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        with open(keyfile, "wb") as f:
+            f.write(key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            ))
+
+        # Background mode is left out: its warm-up would start the Whisper server.
+        for mode in ("lazy",):
+            results = [run(mode, keyfile, False) for _ in range(args.runs)]
+            for field in ("import", "first_request", "ready_request"):
+                values = [1000 * r[field] for r in results]
+                print(f"{mode:>10} {field:<14} median {statistics.median(values):8.1f}ms  max {max(values):8.1f}ms")
+
+        if args.load:
+            for name, status in run("lazy", keyfile, True)["resources"].items():
+                if status["loaded"]:
+                    print(f"{name:>20}: {1000 * status['load_seconds']:8.1f}ms")
+                else:
+                    print(f"{name:>20}: failed ({status['error']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Tracing overhead: cost of a span with tracing on and off, of a nested
+request-shaped trace, of rendering /metrics, and of taking profiler samples
+while a CPU-bound loop runs.
+
+Run from the repository root:
+    python -m benchmarks.bench_tracing --spans 200000
+"""
+import argparse
+import time
+
+from tracing import SamplingProfiler, Tracer
+
+
+def per_span(tracer, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        with tracer.span("kalshi.http", method="GET", endpoint="/trade-api/v2/markets/{id}"):
+            pass
+    return (time.perf_counter() - start) / count
+
+
+def request_trace(tracer, count):
+    # The shape of one chat request: a root spanning the stages and a nested HTTP call
+    start = time.perf_counter()
+    for _ in range(count):
+        trace = tracer.start("chat")
+        for name in ("intent.rules", "events.shortlist", "events.match", "market.pick", "order.submit"):
+            with tracer.span(name, parent=trace):
+                pass
+        with tracer.span("market.pick", parent=trace):
+            with tracer.span("kalshi.http", method="GET", endpoint="/trade-api/v2/events/{id}") as span:
+                span.set(status=200)
+        tracer.end(trace)
+    return (time.perf_counter() - start) / count
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spans", type=int, default=200000)
+    parser.add_argument("--busy", type=float, default=1.0, help="seconds of CPU-bound work per profiler run")
+    args = parser.parse_args()
+
+    baseline = per_span(Tracer(enabled=False), args.spans)
+    enabled = per_span(Tracer(), args.spans)
+    print(f"span: {enabled * 1e6:5.2f}us traced, {baseline * 1e6:5.2f}us with tracing off")
+
+    tracer = Tracer()
+    trace = request_trace(tracer, args.spans // 10)
+    print(f"request trace (root + 7 spans): {trace * 1e6:6.1f}us")
+
+    start = time.perf_counter()
+    text = tracer.render()
+    print(f"/metrics render: {(time.perf_counter() - start) * 1000:5.2f}ms for {len(text.splitlines())} lines")
+
+    profiler = SamplingProfiler(interval=0.005)
+    profiler.start()
+    busy(args.busy)
+    profiler.stop()
+    stats = profiler.stats()
+    print(f"profiler at 5ms: {stats['samples']} samples, {stats['overhead_seconds'] / max(stats['samples'], 1) * 1e6:.0f}us each, "
+          f"{stats['overhead_seconds'] / stats['seconds']:.1%} of wall time; top frame {profiler.top(1)[0]['function']}")
+
+if __name__ == "__main__":
+    main()
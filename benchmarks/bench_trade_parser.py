@@ -0,0 +1,88 @@
+"""
+Rule-based trade parsing: coverage and accuracy on a labeled corpus, and
+parse time next to the LLM intent call it replaces.
+
+The corpus (benchmarks/trade_corpus.jsonl) holds one request per line,
+either with its expected volume, side, action and query, or marked
+"fallback" when the parser should hand it to the LLM (dollar amounts, two
+orders in one message, negations, a bare "no" that is part of the
+question, a number that may or may not be the volume). It includes
+numbers that are part of the question (years, "76ers", "3rd quarter")
+so a parser that takes any number as the volume does not score well. A confident parse of a fallback line is counted as a false
+positive.
+
+Run from the repository root:
+    python -m benchmarks.bench_trade_parser --repeats 2000
+"""
+import argparse
+import json
+import os
+import time
+
+from trade_parser import parse_trade
+
+CORPUS = os.path.join(os.path.dirname(__file__), "trade_corpus.jsonl")
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[int(q * (len(samples) - 1))]
+
+
+def load(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--repeats", type=int, default=2000, help="timed parses of each request")
+    parser.add_argument("--verbose", action="store_true", help="print every mistake")
+    args = parser.parse_args()
+
+    rows = load(args.corpus)
+    trades = [row for row in rows if not row.get("fallback")]
+    fallbacks = [row for row in rows if row.get("fallback")]
+
+    confident = fields = exact = 0
+    for row in trades:
+        parsed = parse_trade(row["text"])
+        if not parsed.confident:
+            if args.verbose:
+                print(f"  not confident ({parsed.reason}): {row['text']}")
+            continue
+        confident += 1
+        right = [parsed.volume == row["volume"], parsed.side == row["side"], parsed.action == row["action"],
+                 parsed.query == row["query"]]
+        fields += sum(right[:3])
+        exact += all(right)
+        if args.verbose and not all(right):
+            print(f"  wrong: {row['text']!r} -> {parsed}")
+    false_positives = 0
+    for row in fallbacks:
+        parsed = parse_trade(row["text"])
+        if parsed.confident:
+            false_positives += 1
+            if args.verbose:
+                print(f"  should fall back: {row['text']!r} -> {parsed}")
+
+    latencies = []
+    for row in rows:
+        text = row["text"]
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            parse_trade(text)
+        latencies.append((time.perf_counter() - start) / args.repeats)
+
+    print(f"corpus: {len(trades)} trades, {len(fallbacks)} that should fall back to the LLM")
+    print(f"coverage: {confident / len(trades):6.1%} parsed confidently, skipping the LLM call")
+    print(f"accuracy when confident: volume/side/action {fields / max(3 * confident, 1):6.1%}  "
+          f"all fields including query {exact / max(confident, 1):6.1%}")
+    print(f"fallback: {len(fallbacks) - false_positives}/{len(fallbacks)} ambiguous requests sent to the LLM")
+    print(f"parse time: p50 {percentile(latencies, 0.5) * 1e6:6.1f}us  p99 {percentile(latencies, 0.99) * 1e6:6.1f}us  "
+          f"max {max(latencies) * 1e6:6.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Load test of /api/chat with stubbed upstreams: the Flask app behind a
+bounded thread pool (as a sync worker would run it) against the async mode
+in asgi.py.
+
+Each mode is served in its own process by hypercorn. With --upstream stubs
+(the default) OpenAI calls sleep for --latency-ms, the catalog is synthetic
+and orders are acknowledged instantly, so the numbers show how many trade
+requests one process keeps in flight rather than upstream speed.
+
+With --upstream mock the app keeps its real OpenAI and Kalshi clients
+(signing, rate limits, retries, the order queue and the ticker feed) and
+talks to benchmarks/mock_exchange.py, run in a third process with
+--kalshi-latency-ms per request and --error-rate of failed reads. The
+Kalshi calls each mode made are reported after its runs.
+
+Run from the repository root:
+    python -m benchmarks.loadtest --concurrency 1,16,64,256 --seconds 5
+    python -m benchmarks.loadtest --upstream mock --kalshi-latency-ms 30 --concurrency 16,64
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def serve(mode, port, latency, threads, upstream):
+    os.environ["STARTUP_MODE"] = "lazy"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-loadtest")
+    from concurrent.futures import ThreadPoolExecutor
+
+    from hypercorn.asyncio import serve as hypercorn_serve
+    from hypercorn.config import Config
+    from hypercorn.middleware import AsyncioWSGIMiddleware
+
+    import app
+    from benchmarks import stubs
+
+    if mode == "asgi":
+        import asgi
+        application = asgi.application
+    else:
+        application = AsyncioWSGIMiddleware(app.app)
+    if upstream == "stubs":
+        stubs.install(app, latency)
+        app.catalog()  # build the synthetic catalog before taking traffic
+    else:
+        app.catalog().warm()
+        app.market_feed()
+
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.accesslog = None
+    config.backlog = 2048
+
+    async def main():
+        if mode == "wsgi":
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(threads))
+        await hypercorn_serve(application, config)
+
+    asyncio.run(main())
+
+
+async def drive(url, concurrency, seconds):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        async def user(i):
+            nonlocal errors
+            n = 0
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(url + "/api/chat", json={
+                        "message": "buy 1 yes on the fed rate cut", "conversation_id": f"load-{i}-{n}"})
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                except httpx.HTTPError:
+                    errors += 1
+                n += 1
+        start = time.perf_counter()
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url + "/api/conversations/warmup", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not start")
+
+
+def mock_upstream(args, tmp):
+    """Starts the mock exchange and returns it with the environment pointing the app at it."""
+    key_file = os.path.join(tmp, "mock-key.pem")
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    with open(key_file, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+    port, ws_port = args.port + 1, args.port + 2
+    exchange = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_exchange", "--port", str(port), "--ws-port", str(ws_port),
+         "--latency-ms", str(args.kalshi_latency_ms), "--openai-latency-ms", str(args.latency_ms),
+         "--read-error-rate", str(args.error_rate), "--error-rate", str(args.error_rate), "--trades", "0"],
+        stdout=subprocess.DEVNULL,
+    )
+    env = dict(
+        os.environ,
+        KALSHI_API_URL=f"http://127.0.0.1:{port}",
+        KALSHI_WS_URL=f"ws://127.0.0.1:{ws_port}",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{port}/v1",
+        OPENAI_API_KEY="sk-mock",
+        DEMO_KEYID="mock-key",
+        DEMO_KEYFILE=key_file,
+        KALSHI_READ_RATE="100000",
+        KALSHI_READ_BURST="100000",
+        KALSHI_WRITE_RATE="100000",
+        KALSHI_WRITE_BURST="100000",
+    )
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            mock_stats(f"http://127.0.0.1:{port}")
+            break
+        except httpx.HTTPError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+    return exchange, f"http://127.0.0.1:{port}", env
+
+
+def mock_stats(url):
+    return httpx.get(url + "/mock/stats", timeout=5).json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="wsgi,asgi")
+    parser.add_argument("--concurrency", default="1,16,64,256")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--latency-ms", type=float, default=200, help="per OpenAI call; a chat makes two")
+    parser.add_argument("--threads", type=int, default=8, help="worker threads for the wsgi mode")
+    parser.add_argument("--port", type=int, default=8771, help="the mock exchange uses the next two ports")
+    parser.add_argument("--upstream", choices=["stubs", "mock"], default="stubs")
+    parser.add_argument("--kalshi-latency-ms", type=float, default=30, help="per Kalshi request, with --upstream mock")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of Kalshi requests failing, with --upstream mock")
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args.serve, args.port, args.latency_ms / 1000, args.threads, args.upstream)
+
+    url = f"http://127.0.0.1:{args.port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        exchange, exchange_url, env = mock_upstream(args, tmp) if args.upstream == "mock" else (None, None, None)
+        try:
+            for mode in args.modes.split(","):
+                run_mode(args, mode, url, env, exchange_url)
+        finally:
+            if exchange:
+                exchange.terminate()
+                exchange.wait()
+
+
+def run_mode(args, mode, url, env, exchange_url):
+    cmd = [sys.executable, "-m", "benchmarks.loadtest", "--serve", mode, "--port", str(args.port),
+           "--latency-ms", str(args.latency_ms), "--threads", str(args.threads), "--upstream", args.upstream]
+    server = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, env=env)
+    try:
+        wait_until_up(url)
+        before = mock_stats(exchange_url) if exchange_url else None
+        for concurrency in map(int, args.concurrency.split(",")):
+            latencies, errors, elapsed = asyncio.run(drive(url, concurrency, args.seconds))
+            latencies.sort()
+            p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+            print(f"{mode} c={concurrency:<4} {len(latencies) / elapsed:8.1f} req/s  "
+                  f"p50 {1000 * statistics.median(latencies or [0]):7.0f}ms  p99 {1000 * p99:7.0f}ms  errors {errors}")
+        if exchange_url:
+            after = mock_stats(exchange_url)
+            routes = {route: count - before["routes"].get(route, 0) for route, count in after["routes"].items()}
+            print(f"{mode} upstream calls: " + ", ".join(f"{route} {count}" for route, count in sorted(routes.items()) if count)
+                  + f"; {after['ws_messages'] - before['ws_messages']} WebSocket messages")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
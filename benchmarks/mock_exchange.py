@@ -0,0 +1,502 @@
+"""
+Local stand-in for Kalshi and OpenAI, for offline benchmarks and load tests.
+
+Serves the REST endpoints the app and KalshiHttpClient use (series, events,
+markets, trades, orders, balance, positions, exchange status), the
+/trade-api/ws/v2 ticker, fill and market_positions channels on a second
+port, and an OpenAI-compatible
+/v1/chat/completions that answers deterministically. The catalog is the
+synthetic one from benchmarks/stubs.py, sized by the constructor.
+
+Point the app at it with:
+    KALSHI_API_URL=http://127.0.0.1:8765 KALSHI_WS_URL=ws://127.0.0.1:8766
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=sk-mock
+
+Run standalone from the repository root:
+    python -m benchmarks.mock_exchange --port 8765 --ws-port 8766 --latency-ms 20 --openai-latency-ms 200
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.stubs import FakeKalshiData, completion_content
+
+API = "/trade-api/v2"
+WS_PATH = "/trade-api/ws/v2"
+
+
+def _page(items, query, default_limit, max_limit):
+    """Returns one page of items and the cursor of the next, "" after the last."""
+    limit = min(int(query.get("limit") or default_limit), max_limit)
+    start = int(query.get("cursor") or 0)
+    end = start + limit
+    return items[start:end], str(end) if end < len(items) else ""
+
+
+def _route(path):
+    """Path without the API prefix and with tickers replaced, for per-route counts."""
+    parts = path[len(API):].strip("/").split("/") if path.startswith(API) else path.strip("/").split("/")
+    return "/" + "/".join(p if p.islower() else "{ticker}" for p in parts)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections at shutdown are not errors
+        pass
+
+
+class MockExchange:
+    """In-process HTTP (and optionally WebSocket) server mimicking Kalshi.
+
+    Orders are deduplicated on client_order_id like the real exchange, and
+    latency and transient 503s can be injected to exercise retries. An
+    order priced at or through the current quote fills at once, moving the
+    balance and the market's position and pushing fill and market_position
+    messages to their subscribers; any other order rests. List
+    endpoints are cursor-paginated with Kalshi's page limits; GET
+    /markets/trades serves a synthetic tape of `trades` trades, newest
+    first. Ticker messages move each market's prices, which the REST
+    endpoints then report.
+    """
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, batching=True, seed=0, trades=0,
+                 read_error_rate=0.0, jitter=0.0, openai_latency=0.0, ws_port=None, tick_rate=50.0,
+                 series_per_category=50, events_per_series=2, markets_per_event=3):
+        """Builds the catalog and binds the servers without starting them.
+
+        Args:
+            latency (float): Seconds added to every Kalshi request.
+            error_rate (float): Share of order POSTs answered with a 503.
+            read_error_rate (float): Share of GETs answered with a 503.
+            jitter (float): Each delay is scaled by a random factor in [1 - jitter, 1 + jitter].
+            openai_latency (float): Seconds per chat completion.
+            ws_port (int): Port of the WebSocket feed; None serves no feed, 0 picks a free port.
+            tick_rate (float): Ticker messages per second on each ticker subscription.
+            series_per_category, events_per_series, markets_per_event (int): Catalog size.
+        """
+        self.trades = trades
+        self.latency = latency
+        self.error_rate = error_rate
+        self.read_error_rate = read_error_rate
+        self.jitter = jitter
+        self.openai_latency = openai_latency
+        self.batching = batching
+        self.tick_rate = tick_rate
+        self.random = random.Random(seed)
+        self.orders = {}
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.routes = Counter()
+        self.balance = 10_000_000
+        self.positions = {}
+        self.fills = 0
+
+        data = FakeKalshiData(series_per_category, events_per_series, markets_per_event, seed)
+        self.series = [dict(s, category=category) for category, items in data.series.items() for s in items]
+        self.events = [{k: v for k, v in e.items() if k != "markets"} for e in data.events]
+        self.markets = [m for e in data.events for m in e["markets"]]
+        self.event_by_ticker = {e["event_ticker"]: e for e in self.events}
+        self.market_by_ticker = {m["ticker"]: m for m in self.markets}
+        self.markets_by_event = {}
+        for m in self.markets:
+            self.markets_by_event.setdefault(m["event_ticker"], []).append(m)
+        for m in self.markets:
+            m.setdefault("title", self.event_by_ticker[m["event_ticker"]]["title"])
+            m.setdefault("volume", 0)
+            m.setdefault("open_interest", 0)
+
+        self.server = _Server((host, port), self._handler())
+        self.thread = None
+        self.ws_host = host
+        self.ws_port = ws_port
+        self.ws_messages = 0
+        self._ws_loop = None
+        self._ws_thread = None
+        self._ws_ready = threading.Event()
+        self._sids = itertools.count(1)
+        self._account_subscribers = {}  # sid -> (connection, channel, seq counter)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def ws_url(self):
+        return f"ws://{self.ws_host}:{self.ws_port}" if self.ws_port is not None else None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="mock-exchange", daemon=True)
+        self.thread.start()
+        if self.ws_port is not None:
+            self._ws_thread = threading.Thread(target=self._serve_ws, name="mock-exchange-ws", daemon=True)
+            self._ws_thread.start()
+            self._ws_ready.wait(10)
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._ws_loop is not None:
+            self._ws_loop.call_soon_threadsafe(self._ws_stop.set)
+            self._ws_thread.join(5)
+
+    def stats(self):
+        with self.lock:
+            return {"requests": self.requests, "routes": dict(self.routes), "orders": len(self.orders),
+                    "fills": self.fills, "balance": self.balance, "ws_messages": self.ws_messages}
+
+    def delay(self, seconds):
+        if seconds:
+            time.sleep(seconds * (1 + self.jitter * (2 * self.random.random() - 1)) if self.jitter else seconds)
+
+    # Orders
+
+    def create_order(self, body):
+        """Returns (status, order or error) for one order request."""
+        with self.lock:
+            existing = self.orders.get(body.get("client_order_id"))
+            if existing is not None:
+                return 409, {"code": "order_already_exists", "message": "duplicate client_order_id"}
+            side = body.get("side")
+            order = {
+                "order_id": str(uuid.uuid4()),
+                "client_order_id": body.get("client_order_id"),
+                "ticker": body.get("ticker"),
+                "side": side,
+                "action": body.get("action"),
+                "count": body.get("count"),
+                f"{side}_price": body.get(f"{side}_price"),
+                "remaining_count": body.get("count"),
+                "status": "resting",
+            }
+            self.orders[order["client_order_id"]] = order
+            if self.marketable(order):
+                self.fill(order)
+            return 201, dict(order)
+
+    def marketable(self, order):
+        market = self.market_by_ticker.get(order["ticker"])
+        price = order.get(f"{order['side']}_price")
+        if market is None or price is None:
+            return False
+        # The no side's quotes mirror the yes side's: no ask = 100 - yes bid, no bid = 100 - yes ask
+        ask = market["yes_ask"] if order["side"] == "yes" else 100 - market["yes_bid"]
+        bid = market["yes_bid"] if order["side"] == "yes" else 100 - market["yes_ask"]
+        return price >= ask if order["action"] == "buy" else price <= bid
+
+    def fill(self, order):
+        """Executes a whole order at its limit price; called with the lock held."""
+        side, count, price = order["side"], order["remaining_count"], order[f"{order['side']}_price"]
+        buy = order["action"] == "buy"
+        position = self.positions.setdefault(order["ticker"], {
+            "ticker": order["ticker"], "position": 0, "market_exposure": 0, "realized_pnl": 0, "total_traded": 0})
+        position["position"] += count if (side == "yes") == buy else -count
+        position["market_exposure"] = max(0, position["market_exposure"] + (count * price if buy else -count * price))
+        position["total_traded"] += count * price
+        self.balance += -count * price if buy else count * price
+        order.update(remaining_count=0, status="executed")
+        self.fills += 1
+        yes_price = price if side == "yes" else 100 - price
+        self.push("fill", {
+            "trade_id": str(uuid.uuid4()), "order_id": order["order_id"], "market_ticker": order["ticker"],
+            "is_taker": True, "side": side, "action": order["action"], "count": count,
+            "yes_price": yes_price, "no_price": 100 - yes_price, "post_position": position["position"],
+            "ts": int(time.time()),
+        })
+        self.push("market_positions", {
+            "market_ticker": order["ticker"], "position": position["position"],
+            # The WebSocket reports money in centi-cents
+            "position_cost": position["market_exposure"] * 100, "realized_pnl": 0, "fees_paid": 0,
+            "volume": position["total_traded"],
+        })
+
+    def push(self, channel, msg):
+        """Sends a message to every subscriber of an account channel; called with the lock held, so seqs stay in order."""
+        kind = "market_position" if channel == "market_positions" else channel
+        for sid, (connection, subscribed, seqs) in list(self._account_subscribers.items()):
+            if subscribed == channel and self._ws_loop is not None:
+                message = json.dumps({"type": kind, "sid": sid, "seq": next(seqs), "msg": msg})
+                asyncio.run_coroutine_threadsafe(connection.send(message), self._ws_loop)
+                self.ws_messages += 1
+
+    # Market data
+
+    def trade(self, i):
+        """The i-th trade of the synthetic tape, counting back from the newest."""
+        yes_price = 1 + (i * 37) % 99
+        return {
+            "trade_id": str(uuid.UUID(int=i)),
+            "ticker": f"KXBENCH-{i % 50:02d}",
+            "count": 1 + i % 25,
+            "yes_price": yes_price,
+            "no_price": 100 - yes_price,
+            "taker_side": "yes" if i % 3 else "no",
+            "created_time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(1_750_000_000 - i)),
+        }
+
+    def trades_page(self, query):
+        limit = min(int(query.get("limit") or 100), 1000)
+        start = int(query.get("cursor") or 0)
+        end = min(start + limit, self.trades)
+        ticker = query.get("ticker")
+        trades = [t for t in map(self.trade, range(start, end)) if ticker in (None, t["ticker"])]
+        return {"trades": trades, "cursor": str(end) if end < self.trades else ""}
+
+    def get(self, path, query):
+        """Returns (status, body) for a market data or portfolio GET."""
+        parts = path[len(API):].strip("/").split("/")
+        if parts == ["series"]:
+            items = [s for s in self.series if query.get("category") in (None, s["category"])]
+            page, cursor = _page(items, query, 1000, 1000)
+            return 200, {"series": page, "cursor": cursor}
+        if parts[0] == "series" and len(parts) == 2:
+            series = next((s for s in self.series if s["ticker"] == parts[1]), None)
+            return (200, {"series": series}) if series else (404, {"error": "series not found"})
+        if parts == ["events"]:
+            items = [e for e in self.events if query.get("series_ticker") in (None, e["series_ticker"])]
+            if query.get("status") not in (None, "open"):
+                items = []
+            page, cursor = _page(items, query, 200, 200)
+            if query.get("with_nested_markets") == "true":
+                page = [dict(e, markets=self.markets_by_event[e["event_ticker"]]) for e in page]
+            return 200, {"events": page, "cursor": cursor}
+        if parts[0] == "events" and len(parts) == 2:
+            event = self.event_by_ticker.get(parts[1])
+            if event is None:
+                return 404, {"error": "event not found"}
+            return 200, {"event": event, "markets": self.markets_by_event[parts[1]]}
+        if parts == ["markets", "trades"]:
+            return 200, self.trades_page(query)
+        if parts == ["markets"]:
+            items = self.markets
+            if query.get("event_ticker"):
+                items = self.markets_by_event.get(query["event_ticker"], [])
+            if query.get("series_ticker"):
+                items = [m for m in items if self.event_by_ticker[m["event_ticker"]]["series_ticker"] == query["series_ticker"]]
+            if query.get("tickers"):
+                wanted = set(query["tickers"].split(","))
+                items = [m for m in items if m["ticker"] in wanted]
+            if query.get("status") not in (None, "open", "active"):
+                items = []
+            page, cursor = _page(items, query, 100, 1000)
+            return 200, {"markets": page, "cursor": cursor}
+        if parts[0] == "markets" and len(parts) == 2:
+            market = self.market_by_ticker.get(parts[1])
+            return (200, {"market": market}) if market else (404, {"error": "market not found"})
+        if parts == ["portfolio", "balance"]:
+            return 200, {"balance": self.balance, "portfolio_value": 0}
+        if parts == ["exchange", "status"]:
+            return 200, {"exchange_active": True, "trading_active": True}
+        if parts == ["portfolio", "orders"]:
+            ticker, status = query.get("ticker"), query.get("status")
+            with self.lock:
+                orders = [dict(o) for o in self.orders.values()
+                          if ticker in (None, o["ticker"]) and status in (None, o["status"])]
+            return 200, {"orders": orders, "cursor": ""}
+        if parts == ["portfolio", "positions"]:
+            with self.lock:
+                positions = [dict(p) for p in self.positions.values()]
+            page, cursor = _page(positions, query, 100, 1000)
+            return 200, {"market_positions": page, "event_positions": [], "cursor": cursor}
+        return 404, {"error": "not found"}
+
+    # OpenAI
+
+    def chat_completion(self, body):
+        self.delay(self.openai_latency)
+        content = completion_content(body)
+        return {
+            "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    # WebSocket ticker feed
+
+    def _serve_ws(self):
+        from websockets.asyncio.server import serve
+
+        async def main():
+            self._ws_stop = asyncio.Event()
+            async with serve(self._ws_handler, self.ws_host, self.ws_port) as server:
+                self.ws_port = server.sockets[0].getsockname()[1]
+                self._ws_ready.set()
+                await self._ws_stop.wait()
+
+        self._ws_loop = asyncio.new_event_loop()
+        try:
+            self._ws_loop.run_until_complete(main())
+        finally:
+            self._ws_loop.close()
+
+    async def _ws_handler(self, connection):
+        from websockets.exceptions import ConnectionClosed
+
+        if connection.request.path.split("?")[0] != WS_PATH:
+            await connection.close(1008, "unknown path")
+            return
+        tasks = {}
+        try:
+            async for raw in connection:
+                command = json.loads(raw)
+                params = command.get("params") or {}
+                if command.get("cmd") == "subscribe":
+                    for channel in params.get("channels", []):
+                        sid = next(self._sids)
+                        await connection.send(json.dumps({"id": command.get("id"), "type": "subscribed",
+                                                          "msg": {"channel": channel, "sid": sid}}))
+                        tasks[sid] = asyncio.create_task(self._ticker(connection, sid, params.get("market_tickers"))) \
+                            if channel == "ticker" else None
+                        if channel in ("fill", "market_positions"):
+                            with self.lock:
+                                self._account_subscribers[sid] = (connection, channel, itertools.count(1))
+                elif command.get("cmd") == "unsubscribe":
+                    for sid in params.get("sids", []):
+                        task = tasks.pop(sid, None)
+                        if task is not None:
+                            task.cancel()
+                        with self.lock:
+                            self._account_subscribers.pop(sid, None)
+                        await connection.send(json.dumps({"id": command.get("id"), "sid": sid, "type": "unsubscribed"}))
+        except ConnectionClosed:
+            pass
+        finally:
+            for task in tasks.values():
+                if task is not None:
+                    task.cancel()
+            with self.lock:
+                for sid in tasks:
+                    self._account_subscribers.pop(sid, None)
+
+    async def _ticker(self, connection, sid, market_tickers):
+        tickers = market_tickers or list(self.market_by_ticker)
+        rng = random.Random(sid)
+        for seq in itertools.count(1):
+            await asyncio.sleep(1 / self.tick_rate)
+            market = self.market_by_ticker.get(rng.choice(tickers))
+            if market is None:
+                continue
+            bid = min(max(market["yes_bid"] + rng.choice((-1, 0, 1)), 1), 97)
+            market.update(yes_bid=bid, yes_ask=bid + 1 + rng.randrange(3), last_price=bid,
+                          volume=market["volume"] + rng.randint(1, 20))
+            await connection.send(json.dumps({"type": "ticker", "sid": sid, "seq": seq, "msg": {
+                "market_ticker": market["ticker"],
+                "price": market["last_price"],
+                "yes_bid": market["yes_bid"],
+                "yes_ask": market["yes_ask"],
+                "volume": market["volume"],
+                "open_interest": market["open_interest"],
+                "ts": int(time.time()),
+            }}))
+            self.ws_messages += 1
+
+    def _handler(self):
+        exchange = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def _delay(self, path, error_rate):
+                with exchange.lock:
+                    exchange.requests += 1
+                    exchange.routes[path] += 1
+                    fail = exchange.random.random() < error_rate
+                exchange.delay(exchange.latency)
+                return fail
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/mock/stats":
+                    return self._send(200, exchange.stats())
+                if self._delay("GET " + _route(url.path), exchange.read_error_rate):
+                    return self._send(503, {"error": "injected failure"})
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                self._send(*exchange.get(url.path, query))
+
+            def do_POST(self):
+                path = urlparse(self.path).path
+                body = self._body()
+                if path == "/v1/chat/completions":
+                    with exchange.lock:
+                        exchange.routes["POST openai"] += 1
+                    return self._send(200, exchange.chat_completion(body))
+                fail = self._delay("POST " + _route(path), exchange.error_rate)
+                if path == API + "/portfolio/orders":
+                    if fail:
+                        return self._send(503, {"error": "injected failure"})
+                    status, payload = exchange.create_order(body)
+                    return self._send(status, {"order": payload} if status == 201 else {"error": payload})
+                if path == API + "/portfolio/orders/batched":
+                    if not exchange.batching:
+                        return self._send(403, {"error": "batching not enabled"})
+                    if fail:
+                        return self._send(503, {"error": "injected failure"})
+                    results = []
+                    for order in body.get("orders", []):
+                        status, payload = exchange.create_order(order)
+                        results.append({"order": payload} if status == 201 else {"error": payload})
+                    return self._send(201, {"orders": results})
+                self._send(404, {"error": "not found"})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ws-port", type=int, default=8766, help="ticker feed port; -1 to serve no feed")
+    parser.add_argument("--latency-ms", type=float, default=0, help="added to every Kalshi request")
+    parser.add_argument("--jitter", type=float, default=0, help="latency varies by up to this fraction")
+    parser.add_argument("--openai-latency-ms", type=float, default=200, help="per chat completion")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of order POSTs failing with 503")
+    parser.add_argument("--read-error-rate", type=float, default=0, help="share of GETs failing with 503")
+    parser.add_argument("--tick-rate", type=float, default=50, help="ticker messages per second per subscription")
+    parser.add_argument("--series", type=int, default=50, help="series per category")
+    parser.add_argument("--events", type=int, default=2, help="events per series")
+    parser.add_argument("--markets", type=int, default=3, help="markets per event")
+    parser.add_argument("--trades", type=int, default=100000, help="trades in the synthetic tape")
+    args = parser.parse_args()
+    exchange = MockExchange(
+        port=args.port, latency=args.latency_ms / 1000, error_rate=args.error_rate, trades=args.trades,
+        read_error_rate=args.read_error_rate, jitter=args.jitter, openai_latency=args.openai_latency_ms / 1000,
+        ws_port=None if args.ws_port < 0 else args.ws_port, tick_rate=args.tick_rate,
+        series_per_category=args.series, events_per_series=args.events, markets_per_event=args.markets,
+    ).start()
+    print(f"Mock exchange listening on {exchange.url}" + (f", ticker feed on {exchange.ws_url}" if exchange.ws_url else ""),
+          flush=True)
+    try:
+        exchange.thread.join()
+    except KeyboardInterrupt:
+        exchange.stop()
+
+
+if __name__ == "__main__":
+    main()
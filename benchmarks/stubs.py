@@ -0,0 +1,144 @@
+"""
+Stand-ins for the OpenAI API, the Kalshi catalog, the account and the order router, so
+the web app can be load tested without network access or credentials.
+"""
+import asyncio
+import json
+import random
+import time
+import uuid
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from benchmarks.bench_search import WORDS
+from catalog import KalshiCatalog
+from config import CATEGORIES
+from portfolio import Portfolio
+
+
+def completion_content(request):
+    """Deterministic answer to an intent (structured output) or event-choice request."""
+    if "response_format" in request:
+        return json.dumps({
+            "volume": 1,
+            "side": "yes",
+            "action": "buy",
+            "query": request["messages"][-1]["content"],
+            "categories": [CATEGORIES[0]],
+            "keywords": request["messages"][-1]["content"].lower().split()[:3],
+        })
+    # Pick the first candidate event, as a model usually would for a clear match
+    events = json.loads(request["messages"][1]["content"])
+    return events[0][1] if events else "None"
+
+
+def _completion(kwargs):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=completion_content(kwargs)))])
+
+
+class FakeOpenAI:
+    """Sync client whose chat completions take `latency` seconds."""
+    def __init__(self, latency=0.2):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        time.sleep(self.latency)
+        return _completion(kwargs)
+
+
+class FakeAsyncOpenAI(FakeOpenAI):
+    """AsyncOpenAI counterpart of FakeOpenAI."""
+    async def _create(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        return _completion(kwargs)
+
+
+class FakeKalshiData:
+    """Fetch function serving a synthetic catalog with every market open, and an empty funded account."""
+    def __init__(self, series_per_category=50, events_per_series=2, markets_per_event=3, seed=0, balance=10**9):
+        self.balance = balance
+        rng = random.Random(seed)
+        now = datetime.now(timezone.utc)
+        opened = (now - timedelta(days=1)).isoformat().replace("+00:00", "Z")
+        closes = (now + timedelta(days=30)).isoformat().replace("+00:00", "Z")
+        self.series = {}
+        self.events = []
+        for c, category in enumerate(CATEGORIES):
+            for s in range(series_per_category):
+                ticker = f"KXS{c}-{s}"
+                self.series.setdefault(category, []).append(
+                    {"ticker": ticker, "title": " ".join(rng.sample(WORDS, 4)), "tags": []})
+                for e in range(events_per_series):
+                    event_ticker = f"{ticker}-E{e}"
+                    self.events.append({
+                        "event_ticker": event_ticker,
+                        "series_ticker": ticker,
+                        "title": " ".join(rng.sample(WORDS, 5)),
+                        "markets": [{
+                            "ticker": f"{event_ticker}-M{m}",
+                            "event_ticker": event_ticker,
+                            "status": "active",
+                            "open_time": opened,
+                            "close_time": closes,
+                            "yes_bid": 40 + m,
+                            "yes_ask": 45 + m,
+                        } for m in range(markets_per_event)],
+                    })
+
+    def __call__(self, path, params):
+        if path == "/series":
+            return {"series": self.series.get(params.get("category"), [])}
+        if path == "/events":
+            # The catalog pops nested markets, so hand out copies
+            return {"events": [dict(e) for e in self.events]}
+        if path == "/markets":
+            event = next((e for e in self.events if e["event_ticker"] == params.get("event_ticker")), None)
+            return {"markets": event["markets"] if event else []}
+        if path == "/portfolio/balance":
+            return {"balance": self.balance}
+        if path == "/portfolio/positions":
+            return {"market_positions": [], "event_positions": []}
+        if path == "/portfolio/orders":
+            return {"orders": []}
+        raise KeyError(path)
+
+
+class FakeOrderRouter:
+    """Acknowledges every order immediately."""
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, order):
+        self.submitted += 1
+        future = Future()
+        future.client_order_id = order.get("client_order_id")
+        future.set_result({"order_id": str(uuid.uuid4()), "status": "resting", **order})
+        return future
+
+    def stats(self):
+        return {"submitted": self.submitted}
+
+
+def install(app, latency=0.2):
+    """Points app.py's resources (and asgi.py's, if imported) at the stubs."""
+    data = FakeKalshiData()
+
+    def catalog():
+        kalshi_catalog = KalshiCatalog(data, CATEGORIES, on_markets=app.market_book().seed, on_events=app.event_index().update)
+        kalshi_catalog.warm()
+        return kalshi_catalog
+
+    app.resources.override("openai_client", lambda: FakeOpenAI(latency))
+    app.resources.override("catalog", catalog)
+    app.resources.override("order_router", FakeOrderRouter)
+    def portfolio():
+        account = Portfolio(data)
+        account.reconcile()
+        return account
+
+    app.resources.override("portfolio", portfolio)
+    app.resources.override("portfolio_feed", lambda: None)
+    if "async_openai_client" in app.resources:
+        app.resources.override("async_openai_client", lambda: FakeAsyncOpenAI(latency))
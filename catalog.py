@@ -0,0 +1,373 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fanout import FanOut
+from search import SearchIndex
+
+Fetch = Callable[[str, Dict[str, Any]], Dict[str, Any]]
+
+
+class _SeriesSnapshot:
+    """Immutable view of the series catalog, swapped atomically on refresh."""
+    __slots__ = ("series", "by_category", "loaded_at")
+
+    def __init__(self, series: Dict[str, Dict[str, Any]], by_category: Dict[str, List[str]], loaded_at: float):
+        self.series = series
+        self.by_category = by_category
+        self.loaded_at = loaded_at
+
+
+class _EventsSnapshot:
+    """Immutable view of open events and their nested markets."""
+    __slots__ = ("events", "markets", "by_series", "by_event", "loaded_at")
+
+    def __init__(
+        self,
+        events: Dict[str, Dict[str, Any]],
+        markets: Dict[str, Dict[str, Any]],
+        by_series: Dict[str, List[str]],
+        by_event: Dict[str, List[str]],
+        loaded_at: float,
+    ):
+        self.events = events
+        self.markets = markets
+        self.by_series = by_series
+        self.by_event = by_event
+        self.loaded_at = loaded_at
+
+
+class KalshiCatalog:
+    """In-process cache of Kalshi series, events and markets.
+
+    The catalog is warmed once and then kept fresh by a background thread, so
+    the chat path can resolve a trade against memory instead of issuing one
+    REST call per category, series and event.
+    """
+    def __init__(
+        self,
+        fetch: Fetch,
+        categories: Iterable[str],
+        series_ttl: float = 3600,
+        events_ttl: float = 60,
+        page_limit: int = 200,
+        fanout: Optional[FanOut] = None,
+        host: str = "kalshi",
+        on_markets: Optional[Callable[[Iterable[Dict[str, Any]]], None]] = None,
+        on_events: Optional[Callable[[Dict[str, Dict[str, Any]], Dict[str, List[Dict[str, Any]]]], None]] = None,
+        retry_backoff: float = 2.0,
+    ):
+        """Initializes an empty catalog.
+
+        Args:
+            fetch (Fetch): Callable performing a GET for (path, params) and returning the JSON body.
+            categories (Iterable[str]): Series categories to load.
+            series_ttl (float): Seconds before the series list is refreshed.
+            events_ttl (float): Seconds before open events and markets are refreshed.
+            page_limit (int): Page size used when following cursors.
+            fanout (FanOut): Pool used to fetch categories and series concurrently.
+            host (str): Name of the upstream host, for the fan-out's per-host limit.
+            on_markets (Callable): Called with every open market after each events refresh.
+            on_events (Callable): Called with the open events by ticker and the markets of
+                each event after each events refresh.
+            retry_backoff (float): Seconds before a category whose series failed to load is
+                retried, doubled per consecutive failure up to series_ttl.
+        """
+        self.fetch = fetch
+        self.categories = list(categories)
+        self.series_ttl = series_ttl
+        self.events_ttl = events_ttl
+        self.page_limit = page_limit
+        self.fanout = fanout or FanOut()
+        self.host = host
+        self.on_markets = on_markets
+        self.on_events = on_events
+        self.retry_backoff = retry_backoff
+
+        self._series: Optional[_SeriesSnapshot] = None
+        self._events: Optional[_EventsSnapshot] = None
+        self._index: Optional[SearchIndex] = None
+        self._failed: Dict[str, Tuple[int, float]] = {}  # category -> (consecutive failures, retry at)
+        self._stats_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.refresh_errors = 0
+        self.last_error: Optional[str] = None
+
+    # Refreshing
+
+    def paginate(self, path: str, key: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Follows `cursor` until exhausted and returns every item under `key`."""
+        params = dict(params or {})
+        params.setdefault("limit", self.page_limit)
+        items: List[Dict[str, Any]] = []
+        while True:
+            data = self.fetch(path, params)
+            items.extend(data.get(key) or [])
+            cursor = data.get("cursor")
+            if not cursor:
+                return items
+            params["cursor"] = cursor
+
+    def _fetch_series(self, categories: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Fetches the series of each category concurrently, skipping failed categories."""
+        results, errors = self.fanout.map(
+            lambda category: self.paginate("/series", "series", {"category": category}),
+            categories,
+            host=self.host,
+        )
+        for category, error in errors.items():
+            self._record_error(f"series {category}: {error}")
+        return results
+
+    def refresh_series(self, categories: Optional[Iterable[str]] = None) -> None:
+        """Reloads the series of the given categories, or of all configured ones.
+
+        A category that fails to load keeps its last good copy, if any, and
+        is retried with backoff rather than waiting out series_ttl. Only a
+        refresh of every category restarts the TTL.
+        """
+        categories = self.categories if categories is None else list(categories)
+        fetched = self._fetch_series(categories)
+        previous = self._series
+        now = time.time()
+        series: Dict[str, Dict[str, Any]] = {}
+        by_category: Dict[str, List[str]] = {}
+        for category in self.categories:
+            if category in categories and category not in fetched:
+                failures = self._failed.get(category, (0, 0.0))[0] + 1
+                self._failed[category] = (failures, now + min(self.series_ttl, self.retry_backoff * 2 ** (failures - 1)))
+            if category not in fetched:
+                # Keep serving the last good copy of a category that failed to refresh, or was not asked for.
+                if previous is not None and category in previous.by_category:
+                    by_category[category] = previous.by_category[category]
+                    for ticker in by_category[category]:
+                        series.setdefault(ticker, previous.series[ticker])
+                continue
+            self._failed.pop(category, None)
+            tickers = by_category.setdefault(category, [])
+            for item in fetched[category]:
+                series.setdefault(item["ticker"], {
+                    "ticker": item["ticker"],
+                    "title": item.get("title", ""),
+                    "tags": item.get("tags") or [],
+                    "category": category,
+                })
+                tickers.append(item["ticker"])
+        full = previous is None or len(categories) == len(self.categories)
+        self._series = _SeriesSnapshot(series, by_category, now if full else previous.loaded_at)
+
+    def _retry_due(self, now: float) -> List[str]:
+        return [category for category, (_, retry_at) in self._failed.items() if retry_at <= now]
+
+    def refresh_events(self) -> None:
+        """Reloads open events together with their nested markets."""
+        events: Dict[str, Dict[str, Any]] = {}
+        markets: Dict[str, Dict[str, Any]] = {}
+        by_series: Dict[str, List[str]] = {}
+        by_event: Dict[str, List[str]] = {}
+        items = self.paginate("/events", "events", {"status": "open", "with_nested_markets": "true"})
+        for item in items:
+            event_ticker = item["event_ticker"]
+            # Responses may be shared with concurrent callers, so copy rather than pop the nested markets
+            nested = item.get("markets") or []
+            item = {k: v for k, v in item.items() if k != "markets"}
+            events[event_ticker] = item
+            by_series.setdefault(item.get("series_ticker", ""), []).append(event_ticker)
+            tickers = by_event.setdefault(event_ticker, [])
+            for market in nested:
+                markets[market["ticker"]] = market
+                tickers.append(market["ticker"])
+        self._events = _EventsSnapshot(events, markets, by_series, by_event, time.time())
+        if self.on_markets is not None:
+            self.on_markets(markets.values())
+        if self.on_events is not None:
+            self.on_events(events, {e: [markets[m] for m in tickers] for e, tickers in by_event.items()})
+
+    def rebuild_index(self) -> None:
+        """Indexes each series by its title and tags plus its open event and market titles."""
+        series, events = self._series, self._events
+        if series is None:
+            return
+        categories_of: Dict[str, List[str]] = {}
+        for category, tickers in series.by_category.items():
+            for ticker in tickers:
+                categories_of.setdefault(ticker, []).append(category)
+        docs = []
+        for ticker, item in series.series.items():
+            parts = [item["title"], " ".join(item["tags"])]
+            if events is not None:
+                for event_ticker in events.by_series.get(ticker, []):
+                    parts.append(events.events[event_ticker].get("title", ""))
+                    parts += [events.markets[m].get("title", "") for m in events.by_event[event_ticker]]
+            docs.append((ticker, " ".join(parts), categories_of[ticker]))
+        self._index = SearchIndex().build(docs)
+
+    def refresh(self, force: bool = False) -> None:
+        """Refreshes whichever parts of the catalog have outlived their TTL."""
+        with self._refresh_lock:
+            now = time.time()
+            try:
+                refreshed = False
+                if force or self._series is None or now - self._series.loaded_at >= self.series_ttl:
+                    self.refresh_series()
+                    refreshed = True
+                elif self._retry_due(now):
+                    self.refresh_series(self._retry_due(now))
+                    refreshed = True
+                if force or self._events is None or now - self._events.loaded_at >= self.events_ttl:
+                    self.refresh_events()
+                    refreshed = True
+                if refreshed:
+                    self.rebuild_index()
+            except Exception as e:
+                self._record_error(str(e))
+
+    def _record_error(self, error: str) -> None:
+        with self._stats_lock:
+            self.refresh_errors += 1
+            self.last_error = error
+        print(f"Catalog refresh error: {error}")
+
+    def warm(self) -> None:
+        """Loads the full catalog, blocking until done."""
+        self.refresh(force=True)
+
+    def start(self) -> None:
+        """Warms the catalog and keeps it fresh from a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the background refresher."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        self.refresh(force=True)
+        while not self._stop.wait(self._seconds_until_due()):
+            self.refresh()
+
+    def _seconds_until_due(self) -> float:
+        now = time.time()
+        due = []
+        if self._series is not None:
+            due.append(self._series.loaded_at + self.series_ttl - now)
+        if self._events is not None:
+            due.append(self._events.loaded_at + self.events_ttl - now)
+        if len(due) < 2:
+            due.append(5.0)
+        # Categories that failed to load are retried on their own backoff
+        due += [retry_at - now for _, retry_at in list(self._failed.values())]
+        # Retry cold or failed parts quickly, but never spin.
+        return max(1.0, min(due))
+
+    # Lookups
+
+    def _record(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def series_for_categories(self, categories: Iterable[str]) -> List[Dict[str, Any]]:
+        """Returns the series listed under any of the given categories."""
+        snapshot = self._series
+        categories = [c.strip() for c in categories]
+        if snapshot is None:
+            self._record(False)
+            fetched = self._fetch_series(categories)
+            return [{"ticker": item["ticker"], "title": item.get("title", ""),
+                     "tags": item.get("tags") or [], "category": category}
+                    for category in categories for item in fetched.get(category, [])]
+        self._record(True)
+        seen = set()
+        result = []
+        for category in categories:
+            for ticker in snapshot.by_category.get(category, []):
+                if ticker not in seen:
+                    seen.add(ticker)
+                    result.append(snapshot.series[ticker])
+        return result
+
+    def search_series(self, query: str, categories: Iterable[str], k: int = 25) -> List[Dict[str, Any]]:
+        """Returns the k best matching series within the given categories."""
+        categories = [c.strip() for c in categories]
+        series, index = self._series, self._index
+        if series is None or index is None:
+            candidates = self.series_for_categories(categories)
+            by_ticker = {s["ticker"]: s for s in candidates}
+            index = SearchIndex().build((s["ticker"], s["title"] + " " + " ".join(s["tags"])) for s in candidates)
+            ranked = index.search(query, k)
+        else:
+            self._record(True)
+            by_ticker = series.series
+            ranked = index.search(query, k, groups=categories)
+            if not ranked:
+                candidates = [by_ticker[t] for c in categories for t in series.by_category.get(c, [])]
+        if not ranked:
+            # Nothing matched even after typo correction; let event selection see the categories.
+            return candidates[:k]
+        return [by_ticker[ticker] for ticker, _ in ranked]
+
+    def events_for_series(self, series_tickers: Iterable[str]) -> List[Dict[str, Any]]:
+        """Returns the open events belonging to the given series."""
+        snapshot = self._events
+        if snapshot is None:
+            self._record(False)
+            series_tickers = list(series_tickers)
+            results, errors = self.fanout.map(
+                lambda ticker: self.paginate("/events", "events", {"series_ticker": ticker, "status": "open"}),
+                series_tickers,
+                host=self.host,
+            )
+            for ticker, error in errors.items():
+                print(f"Skipping events for {ticker}: {error}")
+            return [e for ticker in series_tickers for e in results.get(ticker, [])]
+        self._record(True)
+        return [snapshot.events[e] for t in series_tickers for e in snapshot.by_series.get(t, [])]
+
+    def markets_for_event(self, event_ticker: str) -> List[Dict[str, Any]]:
+        """Returns the markets of an event, fetching live if it is not cached."""
+        snapshot = self._events
+        if snapshot is not None and event_ticker in snapshot.by_event:
+            self._record(True)
+            return [snapshot.markets[t] for t in snapshot.by_event[event_ticker]]
+        self._record(False)
+        return self.paginate("/markets", "markets", {"event_ticker": event_ticker})
+
+    def events_expire_at(self) -> float:
+        """Returns when the cached events are due for a refresh, in epoch seconds."""
+        snapshot = self._events
+        return snapshot.loaded_at + self.events_ttl if snapshot else time.time()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit-rate, staleness and size counters."""
+        now = time.time()
+        series, events = self._series, self._events
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "refresh_errors": self.refresh_errors,
+                "last_error": self.last_error,
+                "failed_categories": sorted(self._failed),
+                "series_count": len(series.series) if series else 0,
+                "events_count": len(events.events) if events else 0,
+                "markets_count": len(events.markets) if events else 0,
+                "series_age_seconds": now - series.loaded_at if series else None,
+                "events_age_seconds": now - events.loaded_at if events else None,
+                "series_stale": series is None or now - series.loaded_at > 2 * self.series_ttl,
+                "events_stale": events is None or now - events.loaded_at > 2 * self.events_ttl,
+            }
@@ -1,23 +1,170 @@
+import asyncio
 import requests
-import base64
+import random
+import threading
 import time
-from typing import Any, Dict, Optional
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
 from enum import Enum
 import json
 
-from requests.exceptions import HTTPError
+from requests.adapters import HTTPAdapter
+from requests.exceptions import HTTPError, ConnectionError as RequestsConnectionError, Timeout
 
-from cryptography.hazmat.primitives import serialization, hashes
-from cryptography.hazmat.primitives.asymmetric import padding, rsa
-from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric import rsa
 
 import websockets
 
+from ratelimit import RateLimiter
+from signing import RequestSigner
+from singleflight import SingleFlight
+from pipeline import MessagePipeline
+from tracing import path_label, tracer
+
 class Environment(Enum):
     DEMO = "demo"
     PROD = "prod"
 
+class KalshiTransport:
+    """Shared HTTP transport with connection pooling, keep-alive and retries.
+
+    One transport should be shared by every client talking to Kalshi so that
+    TCP and TLS handshakes are paid once per pooled connection rather than
+    once per request.
+    """
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "DELETE"})
+
+    def __init__(
+        self,
+        pool_connections: int = 4,
+        pool_maxsize: int = 32,
+        max_retries: int = 3,
+        backoff: float = 0.2,
+        max_backoff: float = 5.0,
+        timeout: float = 10.0,
+        http2: bool = False,
+    ):
+        """Initializes the pooled session.
+
+        Args:
+            pool_connections (int): Number of hosts to keep connection pools for.
+            pool_maxsize (int): Keep-alive connections kept per host.
+            max_retries (int): Retries on 429/5xx responses and connection errors.
+            backoff (float): Base delay in seconds, doubled on every retry.
+            max_backoff (float): Upper bound on a single retry delay.
+            timeout (float): Per-request timeout in seconds.
+            http2 (bool): Use an HTTP/2 httpx client when httpx[http2] is installed.
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.retry_count = 0
+        self.http2 = False
+        self.network_errors: tuple = (RequestsConnectionError, Timeout)
+
+        if http2:
+            try:
+                import httpx
+                self.session = httpx.Client(
+                    http2=True,
+                    timeout=timeout,
+                    limits=httpx.Limits(max_connections=pool_connections * pool_maxsize,
+                                        max_keepalive_connections=pool_maxsize),
+                )
+                self.http2 = True
+                self.network_errors = (httpx.TransportError,)
+                return
+            except ImportError:
+                print("httpx[http2] is not installed; falling back to HTTP/1.1 keep-alive.")
+
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+    def retry_delay(self, attempt: int, response: Optional[Any] = None) -> float:
+        """Returns the jittered backoff for a retry, honoring Retry-After."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.max_backoff)
+                except ValueError:
+                    pass
+        # Full jitter keeps concurrent callers from retrying in lockstep.
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        make_headers: Optional[Callable[[], Dict[str, Any]]] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Sends a request, retrying 429/5xx and connection errors with backoff.
+
+        Args:
+            method (str): HTTP method.
+            url (str): Absolute URL.
+            make_headers (Callable): Builds the headers; called again for each retry so
+                signed timestamps stay fresh.
+            **kwargs: Passed to the underlying session (params, json, ...).
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        retryable = method in self.IDEMPOTENT_METHODS
+        for attempt in range(self.max_retries + 1):
+            if rate_limiter is not None:
+                with tracer.span("kalshi.rate_limit", method=method):
+                    rate_limiter.acquire(method)
+            if make_headers is not None:
+                kwargs["headers"] = make_headers()
+            with self._lock:
+                self.request_count += 1
+                if attempt:
+                    self.retry_count += 1
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except self.network_errors:
+                if not retryable or attempt == self.max_retries:
+                    raise
+                time.sleep(self.retry_delay(attempt))
+                continue
+            if rate_limiter is not None:
+                rate_limiter.observe(method, response)
+            # A 429 was rejected before execution, so even a POST is safe to resend.
+            if (response.status_code in self.RETRY_STATUSES and attempt < self.max_retries
+                    and (retryable or response.status_code == 429)):
+                # After a 429 the rate limiter has already paused its bucket.
+                if rate_limiter is None or response.status_code != 429:
+                    time.sleep(self.retry_delay(attempt, response))
+                continue
+            return response
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns request, retry and connection-reuse counters."""
+        with self._lock:
+            requests_sent, retries = self.request_count, self.retry_count
+        connections = None
+        if not self.http2:
+            pools = self.adapter.poolmanager.pools
+            connections = sum(pools[key].num_connections for key in pools.keys())
+        return {
+            "http2": self.http2,
+            "requests": requests_sent,
+            "retries": retries,
+            "connections_opened": connections,
+            "reuse_ratio": (1 - connections / requests_sent) if connections is not None and requests_sent else None,
+        }
+
+    def close(self) -> None:
+        """Closes every pooled connection."""
+        self.session.close()
+
 class KalshiBaseClient:
     """Base client class for interacting with the Kalshi API."""
     def __init__(
@@ -25,6 +172,7 @@ class KalshiBaseClient:
         key_id: str,
         private_key: rsa.RSAPrivateKey,
         environment: Environment = Environment.DEMO,
+        signer: Optional[RequestSigner] = None,
     ):
         """Initializes the client with the provided API key and private key.
 
@@ -32,11 +180,12 @@ class KalshiBaseClient:
             key_id (str): Your Kalshi API key ID.
             private_key (rsa.RSAPrivateKey): Your RSA private key.
             environment (Environment): The API environment to use (DEMO or PROD).
+            signer (RequestSigner): Shared header signer; one is created if omitted.
         """
         self.key_id = key_id
         self.private_key = private_key
         self.environment = environment
-        self.last_api_call = datetime.now()
+        self.signer = signer or RequestSigner(key_id, private_key)
 
         if self.environment == Environment.DEMO:
             self.HTTP_BASE_URL = "https://demo-api.kalshi.co"
@@ -49,38 +198,11 @@ class KalshiBaseClient:
 
     def request_headers(self, method: str, path: str) -> Dict[str, Any]:
         """Generates the required authentication headers for API requests."""
-        current_time_milliseconds = int(time.time() * 1000)
-        timestamp_str = str(current_time_milliseconds)
-
-        # Remove query params from path
-        path_parts = path.split('?')
-
-        msg_string = timestamp_str + method + path_parts[0]
-        signature = self.sign_pss_text(msg_string)
-
-        headers = {
-            "Content-Type": "application/json",
-            "KALSHI-ACCESS-KEY": self.key_id,
-            "KALSHI-ACCESS-SIGNATURE": signature,
-            "KALSHI-ACCESS-TIMESTAMP": timestamp_str,
-        }
-        return headers
+        return self.signer.headers(method, path)
 
     def sign_pss_text(self, text: str) -> str:
         """Signs the text using RSA-PSS and returns the base64 encoded signature."""
-        message = text.encode('utf-8')
-        try:
-            signature = self.private_key.sign(
-                message,
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.DIGEST_LENGTH
-                ),
-                hashes.SHA256()
-            )
-            return base64.b64encode(signature).decode('utf-8')
-        except InvalidSignature as e:
-            raise ValueError("RSA sign PSS failed") from e
+        return self.signer.sign(text)
 
 class KalshiHttpClient(KalshiBaseClient):
     """Client for handling HTTP connections to the Kalshi API."""
@@ -89,60 +211,82 @@ class KalshiHttpClient(KalshiBaseClient):
         key_id: str,
         private_key: rsa.RSAPrivateKey,
         environment: Environment = Environment.DEMO,
+        transport: Optional[KalshiTransport] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        signer: Optional[RequestSigner] = None,
+        single_flight: Optional[SingleFlight] = None,
     ):
-        super().__init__(key_id, private_key, environment)
+        super().__init__(key_id, private_key, environment, signer)
+        self.transport = transport or KalshiTransport()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        # Concurrent identical GETs share one request when set
+        self.single_flight = single_flight
         self.host = self.HTTP_BASE_URL
+        self.api_url = "/trade-api/v2"
         self.exchange_url = "/trade-api/v2/exchange"
         self.markets_url = "/trade-api/v2/markets"
         self.portfolio_url = "/trade-api/v2/portfolio"
 
-    def rate_limit(self) -> None:
-        """Built-in rate limiter to prevent exceeding API rate limits."""
-        THRESHOLD_IN_MILLISECONDS = 100
-        now = datetime.now()
-        threshold_in_microseconds = 1000 * THRESHOLD_IN_MILLISECONDS
-        threshold_in_seconds = THRESHOLD_IN_MILLISECONDS / 1000
-        if now - self.last_api_call < timedelta(microseconds=threshold_in_microseconds):
-            time.sleep(threshold_in_seconds)
-        self.last_api_call = datetime.now()
-
-    def raise_if_bad_response(self, response: requests.Response) -> None:
+    def raise_if_bad_response(self, response: Any) -> None:
         """Raises an HTTPError if the response status code indicates an error."""
         if response.status_code not in range(200, 299):
-            response.raise_for_status()
+            raise HTTPError(f"{response.status_code} Error for url: {response.url}", response=response)
 
     def post(self, path: str, body: dict) -> Any:
         """Performs an authenticated POST request to the Kalshi API."""
-        self.rate_limit()
-        response = requests.post(
-            self.host + path,
-            json=body,
-            headers=self.request_headers("POST", path)
-        )
-        self.raise_if_bad_response(response)
-        return response.json()
+        with tracer.span("kalshi.http", method="POST", endpoint=path_label(path)) as span:
+            span.set(path=path)
+            response = self.transport.request(
+                "POST",
+                self.host + path,
+                make_headers=lambda: self.request_headers("POST", path),
+                rate_limiter=self.rate_limiter,
+                json=body
+            )
+            span.set(status=response.status_code)
+            self.raise_if_bad_response(response)
+            return response.json()
 
     def get(self, path: str, params: Dict[str, Any] = {}) -> Any:
-        """Performs an authenticated GET request to the Kalshi API."""
-        self.rate_limit()
-        response = requests.get(
-            self.host + path,
-            headers=self.request_headers("GET", path),
-            params=params
-        )
-        self.raise_if_bad_response(response)
-        return response.json()
+        """Performs an authenticated GET request to the Kalshi API.
+
+        With a single_flight, a GET identical to one already in flight waits
+        for that one's response instead of sending another; the shared
+        response must not be modified.
+        """
+        if self.single_flight is None:
+            return self._get(path, params)
+        key = (self.host, path, tuple(sorted((k, str(v)) for k, v in (params or {}).items() if v is not None)))
+        return self.single_flight.do(key, lambda: self._get(path, params))
+
+    def _get(self, path: str, params: Dict[str, Any]) -> Any:
+        with tracer.span("kalshi.http", method="GET", endpoint=path_label(path)) as span:
+            span.set(path=path)
+            response = self.transport.request(
+                "GET",
+                self.host + path,
+                make_headers=lambda: self.request_headers("GET", path),
+                rate_limiter=self.rate_limiter,
+                params=params
+            )
+            span.set(status=response.status_code)
+            self.raise_if_bad_response(response)
+            return response.json()
 
     def delete(self, path: str, params: Dict[str, Any] = {}) -> Any:
         """Performs an authenticated DELETE request to the Kalshi API."""
-        self.rate_limit()
-        response = requests.delete(
-            self.host + path,
-            headers=self.request_headers("DELETE", path),
-            params=params
-        )
-        self.raise_if_bad_response(response)
-        return response.json()
+        with tracer.span("kalshi.http", method="DELETE", endpoint=path_label(path)) as span:
+            span.set(path=path)
+            response = self.transport.request(
+                "DELETE",
+                self.host + path,
+                make_headers=lambda: self.request_headers("DELETE", path),
+                rate_limiter=self.rate_limiter,
+                params=params
+            )
+            span.set(status=response.status_code)
+            self.raise_if_bad_response(response)
+            return response.json()
 
     def get_balance(self) -> Dict[str, Any]:
         """Retrieves the account balance."""
@@ -172,54 +316,370 @@ class KalshiHttpClient(KalshiBaseClient):
         params = {k: v for k, v in params.items() if v is not None}
         return self.get(self.markets_url + '/trades', params=params)
 
+    def iter_pages(
+        self,
+        path: str,
+        key: str,
+        params: Optional[Dict[str, Any]] = None,
+        prefetch: bool = False,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Yields each page of items under `key`, following `cursor` only as pages are consumed.
+
+        Args:
+            path (str): API path, e.g. self.markets_url + '/trades'.
+            key (str): Field of the response holding the items.
+            params (Dict): Query parameters; None values are dropped.
+            prefetch (bool): Fetch the next page on a background thread while the
+                caller works through the current one. At most two pages are held.
+        """
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        if not prefetch:
+            while True:
+                data = self.get(path, params)
+                yield data.get(key) or []
+                cursor = data.get("cursor")
+                if not cursor:
+                    return
+                params = {**params, "cursor": cursor}
+
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kalshi-prefetch")
+        pending = pool.submit(self.get, path, params)
+        try:
+            while pending is not None:
+                data = pending.result()
+                cursor = data.get("cursor")
+                pending = pool.submit(self.get, path, {**params, "cursor": cursor}) if cursor else None
+                yield data.get(key) or []
+        finally:
+            # Stopping early leaves at most one page in flight, which is discarded.
+            if pending is not None:
+                pending.cancel()
+            pool.shutdown(wait=False)
+
+    def paginate(
+        self,
+        path: str,
+        key: str,
+        params: Optional[Dict[str, Any]] = None,
+        prefetch: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yields every item under `key` across all pages; see iter_pages."""
+        for page in self.iter_pages(path, key, params, prefetch):
+            yield from page
+
+    def iter_trades(
+        self,
+        ticker: Optional[str] = None,
+        min_ts: Optional[int] = None,
+        max_ts: Optional[int] = None,
+        limit: int = 1000,
+        prefetch: bool = True,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yields every trade matching the filters, newest first, one page of `limit` at a time."""
+        params = {'ticker': ticker, 'min_ts': min_ts, 'max_ts': max_ts, 'limit': limit}
+        return self.paginate(self.markets_url + '/trades', 'trades', params, prefetch)
+
+    def iter_markets(
+        self,
+        event_ticker: Optional[str] = None,
+        series_ticker: Optional[str] = None,
+        status: Optional[str] = None,
+        tickers: Optional[List[str]] = None,
+        limit: int = 1000,
+        prefetch: bool = True,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yields every market matching the filters."""
+        params = {
+            'event_ticker': event_ticker,
+            'series_ticker': series_ticker,
+            'status': status,
+            'tickers': ",".join(tickers) if tickers else None,
+            'limit': limit,
+        }
+        return self.paginate(self.markets_url, 'markets', params, prefetch)
+
+    def iter_events(
+        self,
+        series_ticker: Optional[str] = None,
+        status: Optional[str] = None,
+        with_nested_markets: bool = False,
+        limit: int = 200,
+        prefetch: bool = True,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yields every event matching the filters, with its markets if with_nested_markets is set."""
+        params = {
+            'series_ticker': series_ticker,
+            'status': status,
+            'with_nested_markets': 'true' if with_nested_markets else None,
+            'limit': limit,
+        }
+        return self.paginate(self.api_url + '/events', 'events', params, prefetch)
+
+    def iter_series(
+        self,
+        category: Optional[str] = None,
+        tags: Optional[str] = None,
+        prefetch: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yields every series in the category, following a cursor if one is returned."""
+        return self.paginate(self.api_url + '/series', 'series', {'category': category, 'tags': tags}, prefetch)
+
+class Subscription:
+    """One subscribe command, replayed after every reconnect.
+
+    Kalshi answers with one sid per channel, and the sids change on every
+    reconnect or resync.
+    """
+    __slots__ = ("channels", "market_tickers", "request_id", "sids")
+
+    def __init__(self, channels: List[str], market_tickers: Optional[List[str]] = None):
+        self.channels = list(channels)
+        self.market_tickers = list(market_tickers) if market_tickers else None
+        self.request_id: Optional[int] = None
+        self.sids: Dict[str, int] = {}
+
+    def params(self) -> Dict[str, Any]:
+        params: Dict[str, Any] = {"channels": self.channels}
+        if self.market_tickers:
+            params["market_tickers"] = self.market_tickers
+        return params
+
 class KalshiWebSocketClient(KalshiBaseClient):
-    """Client for handling WebSocket connections to the Kalshi API."""
+    """Client for handling WebSocket connections to the Kalshi API.
+
+    connect() runs until close() is called: a dropped connection is reopened
+    with jittered exponential backoff and freshly signed headers, and every
+    active subscription is replayed. A gap in a subscription's sequence
+    numbers is resynced by resubscribing, which makes Kalshi send a new
+    snapshot.
+    """
     def __init__(
         self,
         key_id: str,
         private_key: rsa.RSAPrivateKey,
         environment: Environment = Environment.DEMO,
+        signer: Optional[RequestSigner] = None,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        heartbeat: float = 10.0,
+        pipeline: Optional[MessagePipeline] = None,
     ):
-        super().__init__(key_id, private_key, environment)
+        """Initializes the client without connecting.
+
+        Args:
+            key_id (str): Your Kalshi API key ID.
+            private_key (rsa.RSAPrivateKey): Your RSA private key.
+            environment (Environment): The API environment to use.
+            signer (RequestSigner): Shared header signer; one is created if omitted.
+            backoff (float): Base reconnect delay in seconds, doubled per failed attempt.
+            max_backoff (float): Cap on the reconnect delay.
+            heartbeat (float): Seconds between pings; a missed pong drops the connection.
+            pipeline (MessagePipeline): Decode and dispatch frames off the event loop;
+                on_message is not called when one is given.
+        """
+        super().__init__(key_id, private_key, environment, signer)
         self.ws = None
         self.url_suffix = "/trade-api/ws/v2"
         self.message_id = 1  # Add counter for message IDs
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.heartbeat = heartbeat
+        self.subscriptions: List[Subscription] = []
+        # _track updates these on the pipeline's decoder thread while the loop resets them, hence the lock
+        self._tracking = threading.Lock()
+        self._by_request: Dict[int, Subscription] = {}
+        self._by_sid: Dict[int, Subscription] = {}
+        self._last_seq: Dict[int, int] = {}
+        self._closing = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.pipeline = pipeline
+        if pipeline is not None:
+            pipeline.accept = self._track
+
+        self.connects = 0
+        self.messages = 0
+        self.dropped = 0
+        self.gaps = 0
+        self.resyncs = 0
+        self.last_reconnect_seconds: Optional[float] = None
+        self.max_reconnect_seconds = 0.0
+        self._disconnected_at: Optional[float] = None
 
     async def connect(self):
-        """Establishes a WebSocket connection using authentication."""
+        """Keeps a connection open, reconnecting and resubscribing until close() is called."""
         host = self.WS_BASE_URL + self.url_suffix
-        auth_headers = self.request_headers("GET", self.url_suffix)
-        async with websockets.connect(host, additional_headers=auth_headers) as websocket:
-            self.ws = websocket
-            await self.on_open()
-            await self.handler()
+        attempt = 0
+        self._closing = False
+        self._loop = asyncio.get_running_loop()
+        if self.pipeline is not None:
+            self.pipeline.start()
+        while not self._closing:
+            try:
+                # Signatures are timestamped, so every attempt signs afresh.
+                auth_headers = self.request_headers("GET", self.url_suffix)
+                async with websockets.connect(
+                    host,
+                    additional_headers=auth_headers,
+                    ping_interval=self.heartbeat,
+                    ping_timeout=self.heartbeat,
+                ) as websocket:
+                    self.ws = websocket
+                    attempt = 0
+                    self.connects += 1
+                    await self.on_open()
+                    if self._disconnected_at is not None:
+                        self.last_reconnect_seconds = time.monotonic() - self._disconnected_at
+                        self.max_reconnect_seconds = max(self.max_reconnect_seconds, self.last_reconnect_seconds)
+                        self._disconnected_at = None
+                    await self.handler()
+            except Exception as e:
+                await self.on_error(e)
+            self.ws = None
+            if self._closing:
+                break
+            if self._disconnected_at is None:
+                self._disconnected_at = time.monotonic()
+            # Full jitter keeps many clients from reconnecting in lockstep.
+            await asyncio.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+            attempt += 1
+
+    async def close(self):
+        """Stops reconnecting and closes the current connection."""
+        self._closing = True
+        if self.ws is not None:
+            await self.ws.close()
 
     async def on_open(self):
-        """Callback when WebSocket connection is opened."""
+        """Callback when WebSocket connection is opened; replays the subscriptions."""
         print("WebSocket connection opened.")
-        await self.subscribe_to_tickers()
+        with self._tracking:
+            self._by_sid.clear()
+            self._last_seq.clear()
+        for subscription in self.subscriptions:
+            await self._send_subscribe(subscription)
+
+    def _next_id(self) -> int:
+        request_id = self.message_id
+        self.message_id += 1
+        return request_id
+
+    async def _send(self, cmd: str, params: Dict[str, Any], request_id: Optional[int] = None) -> int:
+        if request_id is None:
+            request_id = self._next_id()
+        await self.ws.send(json.dumps({"id": request_id, "cmd": cmd, "params": params}))
+        return request_id
+
+    async def _send_subscribe(self, subscription: Subscription) -> None:
+        # Registered before sending, so the answer cannot reach _track first
+        with self._tracking:
+            subscription.sids.clear()
+            subscription.request_id = self._next_id()
+            self._by_request[subscription.request_id] = subscription
+        await self._send("subscribe", subscription.params(), subscription.request_id)
+
+    def add_subscription(self, channels: List[str], market_tickers: Optional[List[str]] = None) -> Subscription:
+        """Records a subscription to be sent on the next (re)connect."""
+        subscription = Subscription(channels, market_tickers)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    async def subscribe(self, channels: List[str], market_tickers: Optional[List[str]] = None) -> Subscription:
+        """Subscribes now if connected, and again after every reconnect.
+
+        Args:
+            channels (List[str]): Channels such as "ticker", "orderbook_delta" or "fill".
+            market_tickers (List[str]): Markets to limit the channels to; all markets if omitted.
+        """
+        subscription = self.add_subscription(channels, market_tickers)
+        if self.ws is not None:
+            await self._send_subscribe(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription):
+        """Drops a subscription so it is neither active nor replayed."""
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+        await self._unsubscribe_sids(subscription)
+
+    async def _unsubscribe_sids(self, subscription: Subscription) -> None:
+        with self._tracking:
+            sids = list(subscription.sids.values())
+            for sid in sids:
+                self._by_sid.pop(sid, None)
+                self._last_seq.pop(sid, None)
+            subscription.sids.clear()
+        if sids and self.ws is not None:
+            await self._send("unsubscribe", {"sids": sids})
 
     async def subscribe_to_tickers(self):
         """Subscribe to ticker updates for all markets."""
-        subscription_message = {
-            "id": self.message_id,
-            "cmd": "subscribe",
-            "params": {
-                "channels": ["ticker"]
-            }
-        }
-        await self.ws.send(json.dumps(subscription_message))
-        self.message_id += 1
+        return await self.subscribe(["ticker"])
+
+    async def subscribe_to_orderbooks(self, market_tickers: List[str]):
+        """Subscribe to order book snapshots and deltas for specific markets."""
+        return await self.subscribe(["orderbook_delta"], market_tickers)
+
+    async def subscribe_to_fills(self, market_tickers: Optional[List[str]] = None):
+        """Subscribe to this account's fills, optionally for specific markets."""
+        return await self.subscribe(["fill"], market_tickers)
+
+    async def resync(self, subscription: Subscription):
+        """Resubscribes so that the exchange sends a fresh snapshot."""
+        self.resyncs += 1
+        await self._unsubscribe_sids(subscription)
+        await self._send_subscribe(subscription)
 
     async def handler(self):
         """Handle incoming messages."""
         try:
             async for message in self.ws:
-                await self.on_message(message)
+                self.messages += 1
+                if self.pipeline is not None:
+                    # The read loop only hands frames off, so slow consumers cannot stall it.
+                    self.pipeline.submit(message)
+                    continue
+                data = json.loads(message)
+                if self._track(data):
+                    await self.on_message(data)
         except websockets.ConnectionClosed as e:
             await self.on_close(e.code, e.reason)
-        except Exception as e:
-            await self.on_error(e)
+
+    def _track(self, data: Dict[str, Any]) -> bool:
+        """Maps sids to subscriptions and checks sequence numbers; False drops the message.
+
+        Runs on the event loop, or on the pipeline's decoder thread when there is one.
+        """
+        with self._tracking:
+            kind = data.get("type")
+            if kind == "subscribed":
+                # A subscription to several channels is answered once per channel, each with its own sid
+                subscription = self._by_request.get(data.get("id"))
+                if subscription is not None:
+                    sid = data["msg"]["sid"]
+                    subscription.sids[data["msg"].get("channel", "")] = sid
+                    self._by_sid[sid] = subscription
+                    if len(subscription.sids) >= len(subscription.channels):
+                        del self._by_request[data["id"]]
+                return True
+            seq = data.get("seq")
+            sid = data.get("sid")
+            if seq is None or sid is None:
+                return True
+            if sid not in self._by_sid:
+                # Left over from a sid that was resynced or unsubscribed.
+                return False
+            last = self._last_seq.get(sid)
+            self._last_seq[sid] = seq
+            if last is None or seq == last + 1:
+                return True
+            # Messages were lost; anything after the gap is unusable until a new snapshot.
+            self.gaps += 1
+            self.dropped += max(0, seq - last - 1)
+            # Forget the sid now so its later messages are dropped until the resync lands.
+            subscription = self._by_sid.pop(sid, None)
+            if subscription is not None and self._loop is not None:
+                asyncio.run_coroutine_threadsafe(self.resync(subscription), self._loop)
+            return False
 
     async def on_message(self, message):
         """Callback for handling incoming messages."""
@@ -232,3 +692,19 @@ class KalshiWebSocketClient(KalshiBaseClient):
     async def on_close(self, close_status_code, close_msg):
         """Callback when WebSocket connection is closed."""
         print("WebSocket connection closed with code:", close_status_code, "and message:", close_msg)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns connection, reconnect-time and message-loss counters."""
+        return {
+            "connected": self.ws is not None,
+            "connects": self.connects,
+            "reconnects": max(0, self.connects - 1),
+            "last_reconnect_seconds": self.last_reconnect_seconds,
+            "max_reconnect_seconds": self.max_reconnect_seconds,
+            "messages": self.messages,
+            "sequence_gaps": self.gaps,
+            "messages_dropped": self.dropped,
+            "resyncs": self.resyncs,
+            "subscriptions": len(self.subscriptions),
+            "pipeline": self.pipeline.stats() if self.pipeline is not None else None,
+        }
@@ -0,0 +1,289 @@
+"""
+Columnar files for bulk market data: trade tapes, markets, events, series.
+
+Records are buffered a batch at a time and appended to disk column by
+column, so a download of any length holds at most one batch in memory.
+With pyarrow installed the output is a Parquet file, one row group per
+batch. Without it the output is a directory of raw NumPy columns:
+
+    meta.json            schema, row count and category dictionaries
+    <column>.bin         int64/float64 values, int64 microseconds since the
+                         epoch for times, int32 dictionary codes for categories
+    <column>.offsets     int64 end offsets into <column>.bin for text columns
+
+read_columnar loads either format back into NumPy arrays, memory-mapping
+the raw numeric columns.
+"""
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# (name, kind); kind is one of "int", "float", "time", "category" or "text".
+# "category" suits strings with few distinct values (tickers in a tape, statuses).
+Columns = Sequence[Tuple[str, str]]
+
+TRADE_COLUMNS: Columns = (
+    ("trade_id", "text"),
+    ("ticker", "category"),
+    ("count", "int"),
+    ("yes_price", "int"),
+    ("no_price", "int"),
+    ("taker_side", "category"),
+    ("created_time", "time"),
+)
+MARKET_COLUMNS: Columns = (
+    ("ticker", "text"),
+    ("event_ticker", "category"),
+    ("status", "category"),
+    ("title", "text"),
+    ("yes_bid", "int"),
+    ("yes_ask", "int"),
+    ("no_bid", "int"),
+    ("no_ask", "int"),
+    ("last_price", "int"),
+    ("volume", "int"),
+    ("volume_24h", "int"),
+    ("open_interest", "int"),
+    ("open_time", "time"),
+    ("close_time", "time"),
+)
+EVENT_COLUMNS: Columns = (
+    ("event_ticker", "text"),
+    ("series_ticker", "category"),
+    ("category", "category"),
+    ("title", "text"),
+    ("sub_title", "text"),
+)
+SERIES_COLUMNS: Columns = (
+    ("ticker", "text"),
+    ("category", "category"),
+    ("frequency", "category"),
+    ("title", "text"),
+)
+
+KINDS = frozenset({"int", "float", "time", "category", "text"})
+NUMPY_DTYPES = {"int": "<i8", "float": "<f8", "time": "<i8", "category": "<i4"}
+NAT = np.iinfo(np.int64).min
+FORMAT_NAME = "talk2trade-columnar"
+
+
+def has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def parse_times(values: Sequence[Optional[str]]) -> np.ndarray:
+    """ISO 8601 timestamps to int64 microseconds since the epoch; missing values become NaT."""
+    cleaned = []
+    for value in values:
+        if not value:
+            cleaned.append("NaT")
+        elif value.endswith("Z"):
+            cleaned.append(value[:-1])
+        elif "+" in value[10:] or value[10:].count("-"):
+            # Explicit offsets are rare in Kalshi data, so they take the slow path
+            cleaned.append(datetime.fromisoformat(value).astimezone(timezone.utc).replace(tzinfo=None).isoformat())
+        else:
+            cleaned.append(value)
+    return np.array(cleaned, dtype="datetime64[us]").view(np.int64)
+
+
+class ColumnarWriter:
+    """Appends records to a Parquet file or a raw NumPy column directory, one batch at a time."""
+    def __init__(self, path: str, columns: Columns, batch_rows: int = 65536, format: str = "auto"):
+        """Opens the output; an existing file or directory at `path` is replaced.
+
+        Args:
+            path (str): Output file (Parquet) or directory (NumPy).
+            columns (Columns): (name, kind) pairs read from each record.
+            batch_rows (int): Records buffered before a batch is written.
+            format (str): "parquet", "numpy", or "auto" for Parquet when pyarrow is installed.
+        """
+        for name, kind in columns:
+            if kind not in KINDS:
+                raise ValueError(f"Unknown kind {kind!r} for column {name!r}")
+        if format == "auto":
+            format = "parquet" if has_pyarrow() else "numpy"
+        if format not in ("parquet", "numpy"):
+            raise ValueError(f"Unknown format {format!r}")
+        self.path = path
+        self.columns = list(columns)
+        self.batch_rows = batch_rows
+        self.format = format
+        self.rows = 0
+        self.batches = 0
+        self._buffer: List[List[Any]] = [[] for _ in self.columns]
+        self._dictionaries: Dict[str, Dict[str, int]] = {name: {} for name, kind in self.columns if kind == "category"}
+        self._offsets: Dict[str, int] = {name: 0 for name, kind in self.columns if kind == "text"}
+        self._files: Dict[str, Any] = {}
+        self._parquet = None
+        self._closed = False
+
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        if format == "numpy":
+            os.makedirs(path, exist_ok=True)
+            for name, kind in self.columns:
+                self._files[name] = open(os.path.join(path, f"{name}.bin"), "wb")
+                if kind == "text":
+                    self._files[name + ".offsets"] = open(os.path.join(path, f"{name}.offsets"), "wb")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        for values, (name, _) in zip(self._buffer, self.columns):
+            values.append(record.get(name))
+        if len(self._buffer[0]) >= self.batch_rows:
+            self.flush()
+
+    def write_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Writes every record and returns how many there were."""
+        count = 0
+        for record in records:
+            self.write(record)
+            count += 1
+        return count
+
+    def flush(self) -> None:
+        """Writes the buffered records as one batch."""
+        count = len(self._buffer[0])
+        if not count:
+            return
+        if self.format == "parquet":
+            self._flush_parquet()
+        else:
+            self._flush_numpy()
+        self.rows += count
+        self.batches += 1
+        self._buffer = [[] for _ in self.columns]
+
+    def _flush_numpy(self) -> None:
+        for values, (name, kind) in zip(self._buffer, self.columns):
+            out = self._files[name]
+            if kind == "int":
+                out.write(np.array([v or 0 for v in values], dtype="<i8").tobytes())
+            elif kind == "float":
+                out.write(np.array([np.nan if v is None else v for v in values], dtype="<f8").tobytes())
+            elif kind == "time":
+                out.write(parse_times(values).astype("<i8").tobytes())
+            elif kind == "category":
+                codes = self._dictionaries[name]
+                out.write(np.array([codes.setdefault(v or "", len(codes)) for v in values], dtype="<i4").tobytes())
+            else:
+                encoded = [(v or "").encode("utf-8") for v in values]
+                lengths = np.fromiter((len(b) for b in encoded), dtype="<i8", count=len(encoded))
+                ends = np.cumsum(lengths) + self._offsets[name]
+                out.write(b"".join(encoded))
+                self._files[name + ".offsets"].write(ends.tobytes())
+                if len(ends):
+                    self._offsets[name] = int(ends[-1])
+
+    def _flush_parquet(self) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        arrays, fields = [], []
+        for values, (name, kind) in zip(self._buffer, self.columns):
+            if kind == "int":
+                array = pa.array([v or 0 for v in values], pa.int64())
+            elif kind == "float":
+                array = pa.array(values, pa.float64())
+            elif kind == "time":
+                times = parse_times(values)
+                array = pa.array(times.view("datetime64[us]"), pa.timestamp("us", tz="UTC"), mask=times == NAT)
+            elif kind == "category":
+                array = pa.array([v or "" for v in values], pa.string()).dictionary_encode()
+            else:
+                array = pa.array([v or "" for v in values], pa.string())
+            arrays.append(array)
+            fields.append(pa.field(name, array.type))
+        table = pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+        if self._parquet is None:
+            self._parquet = pq.ParquetWriter(self.path, table.schema, compression="zstd")
+        elif table.schema != self._parquet.schema:
+            # A batch's dictionary types can differ; cast to the file's schema
+            table = table.cast(self._parquet.schema)
+        self._parquet.write_table(table)
+
+    def close(self) -> int:
+        """Flushes the last batch, finishes the output and returns the rows written."""
+        if self._closed:
+            return self.rows
+        self.flush()
+        self._closed = True
+        if self.format == "parquet":
+            if self._parquet is not None:
+                self._parquet.close()
+            return self.rows
+        for f in self._files.values():
+            f.close()
+        meta = {
+            "format": FORMAT_NAME,
+            "version": 1,
+            "rows": self.rows,
+            "columns": [{"name": name, "kind": kind} for name, kind in self.columns],
+            "dictionaries": {name: list(codes) for name, codes in self._dictionaries.items()},
+        }
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        return self.rows
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def write_columnar(records: Iterable[Dict[str, Any]], path: str, columns: Columns, batch_rows: int = 65536, format: str = "auto") -> int:
+    """Streams records to `path` and returns how many were written."""
+    with ColumnarWriter(path, columns, batch_rows, format) as writer:
+        return writer.write_many(records)
+
+
+def read_columnar(path: str, columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+    """Loads a file written by ColumnarWriter as NumPy arrays.
+
+    Times come back as datetime64[us], categories and text as str arrays.
+    Numeric columns of the NumPy format are memory-mapped, not read.
+    """
+    if not os.path.isdir(path):
+        import pyarrow.parquet as pq
+        table = pq.read_table(path, columns=list(columns) if columns else None)
+        result = {}
+        for name in table.column_names:
+            column = table.column(name)
+            if hasattr(column.type, "value_type"):
+                column = column.cast(column.type.value_type)
+            result[name] = column.to_numpy(zero_copy_only=False)
+        return result
+
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("format") != FORMAT_NAME:
+        raise ValueError(f"{path} is not a {FORMAT_NAME} directory")
+    rows = meta["rows"]
+    result = {}
+    for column in meta["columns"]:
+        name, kind = column["name"], column["kind"]
+        if columns is not None and name not in columns:
+            continue
+        data_path = os.path.join(path, f"{name}.bin")
+        if kind == "text":
+            ends = np.fromfile(os.path.join(path, f"{name}.offsets"), dtype="<i8")
+            with open(data_path, "rb") as f:
+                blob = f.read()
+            starts = np.concatenate(([0], ends[:-1]))
+            result[name] = np.array([blob[a:b].decode("utf-8") for a, b in zip(starts.tolist(), ends.tolist())], dtype=str)
+            continue
+        values = np.memmap(data_path, dtype=NUMPY_DTYPES[kind], mode="r", shape=(rows,)) if rows else np.empty(0, NUMPY_DTYPES[kind])
+        if kind == "time":
+            values = values.view("datetime64[us]")
+        elif kind == "category":
+            values = np.array(meta["dictionaries"][name], dtype=str)[values] if rows else np.empty(0, str)
+        result[name] = values
+    return result
@@ -9,17 +9,19 @@ OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
 # Model Configuration
 DEFAULT_MODEL = "gpt-4"  # Change to "gpt-4" if you have access
+INTENT_MODEL = os.getenv('INTENT_MODEL', 'gpt-4o-mini')  # must support structured outputs
 MAX_TOKENS = 500
 TEMPERATURE = 0.7
 
 CATEGORIES = ["COVID-19", "Climate and Weather", "Companies", "Crypto", "Economics", "Elections", "Education", "Entertainment", "Financials", "Health", "Mentions", "Politics", "Science and Technology", "Sports", "Social", "Transportation", "World"]
 
-EXTRACT_VOLUME_AND_SIDE_PROMPT = """You are Talk2Trade, an AI-powered trading assistant for the Kalshi platform. Extract the amount of contracts the user wants to trade and the side of the trade ('yes' or 'no'). Return the volume and side as an array of size two. For example, if the user's input is 'Buy 10 yes contracts that Trump will run for a third term', return [10, 'yes']. If no number is found, default to 1. If no side is found default to 'yes'."""
-
-TRIM_PROMPT = """Remove the volume and side from the user's input. Return the result as plain text. For example, if the user's input is 'Buy 10 yes contracts that Trump will run for a third term ', return 'Trump will run for a third term'."""
-
-CATEGORY_PROMPT = """Here is a list of categories that are currently available on the platform. The user's input is a trade they want to make on Kalshi.
-Use this list to return only the most relevant category(ies) for the user's input. Categories: """
+INTENT_PROMPT = """You are Talk2Trade, an AI-powered trading assistant for the Kalshi platform. The user's input is a trade they want to make on Kalshi. Extract:
+- volume: the number of contracts to trade. If no number is found, default to 1.
+- side: the side of the trade, 'yes' or 'no'. If no side is found, default to 'yes'.
+- action: 'buy' or 'sell'. If the user does not ask to sell, default to 'buy'.
+- query: the input with the volume, side and action removed, as plain text. For example, for 'Buy 10 yes contracts that Trump will run for a third term', return 'Trump will run for a third term'.
+- categories: only the most relevant category(ies) for the trade, chosen from this list: """ + ", ".join(CATEGORIES) + """
+- keywords: the key words of the query, in lowercase."""
 
 EVENTS_PROMPT = """Choose the single best event that is most relevant to the user's input based on titles. 
 The user's input is a trade they want to make on Kalshi. Return ONLY the ticker as plain text (no quotes, no JSON, no code blocks). If no event is found, return 'None'."""
@@ -44,6 +46,99 @@ KALSHI_DEMO_KEYID = os.getenv('DEMO_KEYID')
 KALSHI_DEMO_KEYFILE = os.getenv('DEMO_KEYFILE')
 KALSHI_PROD_KEYID = os.getenv('PROD_KEYID')
 KALSHI_PROD_KEYFILE = os.getenv('PROD_KEYFILE')
+# SQLite file shared by every worker process on a host (see gunicorn.conf.py): catalog responses and the
+# Kalshi rate-limit budget live there, and cached conversations are checked against CONVERSATION_DB.
+# Unset, each process keeps its own.
+SHARED_STATE = os.getenv('SHARED_STATE') or None
+
+# Override the exchange and OpenAI endpoints, e.g. to run against benchmarks/mock_exchange.py
+KALSHI_API_URL = os.getenv('KALSHI_API_URL') or None  # e.g. http://127.0.0.1:8765, used for orders and market data
+KALSHI_WS_URL = os.getenv('KALSHI_WS_URL') or None  # e.g. ws://127.0.0.1:8766
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL') or None  # e.g. http://127.0.0.1:8765/v1
+
+# Catalog cache refresh intervals, in seconds
+CATALOG_SERIES_TTL = int(os.getenv('CATALOG_SERIES_TTL', 3600))
+CATALOG_EVENTS_TTL = int(os.getenv('CATALOG_EVENTS_TTL', 60))
+
+# Concurrent upstream fetches
+KALSHI_TIMEOUT = float(os.getenv('KALSHI_TIMEOUT', 10))  # seconds per request
+FANOUT_MAX_WORKERS = int(os.getenv('FANOUT_MAX_WORKERS', 16))
+FANOUT_PER_HOST = int(os.getenv('FANOUT_PER_HOST', 8))
+
+# Pooled HTTP transport
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 32))  # keep-alive connections per host
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 3))
+HTTP2 = os.getenv('HTTP2', 'false').lower() == 'true'  # requires httpx[http2]
+SINGLE_FLIGHT = os.getenv('SINGLE_FLIGHT', 'true').lower() == 'true'  # concurrent identical Kalshi GETs share one request
+
+# Kalshi API budgets, in requests per second (Basic tier: 20 reads, 10 writes)
+KALSHI_READ_RATE = float(os.getenv('KALSHI_READ_RATE', 20))
+KALSHI_WRITE_RATE = float(os.getenv('KALSHI_WRITE_RATE', 10))
+KALSHI_READ_BURST = float(os.getenv('KALSHI_READ_BURST', 20))
+KALSHI_WRITE_BURST = float(os.getenv('KALSHI_WRITE_BURST', 10))
+
+# Order router
+ORDER_WORKERS = int(os.getenv('ORDER_WORKERS', 2))
+ORDER_BATCH_SIZE = int(os.getenv('ORDER_BATCH_SIZE', 20))
+ORDER_MAX_RETRIES = int(os.getenv('ORDER_MAX_RETRIES', 3))
+ORDER_ACK_TIMEOUT = float(os.getenv('ORDER_ACK_TIMEOUT', 10))  # seconds a chat stream stays open after the reply for the exchange's answer
+
+# Portfolio: balance, positions and open orders kept in memory for pre-trade checks (amounts in cents)
+PORTFOLIO_CHECKS = os.getenv('PORTFOLIO_CHECKS', 'true').lower() == 'true'  # check balance and exposure before each order
+PORTFOLIO_RECONCILE = float(os.getenv('PORTFOLIO_RECONCILE', 60))  # seconds between REST snapshots
+PORTFOLIO_FEED = os.getenv('PORTFOLIO_FEED', 'true').lower() == 'true'  # follow fills and positions over the WebSocket
+MAX_MARKET_EXPOSURE = int(os.getenv('MAX_MARKET_EXPOSURE', 0))  # cents held in one market by positions and open buys; 0 for no limit
+MAX_TOTAL_EXPOSURE = int(os.getenv('MAX_TOTAL_EXPOSURE', 0))  # cents held across all markets; 0 for no limit
+MIN_BALANCE = int(os.getenv('MIN_BALANCE', 0))  # cents every order must leave available
+
+# Whisper model server
+TRANSCRIPTION_WORKERS = int(os.getenv('TRANSCRIPTION_WORKERS', 1))  # model replicas
+TRANSCRIPTION_QUEUE = int(os.getenv('TRANSCRIPTION_QUEUE', 8))
+# Unix socket path or host:port of the model server; unset, a socket in a 0700 per-user directory under the temp dir.
+# The connection key comes from TRANSCRIPTION_AUTHKEY, or is generated per deployment and kept beside the socket;
+# a non-loopback host:port refuses to start without TRANSCRIPTION_AUTHKEY.
+TRANSCRIPTION_ADDRESS = os.getenv('TRANSCRIPTION_ADDRESS') or None
+
+# WebSocket market feed: raw frames allowed to wait for the decoder
+WS_QUEUE_SIZE = int(os.getenv('WS_QUEUE_SIZE', 10000))
+
+# Whisper model and startup behaviour
+WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'turbo')  # e.g. tiny, base, small, medium, turbo
+WHISPER_DEVICE = os.getenv('WHISPER_DEVICE') or None  # e.g. cpu, cuda; None lets Whisper choose
+STARTUP_MODE = os.getenv('STARTUP_MODE', 'background')  # 'background', 'lazy' (first use) or 'eager'
+
+# Async serving mode (python -m asgi): threads for catalog lookups and Flask-only routes
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 64))
+
+# Conversation history: SQLite file (empty keeps it in memory only) and the in-memory tier
+CONVERSATION_DB = os.getenv('CONVERSATION_DB', 'data/conversations.db')
+CONVERSATION_CACHE_SIZE = int(os.getenv('CONVERSATION_CACHE_SIZE', 10000))  # conversations kept in memory
+CONVERSATION_CACHE_MESSAGES = int(os.getenv('CONVERSATION_CACHE_MESSAGES', 200))  # latest messages kept per conversation
+CONVERSATION_TTL = float(os.getenv('CONVERSATION_TTL', 3600))  # seconds an idle conversation stays in memory
+CONVERSATION_PAGE_SIZE = int(os.getenv('CONVERSATION_PAGE_SIZE', 100))  # default page; requests may ask for up to 1000
+
+# OpenAI response cache: intent parses are kept LLM_CACHE_TTL seconds, event choices until the catalog refreshes
+LLM_CACHE_SIZE = int(os.getenv('LLM_CACHE_SIZE', 5000))  # 0 disables the cache
+LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', 86400))
+LLM_CACHE_SEMANTIC = os.getenv('LLM_CACHE_SEMANTIC', 'false').lower() == 'true'  # also match near-identical messages
+LLM_CACHE_SIMILARITY = float(os.getenv('LLM_CACHE_SIMILARITY', 0.9))
+PROMPT_VERSION = os.getenv('PROMPT_VERSION', '1')  # bump when INTENT_PROMPT or EVENTS_PROMPT changes
+
+# Intent: parse volume, side and action with rules and only ask INTENT_PROMPT when they are not confident
+INTENT_RULES = os.getenv('INTENT_RULES', 'true').lower() == 'true'
+
+# Event selection: match the request to events locally and only ask EVENTS_PROMPT when that is ambiguous
+EVENT_MATCHER = os.getenv('EVENT_MATCHER', 'embedding')  # 'embedding' or 'llm' (always ask the model)
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'hashing')  # or a sentence-transformers model, e.g. all-MiniLM-L6-v2
+EVENT_MATCH_MIN_SCORE = float(os.getenv('EVENT_MATCH_MIN_SCORE', 0.35))  # cosine similarity the best event needs
+EVENT_MATCH_MARGIN = float(os.getenv('EVENT_MATCH_MARGIN', 0.05))  # lead over the runner-up it needs
+EVENT_MATCH_TOP_K = int(os.getenv('EVENT_MATCH_TOP_K', 5))  # candidates sent to the model when ambiguous
+
+# Tracing: per-stage spans, histograms on /metrics and the recent traces on /api/traces
+TRACING = os.getenv('TRACING', 'true').lower() == 'true'
+TRACE_BUFFER = int(os.getenv('TRACE_BUFFER', 200))  # finished traces kept in memory
+PROFILER_INTERVAL = float(os.getenv('PROFILER_INTERVAL', 0.01))  # seconds between stack samples while the profiler runs
+PROFILER_START = os.getenv('PROFILER_START', 'false').lower() == 'true'  # sample from startup instead of waiting for POST /api/profiler
 
 # Flask Configuration
 FLASK_HOST = "0.0.0.0"
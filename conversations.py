@@ -0,0 +1,364 @@
+"""
+Conversation history storage.
+
+Messages are compact records (id, epoch seconds, role, content) instead of
+dicts with ISO timestamp strings. Each conversation numbers its messages
+from 0, so a page is addressed by the id of its first message and a client
+can tell there is older history whenever that id is above 0.
+
+MemoryStore keeps recent conversations in an LRU with a TTL and caps the
+messages kept per conversation. SQLiteStore keeps everything on disk and
+can be shared by several worker processes. TieredStore writes through to
+SQLite and serves recent pages from memory; when other processes write to
+the same file, it checks each cached conversation against SQLite's latest
+id before serving it.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+ROLES = ("user", "assistant", "system")
+_ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+
+
+class Message(NamedTuple):
+    id: int
+    ts: float
+    role: str
+    content: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "role": self.role,
+            "content": self.content,
+            "timestamp": datetime.fromtimestamp(self.ts).isoformat(),
+        }
+
+
+def _window(next_id: int, limit: int, before: Optional[int]) -> range:
+    """Ids of the `limit` messages before `before` (or the latest ones)."""
+    end = next_id if before is None else max(0, min(before, next_id))
+    return range(max(0, end - limit), end)
+
+
+class _Conversation:
+    __slots__ = ("messages", "next_id", "touched")
+
+    def __init__(self, max_messages: int, next_id: int = 0):
+        self.messages: Deque[Message] = deque(maxlen=max_messages)
+        self.next_id = next_id
+        self.touched = time.monotonic()
+
+    @property
+    def first_id(self) -> int:
+        return self.messages[0].id if self.messages else self.next_id
+
+
+class MemoryStore:
+    """Bounded in-memory conversation store.
+
+    Conversations are kept in least-recently-used order, so the ones idle
+    for longer than `ttl` are always at the front and expire in O(1). Only
+    the last `max_messages` messages of each conversation are kept.
+    """
+    def __init__(self, max_conversations: int = 10000, max_messages: int = 200, ttl: float = 3600):
+        """Initializes an empty store.
+
+        Args:
+            max_conversations (int): Conversations kept before the least recently used is evicted.
+            max_messages (int): Messages kept per conversation; older ones are dropped.
+            ttl (float): Seconds a conversation is kept without being read or written.
+        """
+        self.max_conversations = max_conversations
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self._conversations: "OrderedDict[str, _Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def _expire(self, now: float) -> None:
+        conversations = self._conversations
+        while conversations:
+            oldest = next(iter(conversations.values()))
+            if now - oldest.touched < self.ttl:
+                break
+            conversations.popitem(last=False)
+            self.expired += 1
+
+    def _get(self, conversation_id: str) -> Optional[_Conversation]:
+        now = time.monotonic()
+        self._expire(now)
+        conversation = self._conversations.get(conversation_id)
+        if conversation is not None:
+            conversation.touched = now
+            self._conversations.move_to_end(conversation_id)
+        return conversation
+
+    def _put(self, conversation_id: str, next_id: int = 0) -> _Conversation:
+        conversation = self._conversations[conversation_id] = _Conversation(self.max_messages, next_id)
+        while len(self._conversations) > self.max_conversations:
+            self._conversations.popitem(last=False)
+            self.evicted += 1
+        return conversation
+
+    def append(self, conversation_id: str, role: str, content: str, ts: Optional[float] = None) -> Message:
+        """Adds a message to the end of a conversation and returns it."""
+        with self._lock:
+            conversation = self._get(conversation_id) or self._put(conversation_id)
+            message = Message(conversation.next_id, time.time() if ts is None else ts, role, content)
+            conversation.messages.append(message)
+            conversation.next_id += 1
+        return message
+
+    def page(self, conversation_id: str, limit: int = 100, before: Optional[int] = None) -> List[Message]:
+        """Returns up to `limit` messages with ids below `before`, oldest first.
+
+        Messages that fell out of the per-conversation cap are gone, so the
+        page may be shorter than `limit` even though its first id is above 0.
+        """
+        with self._lock:
+            conversation = self._get(conversation_id)
+            if conversation is None:
+                self.misses += 1
+                return []
+            self.hits += 1
+            return self._slice(conversation, _window(conversation.next_id, limit, before))
+
+    @staticmethod
+    def _slice(conversation: _Conversation, ids: range) -> List[Message]:
+        first = conversation.first_id
+        start, stop = max(ids.start, first) - first, ids.stop - first
+        if stop <= start:
+            return []
+        messages = conversation.messages
+        return [messages[i] for i in range(start, stop)]
+
+    # Used by TieredStore, which keeps the durable copy
+
+    def cached_page(self, conversation_id: str, limit: int, before: Optional[int],
+                    next_id: Optional[int] = None) -> Optional[List[Message]]:
+        """Returns the page if every message in it is cached, else None.
+
+        A cached conversation whose next id differs from `next_id` (when given)
+        is out of date and is dropped.
+        """
+        with self._lock:
+            conversation = self._get(conversation_id)
+            if conversation is not None and next_id is not None and conversation.next_id != next_id:
+                del self._conversations[conversation_id]
+                conversation = None
+            if conversation is not None:
+                ids = _window(conversation.next_id, limit, before)
+                if ids.start >= conversation.first_id:
+                    self.hits += 1
+                    return self._slice(conversation, ids)
+            self.misses += 1
+            return None
+
+    def fill(self, conversation_id: str, messages: List[Message], next_id: int) -> None:
+        """Caches the latest messages of a conversation read from the durable tier."""
+        with self._lock:
+            conversation = self._put(conversation_id, next_id)
+            conversation.messages.extend(messages)
+
+    def extend(self, conversation_id: str, message: Message) -> None:
+        """Appends an already numbered message if the conversation is cached."""
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is not None and message.id == conversation.next_id:
+                conversation.messages.append(message)
+                conversation.next_id += 1
+            elif conversation is not None:
+                # Another writer got in between; reload on the next read.
+                del self._conversations[conversation_id]
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "conversations": len(self._conversations),
+                "messages": sum(len(c.messages) for c in self._conversations.values()),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
+
+
+class SQLiteStore:
+    """Durable conversation store in a single SQLite file.
+
+    Rows are clustered by (conversation_id, id), so a page is one range scan.
+    Each thread gets its own connection; WAL mode lets readers run while a
+    write is in progress, including from other processes. A trigger keeps
+    the conversation and message totals in a one-row table as messages are
+    inserted, by any process, so stats() does not count the table.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS messages (
+            conversation_id TEXT NOT NULL,
+            id INTEGER NOT NULL,
+            ts REAL NOT NULL,
+            role INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            PRIMARY KEY (conversation_id, id)
+        ) WITHOUT ROWID
+    """
+    TOTALS = (
+        "CREATE TABLE IF NOT EXISTS totals (key INTEGER PRIMARY KEY, conversations INTEGER NOT NULL, "
+        "messages INTEGER NOT NULL)",
+        # Counted once, when the table is new; a database from before it had none
+        "INSERT OR IGNORE INTO totals SELECT 0, COUNT(DISTINCT conversation_id), COUNT(*) FROM messages",
+        "CREATE TRIGGER IF NOT EXISTS count_message AFTER INSERT ON messages BEGIN "
+        "UPDATE totals SET conversations = conversations + (NEW.id = 0), messages = messages + 1 WHERE key = 0; END",
+    )
+
+    def __init__(self, path: str):
+        """Opens (and creates if needed) the database.
+
+        Args:
+            path (str): Database file; its directory is created if missing.
+        """
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        # One write transaction, so no insert lands between counting and the trigger
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(self.SCHEMA)
+            for statement in self.TOTALS:
+                conn.execute(statement)
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, conversation_id: str, role: str, content: str, ts: Optional[float] = None) -> Message:
+        """Adds a message to the end of a conversation and returns it."""
+        ts = time.time() if ts is None else ts
+        with self._connection() as conn:
+            # Numbering inside the INSERT keeps ids gapless with concurrent writers.
+            message_id, = conn.execute(
+                "INSERT INTO messages (conversation_id, id, ts, role, content) "
+                "SELECT ?, COALESCE(MAX(id) + 1, 0), ?, ?, ? FROM messages WHERE conversation_id = ? "
+                "RETURNING id",
+                (conversation_id, ts, _ROLE_CODES[role], content, conversation_id),
+            ).fetchall()[0]
+        return Message(message_id, ts, role, content)
+
+    def page(self, conversation_id: str, limit: int = 100, before: Optional[int] = None) -> List[Message]:
+        """Returns up to `limit` messages with ids below `before`, oldest first."""
+        rows = self._connection().execute(
+            "SELECT id, ts, role, content FROM messages WHERE conversation_id = ? AND id < ? "
+            "ORDER BY id DESC LIMIT ?",
+            (conversation_id, (1 << 62) if before is None else before, limit),
+        ).fetchall()
+        return [Message(i, ts, ROLES[role], content) for i, ts, role, content in reversed(rows)]
+
+    def next_id(self, conversation_id: str) -> int:
+        """Returns the id the conversation's next message will get."""
+        (last,), = self._connection().execute(
+            "SELECT MAX(id) FROM messages WHERE conversation_id = ?", (conversation_id,)).fetchall()
+        return 0 if last is None else last + 1
+
+    def stats(self) -> Dict[str, Any]:
+        (conversations, messages), = self._connection().execute(
+            "SELECT conversations, messages FROM totals WHERE key = 0").fetchall()
+        return {
+            "path": self.path,
+            "conversations": conversations,
+            "messages": messages,
+            "bytes": os.path.getsize(self.path),
+        }
+
+
+class TieredStore:
+    """SQLiteStore with a MemoryStore in front for recent pages.
+
+    Writes go to SQLite first and are then appended to the cached copy, if
+    the conversation is cached. Reads that the cached tail can answer never
+    touch SQLite; a miss reads the latest page and caches it.
+    """
+    def __init__(self, memory: MemoryStore, durable: SQLiteStore, shared: bool = False):
+        """Initializes the store.
+
+        Args:
+            memory (MemoryStore): Cache of each conversation's latest messages.
+            durable (SQLiteStore): Store of every message.
+            shared (bool): Other processes write to `durable` too, so check cached pages against it.
+        """
+        self.memory = memory
+        self.durable = durable
+        self.shared = shared
+        # Orders a miss's read-then-fill against concurrent appends.
+        self._lock = threading.Lock()
+
+    def append(self, conversation_id: str, role: str, content: str, ts: Optional[float] = None) -> Message:
+        """Adds a message to the end of a conversation and returns it."""
+        with self._lock:
+            message = self.durable.append(conversation_id, role, content, ts)
+            self.memory.extend(conversation_id, message)
+        return message
+
+    def page(self, conversation_id: str, limit: int = 100, before: Optional[int] = None) -> List[Message]:
+        """Returns up to `limit` messages with ids below `before`, oldest first."""
+        # When shared, one indexed MAX(id) lookup stands in for reading the page
+        next_id = self.durable.next_id(conversation_id) if self.shared else None
+        messages = self.memory.cached_page(conversation_id, limit, before, next_id)
+        if messages is not None:
+            return messages
+        if before is not None:
+            # Older history is read straight from disk and not cached.
+            return self.durable.page(conversation_id, limit, before)
+        with self._lock:
+            latest = self.durable.page(conversation_id, max(limit, self.memory.max_messages))
+            self.memory.fill(conversation_id, latest, latest[-1].id + 1 if latest else 0)
+        return latest[-limit:] if limit else []
+
+    def stats(self) -> Dict[str, Any]:
+        return {"memory": self.memory.stats(), "durable": self.durable.stats()}
+
+
+def open_store(
+    path: Optional[str] = None,
+    max_conversations: int = 10000,
+    max_messages: int = 200,
+    ttl: float = 3600,
+    shared: bool = False,
+):
+    """Returns a TieredStore backed by `path`, or a MemoryStore if no path is given.
+
+    Args:
+        path (str): SQLite database file; empty or None keeps history in memory only.
+        max_conversations (int): Conversations kept in memory.
+        max_messages (int): Messages kept in memory per conversation.
+        ttl (float): Seconds an idle conversation stays in memory.
+        shared (bool): Several processes use `path`; requires a path.
+    """
+    memory = MemoryStore(max_conversations, max_messages, ttl)
+    if not path:
+        if shared:
+            raise ValueError("A shared conversation store needs a database path")
+        return memory
+    return TieredStore(memory, SQLiteStore(path), shared)
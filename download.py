@@ -0,0 +1,94 @@
+"""
+Bulk market-data downloader: follows Kalshi's cursors and streams every
+trade, market, event or series matching the filters to a columnar file.
+
+The next page is fetched while the current one is written, and at most one
+batch of records is held in memory, so a full trade tape can be pulled
+with bounded memory. The output is Parquet when pyarrow is installed, and
+otherwise a directory of raw NumPy columns (see columnar.py).
+
+Market data is public, so no key is needed; PROD_KEYID and PROD_KEYFILE
+are used when set.
+
+Run from the repository root:
+    python -m download trades --ticker KXFEDDECISION-25DEC-H0 --out data/trades
+    python -m download markets --status open --out data/markets.parquet
+"""
+import argparse
+import os
+import time
+
+from cryptography.hazmat.primitives import serialization
+from dotenv import load_dotenv
+
+from clients import Environment, KalshiHttpClient, KalshiTransport
+from columnar import EVENT_COLUMNS, MARKET_COLUMNS, SERIES_COLUMNS, TRADE_COLUMNS, ColumnarWriter
+from config import HTTP_MAX_RETRIES, KALSHI_READ_BURST, KALSHI_READ_RATE, KALSHI_TIMEOUT, KALSHI_WRITE_BURST, KALSHI_WRITE_RATE
+from ratelimit import RateLimiter
+
+COLUMNS = {"trades": TRADE_COLUMNS, "markets": MARKET_COLUMNS, "events": EVENT_COLUMNS, "series": SERIES_COLUMNS}
+
+
+def make_client(host=None):
+    """A production market-data client, signing only if a key is configured."""
+    load_dotenv()
+    key_id, key_file = os.getenv('PROD_KEYID'), os.getenv('PROD_KEYFILE')
+    private_key = None
+    if key_file:
+        with open(key_file, "rb") as f:
+            private_key = serialization.load_pem_private_key(f.read(), password=None)
+    client = KalshiHttpClient(
+        key_id=key_id,
+        private_key=private_key,
+        environment=Environment.PROD,
+        transport=KalshiTransport(max_retries=HTTP_MAX_RETRIES, timeout=KALSHI_TIMEOUT),
+        rate_limiter=RateLimiter(KALSHI_READ_RATE, KALSHI_WRITE_RATE, KALSHI_READ_BURST, KALSHI_WRITE_BURST),
+    )
+    if host:
+        client.host = host
+    return client
+
+
+def records(client, args):
+    """The record iterator for the requested kind and filters."""
+    if args.kind == "trades":
+        return client.iter_trades(ticker=args.ticker, min_ts=args.min_ts, max_ts=args.max_ts, prefetch=args.prefetch)
+    if args.kind == "markets":
+        return client.iter_markets(event_ticker=args.event_ticker, series_ticker=args.series_ticker, status=args.status,
+                                   prefetch=args.prefetch)
+    if args.kind == "events":
+        return client.iter_events(series_ticker=args.series_ticker, status=args.status, prefetch=args.prefetch)
+    return client.iter_series(category=args.category)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=sorted(COLUMNS))
+    parser.add_argument("--out", required=True, help="output .parquet file or NumPy column directory")
+    parser.add_argument("--format", choices=["auto", "parquet", "numpy"], default="auto")
+    parser.add_argument("--ticker", help="trades of one market")
+    parser.add_argument("--event-ticker")
+    parser.add_argument("--series-ticker")
+    parser.add_argument("--category", help="series category")
+    parser.add_argument("--status", help="e.g. open, closed, settled")
+    parser.add_argument("--min-ts", type=int, help="trades at or after this Unix time")
+    parser.add_argument("--max-ts", type=int, help="trades at or before this Unix time")
+    parser.add_argument("--batch-rows", type=int, default=65536, help="records per written batch")
+    parser.add_argument("--no-prefetch", dest="prefetch", action="store_false", help="fetch pages strictly one after another")
+    parser.add_argument("--host", help="API host, e.g. a local mock exchange")
+    args = parser.parse_args()
+
+    client = make_client(args.host)
+    start = time.perf_counter()
+    with ColumnarWriter(args.out, COLUMNS[args.kind], args.batch_rows, args.format) as writer:
+        for count, record in enumerate(records(client, args), 1):
+            writer.write(record)
+            if count % 100000 == 0:
+                print(f"{count} {args.kind}...")
+    elapsed = time.perf_counter() - start
+    print(f"{writer.rows} {args.kind} written to {args.out} ({writer.format}) in {elapsed:.1f}s, "
+          f"{writer.rows / max(elapsed, 1e-9):.0f} records/s")
+
+
+if __name__ == "__main__":
+    main()
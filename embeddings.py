@@ -0,0 +1,90 @@
+"""
+Local text embeddings that need no model download or network call.
+
+Texts are embedded by feature hashing of their words and character
+trigrams into a fixed number of dimensions, then L2-normalized, so the dot
+product of two embeddings is their cosine similarity. This captures
+lexical closeness (shared words, typos, word order changes), which is what
+near-duplicate trade requests and event titles have in common.
+"""
+import re
+import zlib
+from typing import FrozenSet, Iterable, List, Union
+
+import numpy as np
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbedder:
+    """Feature-hashing embedder over words and character trigrams."""
+    def __init__(self, dim: int = 1024, ngram: int = 3, word_weight: float = 2.0, stopwords: FrozenSet[str] = frozenset()):
+        """Initializes the embedder.
+
+        Args:
+            dim (int): Embedding dimensions; more means fewer hash collisions.
+            ngram (int): Character n-gram length.
+            word_weight (float): Weight of whole words relative to n-grams.
+            stopwords (FrozenSet[str]): Words left out of the embedding.
+        """
+        self.dim = dim
+        self.ngram = ngram
+        self.word_weight = word_weight
+        self.stopwords = stopwords
+        self._cache = {}
+
+    def _features(self, word: str) -> List[int]:
+        features = self._cache.get(word)
+        if features is None:
+            padded = f"<{word}>"
+            grams = [padded[i:i + self.ngram] for i in range(max(1, len(padded) - self.ngram + 1))]
+            features = [zlib.crc32(g.encode()) % self.dim for g in grams]
+            if len(self._cache) < 100000:
+                self._cache[word] = features
+        return features
+
+    def embed(self, texts: Iterable[str]) -> np.ndarray:
+        """Returns one normalized float32 row per text."""
+        texts = list(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            vector = vectors[row]
+            for word in WORD_RE.findall(text.lower()):
+                if word in self.stopwords:
+                    continue
+                vector[zlib.crc32(word.encode()) % self.dim] += self.word_weight
+                for feature in self._features(word):
+                    vector[feature] += 1.0
+        # Sublinear term frequency keeps a repeated word from dominating.
+        np.log1p(vectors, out=vectors)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+        return vectors
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+
+class SentenceEmbedder:
+    """A sentence-transformers model run on the CPU, for semantic rather than lexical matches."""
+    def __init__(self, model: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: Iterable[str]) -> np.ndarray:
+        return self.model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+
+def load_embedder(model: str = "hashing", stopwords: FrozenSet[str] = frozenset()) -> Union[HashingEmbedder, SentenceEmbedder]:
+    """Returns the hashing embedder, or a sentence-transformers model if one is named and installed."""
+    if model != "hashing":
+        try:
+            return SentenceEmbedder(model)
+        except ImportError:
+            print(f"sentence-transformers is not installed; using hashed embeddings instead of {model}")
+    return HashingEmbedder(stopwords=stopwords)
@@ -0,0 +1,136 @@
+"""
+Vector index of open events for matching a trade request without the LLM.
+
+Each event is embedded once from its title, subtitle and market titles,
+and only re-embedded when that text changes on a catalog refresh. A match
+is a single matrix-vector product over the shortlisted events; the LLM is
+only asked when the best match is weak or too close to the runner-up.
+"""
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+
+class EventMatch(NamedTuple):
+    event_ticker: str
+    score: float
+
+
+class _Snapshot:
+    """Immutable view of the index, swapped atomically on update."""
+    __slots__ = ("vectors", "tickers", "row_of", "texts")
+
+    def __init__(self, vectors: np.ndarray, tickers: List[str], texts: Dict[str, str]):
+        self.vectors = vectors
+        self.tickers = tickers
+        self.row_of = {ticker: row for row, ticker in enumerate(tickers)}
+        self.texts = texts
+
+
+class EventIndex:
+    """Embeddings of every open event, for cosine top-k retrieval."""
+    def __init__(self, embedder: Any, min_score: float = 0.35, margin: float = 0.05):
+        """Initializes an empty index.
+
+        Args:
+            embedder: Object with embed(texts) returning L2-normalized rows and a `dim`.
+            min_score (float): Cosine similarity the best match needs to be trusted.
+            margin (float): Lead over the second best match needed to be trusted.
+        """
+        self.embedder = embedder
+        self.min_score = min_score
+        self.margin = margin
+        self._snapshot = _Snapshot(np.zeros((0, embedder.dim), dtype=np.float32), [], {})
+        self._lock = threading.Lock()
+        self.updates = 0
+        self.embedded = 0
+        self.searches = 0
+        self.confident = 0
+
+    @staticmethod
+    def document(event: Dict[str, Any], markets: Iterable[Dict[str, Any]]) -> str:
+        """Text embedded for an event: its titles and the distinct titles of its markets."""
+        parts = [event.get("title", ""), event.get("sub_title", "")]
+        for market in markets:
+            parts += [market.get("title", ""), market.get("yes_sub_title", "")]
+        return " ".join(dict.fromkeys(p for p in parts if p))
+
+    def update(self, events: Dict[str, Dict[str, Any]], markets_by_event: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Replaces the indexed events, embedding only new or changed ones.
+
+        Args:
+            events (Dict): Open events by ticker.
+            markets_by_event (Dict): Markets of each event.
+        """
+        with self._lock:
+            old = self._snapshot
+            texts = {ticker: self.document(event, markets_by_event.get(ticker, ())) for ticker, event in events.items()}
+            tickers = list(texts)
+            vectors = np.empty((len(tickers), self.embedder.dim), dtype=np.float32)
+            kept, changed = [], []
+            for row, ticker in enumerate(tickers):
+                (kept if old.texts.get(ticker) == texts[ticker] else changed).append(row)
+            if kept:
+                vectors[kept] = old.vectors[[old.row_of[tickers[row]] for row in kept]]
+            if changed:
+                vectors[changed] = self.embedder.embed(texts[tickers[row]] for row in changed)
+            self._snapshot = _Snapshot(vectors, tickers, texts)
+            self.updates += 1
+            self.embedded += len(changed)
+
+    def search(self, query: str, candidates: Optional[Sequence[Sequence[str]]] = None, k: int = 5) -> List[EventMatch]:
+        """Returns the k events closest to the query, best first.
+
+        Args:
+            query (str): The trade request.
+            candidates (Sequence): [title, event_ticker] pairs to rank, e.g. the
+                shortlisted events; all indexed events if omitted. Candidates
+                the index has not seen yet are embedded from their title.
+            k (int): Matches to return.
+        """
+        snapshot = self._snapshot
+        vector = self.embedder.embed([query])[0]
+        if candidates is None:
+            matrix, tickers = snapshot.vectors, snapshot.tickers
+        else:
+            rows, tickers, missing = [], [], []
+            for title, ticker in candidates:
+                row = snapshot.row_of.get(ticker)
+                if row is None:
+                    missing.append((title, ticker))
+                else:
+                    rows.append(row)
+                    tickers.append(ticker)
+            matrix = snapshot.vectors[rows]
+            if missing:
+                matrix = np.vstack([matrix, self.embedder.embed(title for title, _ in missing)])
+                tickers += [ticker for _, ticker in missing]
+        self.searches += 1
+        if not tickers:
+            return []
+        scores = matrix @ vector
+        top = np.argpartition(-scores, k)[:k] if len(tickers) > k else np.arange(len(tickers))
+        top = top[np.argsort(-scores[top])]
+        return [EventMatch(tickers[i], float(scores[i])) for i in top]
+
+    def choose(self, matches: List[EventMatch]) -> Optional[str]:
+        """Returns the best match's ticker if it is clear-cut, or None if the LLM should decide."""
+        if not matches or matches[0].score < self.min_score:
+            return None
+        if len(matches) > 1 and matches[0].score - matches[1].score < self.margin:
+            return None
+        self.confident += 1
+        return matches[0].event_ticker
+
+    def __len__(self) -> int:
+        return len(self._snapshot.tickers)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "events": len(self),
+            "updates": self.updates,
+            "embedded": self.embedded,
+            "searches": self.searches,
+            "confident_rate": self.confident / self.searches if self.searches else 0.0,
+        }
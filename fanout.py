@@ -0,0 +1,78 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+class FanOut:
+    """Runs independent upstream calls concurrently on a bounded thread pool.
+
+    Calls to the same host share a semaphore so a burst of fetches cannot
+    exceed the per-host limit, and a failed or slow call only loses its own
+    result instead of stalling or failing the whole batch.
+    """
+    def __init__(self, max_workers: int = 16, per_host: int = 8, timeout: float = 10.0):
+        """Initializes the pool.
+
+        Args:
+            max_workers (int): Threads shared by every fan-out.
+            per_host (int): Maximum in-flight calls per host.
+            timeout (float): Default seconds to wait for a whole batch.
+        """
+        self.per_host = per_host
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fanout")
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+        self._hosts_lock = threading.Lock()
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self._hosts[host]
+
+    def map(
+        self,
+        fn: Callable[[K], T],
+        items: Iterable[K],
+        host: str = "default",
+        timeout: Optional[float] = None,
+    ) -> Tuple[Dict[K, T], Dict[K, Exception]]:
+        """Calls fn on every item concurrently.
+
+        Args:
+            fn (Callable): Function applied to each item.
+            items (Iterable): Distinct, hashable inputs.
+            host (str): Host the calls go to, for the per-host limit.
+            timeout (float): Seconds to wait for the batch; unfinished calls are reported as TimeoutError.
+
+        Returns:
+            Tuple[Dict, Dict]: Results and exceptions, both keyed by item.
+        """
+        semaphore = self._semaphore(host)
+
+        def call(item):
+            with semaphore:
+                return fn(item)
+
+        futures = {self._pool.submit(call, item): item for item in dict.fromkeys(items)}
+        done, pending = wait(futures, timeout=self.timeout if timeout is None else timeout)
+
+        results: Dict[K, T] = {}
+        errors: Dict[K, Exception] = {}
+        for future in done:
+            item = futures[future]
+            try:
+                results[item] = future.result()
+            except Exception as e:
+                errors[item] = e
+        for future in pending:
+            future.cancel()
+            errors[futures[future]] = TimeoutError(f"{host} call for {futures[future]!r} timed out")
+        return results, errors
+
+    def shutdown(self) -> None:
+        """Stops the worker threads once queued calls finish."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
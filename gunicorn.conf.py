@@ -0,0 +1,48 @@
+"""
+Gunicorn settings for serving app.py from several worker processes:
+    gunicorn -c gunicorn.conf.py app:app
+
+Workers share conversation history, catalog responses, the Kalshi
+rate-limit budget and the balance held by orders they have placed through
+the SHARED_STATE SQLite file, and one Whisper
+model server (transcription.py). Set WEB_CONCURRENCY to the number of
+workers and GUNICORN_THREADS to the requests each one serves at a time.
+"""
+import os
+
+# Set before any worker imports config.py
+os.environ.setdefault("SHARED_STATE", "data/shared.db")
+# Each worker warms its own resources after the fork rather than in the master
+os.environ.setdefault("STARTUP_MODE", "background")
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5001")
+workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 16))
+# Audio requests wait on the shared model server, which can take a while under load
+timeout = 120
+graceful_timeout = 30
+# Sockets, threads and SQLite connections must be created after the fork, so the app is not preloaded
+preload_app = False
+accesslog = None
+
+
+def on_starting(server):
+    # One Whisper model server for every worker, owned by the master so worker restarts do not reload the model
+    from config import TRANSCRIPTION_ADDRESS, TRANSCRIPTION_QUEUE, TRANSCRIPTION_WORKERS, WHISPER_DEVICE, WHISPER_MODEL
+    from transcription import TranscriptionService
+
+    if os.getenv("GUNICORN_WHISPER", "true").lower() == "true":
+        service = TranscriptionService(WHISPER_MODEL, WHISPER_DEVICE, TRANSCRIPTION_WORKERS, TRANSCRIPTION_QUEUE,
+                                       TRANSCRIPTION_ADDRESS, spawn_server=False)
+        server.whisper = service.start_server()
+        # Wait until it listens, so no worker finds the socket missing and starts a second one
+        service.warm()
+        service.shutdown()
+
+
+def on_exit(server):
+    whisper = getattr(server, "whisper", None)
+    if whisper is not None:
+        whisper.terminate()
+        whisper.wait()
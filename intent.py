@@ -0,0 +1,106 @@
+import json
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from config import CATEGORIES, INTENT_MODEL, INTENT_PROMPT
+from search import tokenize
+from trade_parser import parse_trade
+
+INTENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "volume": {"type": "integer"},
+        "side": {"type": "string", "enum": ["yes", "no"]},
+        "action": {"type": "string", "enum": ["buy", "sell"]},
+        "query": {"type": "string"},
+        "categories": {"type": "array", "items": {"type": "string", "enum": CATEGORIES}},
+        "keywords": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["volume", "side", "action", "query", "categories", "keywords"],
+    "additionalProperties": False,
+}
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "trade_intent", "strict": True, "schema": INTENT_SCHEMA},
+}
+
+
+class IntentParseError(ValueError):
+    """Raised when the model's intent response does not match INTENT_SCHEMA."""
+
+
+class TradeIntent(NamedTuple):
+    """A trade request as understood from the user's message."""
+    volume: int
+    side: str
+    query: str
+    categories: List[str]
+    keywords: List[str]
+    action: str = "buy"
+
+
+def validate_intent(data: Dict[str, Any]) -> TradeIntent:
+    """Checks a decoded intent against INTENT_SCHEMA and normalizes it."""
+    if not isinstance(data, dict):
+        raise IntentParseError(f"Expected a JSON object, got {type(data).__name__}")
+    missing = [k for k in INTENT_SCHEMA["required"] if k not in data]
+    if missing:
+        raise IntentParseError(f"Intent is missing {', '.join(missing)}")
+
+    volume = data["volume"]
+    if isinstance(volume, bool) or not isinstance(volume, int) or volume < 1:
+        raise IntentParseError(f"Invalid volume: {volume!r}")
+    side = str(data["side"]).strip().lower()
+    if side not in ("yes", "no"):
+        raise IntentParseError(f"Invalid side: {data['side']!r}")
+    action = str(data["action"]).strip().lower()
+    if action not in ("buy", "sell"):
+        raise IntentParseError(f"Invalid action: {data['action']!r}")
+    if not isinstance(data["categories"], list) or not isinstance(data["keywords"], list):
+        raise IntentParseError("categories and keywords must be lists")
+
+    categories = [c for c in data["categories"] if c in CATEGORIES]
+    keywords = [str(k).strip().lower() for k in data["keywords"] if str(k).strip()]
+    return TradeIntent(volume, side, str(data["query"]).strip(), categories, keywords, action)
+
+
+def _request(message: str, model: str) -> Dict[str, Any]:
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": INTENT_PROMPT},
+            {"role": "user", "content": message}
+        ],
+        "response_format": RESPONSE_FORMAT,
+        "temperature": 0,
+    }
+
+
+def _decode(response: Any) -> TradeIntent:
+    content = response.choices[0].message.content
+    try:
+        data = json.loads(content)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise IntentParseError(f"Intent response is not valid JSON: {content!r}") from e
+    return validate_intent(data)
+
+
+def rule_intent(message: str) -> Optional[TradeIntent]:
+    """Parses the intent without the LLM, or returns None if the rules are not confident.
+
+    Categories are not inferred, so every category is searched.
+    """
+    parsed = parse_trade(message)
+    if not parsed.confident:
+        return None
+    return TradeIntent(parsed.volume, parsed.side, parsed.query, list(CATEGORIES), tokenize(parsed.query), parsed.action)
+
+
+def parse_intent(client, message: str, model: str = INTENT_MODEL) -> TradeIntent:
+    """Extracts volume, side, trimmed query, categories and keywords in one call."""
+    return _decode(client.chat.completions.create(**_request(message, model)))
+
+
+async def parse_intent_async(client, message: str, model: str = INTENT_MODEL) -> TradeIntent:
+    """parse_intent for an AsyncOpenAI client."""
+    return _decode(await client.chat.completions.create(**_request(message, model)))
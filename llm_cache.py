@@ -0,0 +1,356 @@
+"""
+Response cache for OpenAI chat completions.
+
+A request is keyed on its model, prompt version, parameters and messages,
+with the user's message normalized (case, whitespace, trailing
+punctuation), so a repeated trade request skips the model entirely.
+
+The optional semantic tier also answers requests whose user message is
+merely close to a cached one, e.g. a reworded or misspelled request. It
+only compares requests with an identical context (system prompts, event
+candidates, parameters), and both messages must agree on their guard
+tokens: every quantity, whether written as digits or words ("10", "ten",
+"twenty-five", "a dozen"), every ordinal ("3rd", "third"), the
+yes/no/buy/sell words, negations and comparison words ("fewer", "at
+least", "over"). So "buy 10 yes" cannot be answered with the intent of
+"buy 100 no", nor "ten ... third term" with "twenty ... fourth term".
+"""
+import hashlib
+import inspect
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+try:
+    import numpy as np
+    from embeddings import HashingEmbedder
+except ImportError:  # the exact tier works without NumPy
+    np = None
+
+SPACE_RE = re.compile(r"\s+")
+WORD_RE = re.compile(r"\d[\d,]*(?:\.\d+)?(?:st|nd|rd|th|k)?\b|[a-z]+(?:'[a-z]+)?")
+GUARD_WORDS = frozenset(
+    "yes no buy sell not don't dont never won't wont without "
+    "fewer less more most least over under above below exactly than max min maximum minimum within "
+    "before after until".split()
+)
+UNITS = {"zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+         "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14, "fifteen": 15, "sixteen": 16,
+         "seventeen": 17, "eighteen": 18, "nineteen": 19, "dozen": 12}
+TENS = {"twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90}
+SCALES = {"hundred": 100, "thousand": 1000, "million": 1000000, "billion": 1000000000, "trillion": 1000000000000}
+ORDINALS = {"first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5, "sixth": 6, "seventh": 7, "eighth": 8,
+            "ninth": 9, "tenth": 10, "eleventh": 11, "twelfth": 12, "thirteenth": 13, "fourteenth": 14,
+            "fifteenth": 15, "sixteenth": 16, "seventeenth": 17, "eighteenth": 18, "nineteenth": 19,
+            "twentieth": 20, "thirtieth": 30, "fortieth": 40, "fiftieth": 50, "hundredth": 100, "last": -1}
+
+
+def normalize(text: str) -> str:
+    """Lowercases, collapses whitespace and strips trailing punctuation."""
+    return SPACE_RE.sub(" ", text.lower()).strip().rstrip(".!?")
+
+
+def _digits(word: str) -> str:
+    # 1,000 and 1000 are one quantity, and so are 10k and 10000
+    number = word.replace(",", "")
+    if number.endswith("k"):
+        return str(int(float(number[:-1]) * 1000)) if number[:-1].replace(".", "", 1).isdigit() else number
+    return number
+
+
+def guard_tokens(text: str) -> FrozenSet[str]:
+    """Tokens two messages must share for a semantic match.
+
+    Quantities become "n:<value>" and ordinals "ord:<value>" whether they
+    are written in digits or words; trade, negation and comparison words
+    are kept as they are.
+    """
+    tokens = set()
+    value, current, spelled = 0, 0, False
+
+    def flush() -> None:
+        nonlocal value, current, spelled
+        if spelled:
+            tokens.add(f"n:{value + current}")
+        value, current, spelled = 0, 0, False
+
+    for word in WORD_RE.findall(text.lower()):
+        if word in UNITS or word in TENS:
+            current += UNITS.get(word, 0) + TENS.get(word, 0)
+            spelled = True
+        elif word in SCALES and spelled:
+            current = max(current, 1) * SCALES[word]
+            if SCALES[word] >= 1000:
+                value, current = value + current, 0
+        elif word == "and" and spelled:
+            continue  # one hundred and five
+        elif word in ORDINALS:
+            # "twenty first" is the 21st
+            tokens.add(f"ord:{value + current + ORDINALS[word] if ORDINALS[word] > 0 else -1}")
+            value, current, spelled = 0, 0, False
+        else:
+            flush()
+            if word[0].isdigit():
+                if word[-2:] in ("st", "nd", "rd", "th"):
+                    tokens.add(f"ord:{_digits(word[:-2])}")
+                else:
+                    tokens.add(f"n:{_digits(word)}")
+            elif word in GUARD_WORDS:
+                tokens.add(word)
+    flush()
+    return frozenset(tokens)
+
+
+def _digest(value: Any) -> str:
+    return hashlib.blake2b(json.dumps(value, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "cost", "context", "guard", "row")
+
+    def __init__(self, value: Any, expires_at: float, cost: float, context: str, guard: FrozenSet[str]):
+        self.value = value
+        self.expires_at = expires_at
+        self.cost = cost
+        self.context = context
+        self.guard = guard
+        self.row = -1
+
+
+class _SemanticIndex:
+    """Embeddings of the cached user messages sharing one context."""
+    def __init__(self, dim: int):
+        self.vectors = np.zeros((16, dim), dtype=np.float32)
+        self.keys: List[Optional[str]] = []
+        self.live = 0
+
+    def add(self, key: str, vector: "np.ndarray") -> int:
+        if len(self.keys) == len(self.vectors):
+            self.vectors = np.concatenate([self.vectors, np.zeros_like(self.vectors)])
+        self.vectors[len(self.keys)] = vector
+        self.keys.append(key)
+        self.live += 1
+        return len(self.keys) - 1
+
+    def remove(self, row: int) -> None:
+        self.keys[row] = None
+        self.live -= 1
+
+    def compact(self) -> List[Tuple[int, str]]:
+        """Drops removed rows; returns the new (row, key) of every live one."""
+        rows = [i for i, key in enumerate(self.keys) if key is not None]
+        self.vectors = self.vectors[rows].copy() if rows else self.vectors[:16]
+        self.keys = [self.keys[i] for i in rows]
+        return list(enumerate(self.keys))
+
+    def search(self, vector: "np.ndarray", k: int = 4) -> List[Tuple[float, str]]:
+        n = len(self.keys)
+        scores = self.vectors[:n] @ vector
+        top = np.argpartition(-scores, k)[:k] if n > k else np.arange(n)
+        return [(float(scores[i]), self.keys[i]) for i in sorted(top, key=lambda i: -scores[i]) if self.keys[i]]
+
+
+class LLMCache:
+    """LRU cache of chat completion responses with per-entry expiry.
+
+    Use view() to get a client whose chat.completions.create() goes through
+    the cache; everything else about the client is unchanged.
+    """
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        ttl: float = 86400,
+        version: str = "1",
+        semantic: bool = False,
+        similarity: float = 0.9,
+    ):
+        """Initializes an empty cache.
+
+        Args:
+            max_entries (int): Responses kept before the least recently used is evicted.
+            ttl (float): Default seconds a response stays valid.
+            version (str): Prompt version; changing it invalidates every entry.
+            semantic (bool): Also match near-identical user messages (needs NumPy).
+            similarity (float): Cosine similarity a semantic match needs.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = version
+        self.similarity = similarity
+        self.embedder = HashingEmbedder() if semantic and np is not None else None
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._indexes: Dict[str, _SemanticIndex] = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.saved_seconds = 0.0
+        self.model_seconds = 0.0
+
+    def keys(self, request: Dict[str, Any]) -> Tuple[str, str, str]:
+        """Returns the request's (exact key, context key, normalized user message)."""
+        messages = request.get("messages", [])
+        last = len(messages) - 1
+        while last >= 0 and messages[last].get("role") != "user":
+            last -= 1
+        text = normalize(messages[last]["content"]) if last >= 0 else ""
+        context = _digest([self.version, {k: v for k, v in request.items() if k != "messages"},
+                           [m for i, m in enumerate(messages) if i != last]])
+        return _digest([context, text]), context, text
+
+    def _unlink(self, key: str, entry: _Entry) -> None:
+        del self._entries[key]
+        if entry.row >= 0:
+            index = self._indexes[entry.context]
+            index.remove(entry.row)
+            if not index.live:
+                del self._indexes[entry.context]
+            elif len(index.keys) > 2 * index.live + 64:
+                for row, key in index.compact():
+                    self._entries[key].row = row
+
+    def _lookup(self, key: str, context: str, text: str, now: float) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry
+            self._unlink(key, entry)
+            self.expired += 1
+        if self.embedder is not None and context in self._indexes:
+            guard = guard_tokens(text)
+            for score, match in self._indexes[context].search(self.embedder.embed_one(text)):
+                if score < self.similarity:
+                    break
+                entry = self._entries[match]
+                if entry.guard == guard and entry.expires_at > now:
+                    self._entries.move_to_end(match)
+                    self.semantic_hits += 1
+                    return entry
+        self.misses += 1
+        return None
+
+    def get(self, request: Dict[str, Any]) -> Optional[Any]:
+        """Returns the cached response for a request, or None."""
+        key, context, text = self.keys(request)
+        with self._lock:
+            entry = self._lookup(key, context, text, time.time())
+            if entry is None:
+                return None
+            self.saved_seconds += entry.cost
+            return entry.value
+
+    def put(self, request: Dict[str, Any], value: Any, cost: float = 0.0, expires_at: Optional[float] = None) -> None:
+        """Caches a response.
+
+        Args:
+            request (Dict): The create() keyword arguments.
+            value (Any): The response.
+            cost (float): Seconds the model took, credited to saved_seconds on each hit.
+            expires_at (float): Epoch seconds the entry is valid until; now + ttl if omitted.
+        """
+        key, context, text = self.keys(request)
+        vector = self.embedder.embed_one(text) if self.embedder is not None else None
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None:
+                self._unlink(key, old)
+            entry = _Entry(value, expires_at or time.time() + self.ttl, cost, context, guard_tokens(text))
+            self._entries[key] = entry
+            if vector is not None:
+                index = self._indexes.get(context)
+                if index is None:
+                    index = self._indexes[context] = _SemanticIndex(self.embedder.dim)
+                entry.row = index.add(key, vector)
+            while len(self._entries) > self.max_entries:
+                oldest, evicted = next(iter(self._entries.items()))
+                self._unlink(oldest, evicted)
+                self.evicted += 1
+
+    def _record(self, seconds: float) -> None:
+        with self._lock:
+            self.model_seconds += seconds
+
+    def create(self, create: Callable[..., Any], expires_at: Optional[Callable[[], float]], request: Dict[str, Any]) -> Any:
+        response = self.get(request)
+        if response is None:
+            start = time.perf_counter()
+            response = create(**request)
+            cost = time.perf_counter() - start
+            self._record(cost)
+            self.put(request, response, cost, expires_at() if expires_at else None)
+        return response
+
+    async def create_async(self, create: Callable[..., Any], expires_at: Optional[Callable[[], float]], request: Dict[str, Any]) -> Any:
+        response = self.get(request)
+        if response is None:
+            start = time.perf_counter()
+            response = await create(**request)
+            cost = time.perf_counter() - start
+            self._record(cost)
+            self.put(request, response, cost, expires_at() if expires_at else None)
+        return response
+
+    def view(self, client: Any, expires_at: Optional[Callable[[], float]] = None) -> "CachedClient":
+        """Wraps an OpenAI or AsyncOpenAI client.
+
+        Args:
+            client: Client whose chat completions are cached.
+            expires_at (Callable): Returns the epoch seconds a new entry is valid
+                until, e.g. when the catalog the prompt was built from goes stale.
+        """
+        return CachedClient(self, client, expires_at)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._indexes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit rates per tier and the model time saved."""
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "semantic": self.embedder is not None,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "saved_seconds": self.saved_seconds,
+                "model_seconds": self.model_seconds,
+                "avg_model_seconds": self.model_seconds / self.misses if self.misses else None,
+            }
+
+
+class _Completions:
+    def __init__(self, cache: LLMCache, completions: Any, expires_at: Optional[Callable[[], float]]):
+        self._cache = cache
+        self._create = completions.create
+        self._expires_at = expires_at
+        # AsyncOpenAI's create is a plain function wrapping a coroutine function
+        self._async = inspect.iscoroutinefunction(inspect.unwrap(completions.create))
+
+    def create(self, **request: Any) -> Any:
+        if self._async:
+            return self._cache.create_async(self._create, self._expires_at, request)
+        return self._cache.create(self._create, self._expires_at, request)
+
+
+class CachedClient:
+    """Client view whose chat.completions.create() is served from an LLMCache."""
+    def __init__(self, cache: LLMCache, client: Any, expires_at: Optional[Callable[[], float]] = None):
+        self._client = client
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = _Completions(cache, client.chat.completions, expires_at)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
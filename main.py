@@ -40,5 +40,6 @@ ws_client = KalshiWebSocketClient(
     environment=env
 )
 
-# Connect via WebSocket
+# Connect via WebSocket; the connection is reopened and resubscribed if it drops
+ws_client.add_subscription(["ticker"])
 asyncio.run(ws_client.connect())
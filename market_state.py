@@ -0,0 +1,262 @@
+import asyncio
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from clients import Environment, KalshiWebSocketClient
+from pipeline import MessagePipeline
+
+OPEN_STATUSES = frozenset({"active", "open"})
+
+
+def _epoch(value: Any) -> Optional[float]:
+    """Converts a REST timestamp (ISO 8601) or a WebSocket one (epoch seconds) to epoch seconds."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+class MarketState:
+    """Latest known state of one market. Prices are in cents."""
+    __slots__ = ("ticker", "last_price", "yes_bid", "yes_ask", "volume", "open_interest",
+                 "status", "open_ts", "close_ts", "ts")
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+        self.last_price: Optional[int] = None
+        self.yes_bid: Optional[int] = None
+        self.yes_ask: Optional[int] = None
+        self.volume = 0
+        self.open_interest = 0
+        self.status: Optional[str] = None
+        self.open_ts: Optional[float] = None
+        self.close_ts: Optional[float] = None
+        self.ts = 0.0  # time of the last WebSocket update; 0 until one arrives
+
+    def is_open(self, now: Optional[float] = None) -> bool:
+        """Returns True if the market is active and inside its trading window."""
+        now = time.time() if now is None else now
+        if self.status is not None and self.status not in OPEN_STATUSES:
+            return False
+        if self.open_ts is not None and now < self.open_ts:
+            return False
+        return self.close_ts is None or now < self.close_ts
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class MarketBook:
+    """In-memory state of every market, updated incrementally from WebSocket messages.
+
+    There are two writers, the feed applying messages and the catalog
+    refresher seeding REST records, and they take turns on a lock so a
+    seed cannot overwrite a fresher WebSocket price or replace a record the
+    feed just created. Lookups are plain dict reads and take no lock; a
+    reader may see one field of a record updated before another, never a
+    missing record.
+    """
+    TYPES = ("ticker", "ticker_v2", "market_lifecycle_v2")
+
+    def __init__(self):
+        self._markets: Dict[str, MarketState] = {}
+        self._write_lock = threading.Lock()
+        self.messages = 0
+        self.updates = 0
+        self.ignored = 0
+        self.lookups = 0
+        self.misses = 0
+        self.last_message_at: Optional[float] = None
+
+    def _state(self, ticker: str) -> MarketState:
+        state = self._markets.get(ticker)
+        if state is None:
+            state = self._markets[ticker] = MarketState(ticker)
+        return state
+
+    # Writing
+
+    def seed(self, markets: Iterable[Dict[str, Any]]) -> None:
+        """Loads REST market records, e.g. from a catalog refresh.
+
+        Status and trading window always come from REST. Prices are only taken
+        for markets that have not had a WebSocket update, which is fresher.
+        """
+        for market in markets:
+            # Locked per record, so a large seed does not hold the feed up for long
+            with self._write_lock:
+                state = self._state(market["ticker"])
+                state.status = market.get("status", state.status)
+                state.open_ts = _epoch(market.get("open_time")) or state.open_ts
+                state.close_ts = _epoch(market.get("close_time")) or state.close_ts
+                if not state.ts:
+                    state.last_price = market.get("last_price", state.last_price)
+                    state.yes_bid = market.get("yes_bid", state.yes_bid)
+                    state.yes_ask = market.get("yes_ask", state.yes_ask)
+                    state.volume = market.get("volume", state.volume) or 0
+                    state.open_interest = market.get("open_interest", state.open_interest) or 0
+
+    def apply(self, message: Dict[str, Any]) -> bool:
+        """Applies one decoded WebSocket message; returns False if it is not market state."""
+        self.messages += 1
+        self.last_message_at = time.time()
+        kind = message.get("type")
+        msg = message.get("msg")
+        with self._write_lock:
+            if kind == "ticker":
+                self._on_ticker(msg)
+            elif kind == "ticker_v2":
+                self._on_ticker_delta(msg)
+            elif kind == "market_lifecycle_v2":
+                self._on_lifecycle(msg)
+            else:
+                self.ignored += 1
+                return False
+        self.updates += 1
+        return True
+
+    def _on_ticker(self, msg: Dict[str, Any]) -> None:
+        state = self._state(msg["market_ticker"])
+        state.last_price = msg.get("price", state.last_price)
+        state.yes_bid = msg.get("yes_bid", state.yes_bid)
+        state.yes_ask = msg.get("yes_ask", state.yes_ask)
+        state.volume = msg.get("volume", state.volume)
+        state.open_interest = msg.get("open_interest", state.open_interest)
+        state.ts = msg.get("ts") or time.time()
+
+    def _on_ticker_delta(self, msg: Dict[str, Any]) -> None:
+        # ticker_v2 only carries the fields that changed, with volume as a delta.
+        state = self._state(msg["market_ticker"])
+        if "price" in msg:
+            state.last_price = msg["price"]
+        if "yes_bid" in msg:
+            state.yes_bid = msg["yes_bid"]
+        if "yes_ask" in msg:
+            state.yes_ask = msg["yes_ask"]
+        state.volume += msg.get("volume_delta", 0)
+        state.open_interest += msg.get("open_interest_delta", 0)
+        state.ts = msg.get("ts") or time.time()
+
+    def _on_lifecycle(self, msg: Dict[str, Any]) -> None:
+        state = self._state(msg["market_ticker"])
+        event = msg.get("event_type")
+        if event == "activated":
+            state.status = "active"
+        elif event in ("deactivated", "determined", "settled"):
+            state.status = "closed" if event == "deactivated" else event
+        state.open_ts = _epoch(msg.get("open_ts")) or state.open_ts
+        state.close_ts = _epoch(msg.get("close_ts")) or state.close_ts
+
+    # Reading
+
+    def get(self, ticker: str) -> Optional[MarketState]:
+        """Returns the state of a market, or None if it has never been seen."""
+        state = self._markets.get(ticker)
+        self.lookups += 1
+        if state is None:
+            self.misses += 1
+        return state
+
+    def is_open(self, ticker: str, now: Optional[float] = None) -> Optional[bool]:
+        """Returns whether a market is open, or None if it is unknown."""
+        state = self.get(ticker)
+        return None if state is None else state.is_open(now)
+
+    def quote(self, ticker: str, side: str, action: str = "buy") -> Optional[int]:
+        """Returns the best price in cents to `action` ("buy" or "sell") `side` ("yes" or "no") at, or None if there is none.
+
+        Buying pays the best ask and selling receives the best bid.
+        """
+        state = self.get(ticker)
+        if state is None:
+            return None
+        if action == "sell":
+            if side == "yes":
+                return state.yes_bid or None
+            # Selling no is matched against the best yes ask.
+            return 100 - state.yes_ask if state.yes_ask else None
+        if side == "yes":
+            return state.yes_ask or None
+        # Buying no lifts the best yes bid from the other side of the book.
+        return 100 - state.yes_bid if state.yes_bid else None
+
+    def __len__(self) -> int:
+        return len(self._markets)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns ingest counters, lookup hit rate and feed freshness."""
+        return {
+            "markets": len(self._markets),
+            "messages": self.messages,
+            "updates": self.updates,
+            "ignored": self.ignored,
+            "lookups": self.lookups,
+            "hit_rate": 1 - self.misses / self.lookups if self.lookups else 0.0,
+            "seconds_since_message": time.time() - self.last_message_at if self.last_message_at else None,
+        }
+
+
+class MarketFeed(KalshiWebSocketClient):
+    """WebSocket client that keeps a MarketBook up to date from a background thread."""
+    CHANNELS = ["ticker", "market_lifecycle_v2"]
+
+    def __init__(
+        self,
+        key_id: str,
+        private_key: rsa.RSAPrivateKey,
+        book: MarketBook,
+        environment: Environment = Environment.PROD,
+        channels: Optional[List[str]] = None,
+        queue_size: int = 10000,
+        **kwargs: Any,
+    ):
+        """Initializes the feed without connecting.
+
+        Args:
+            key_id (str): Your Kalshi API key ID.
+            private_key (rsa.RSAPrivateKey): Your RSA private key.
+            book (MarketBook): Book the messages are applied to.
+            environment (Environment): Exchange to stream market data from.
+            channels (List[str]): Channels to subscribe to for every market.
+            queue_size (int): Raw frames allowed to wait for the decoder.
+            **kwargs: Passed to KalshiWebSocketClient, e.g. signer or backoff.
+        """
+        channels = channels or list(self.CHANNELS)
+        pipeline = MessagePipeline(maxsize=queue_size)
+        # ticker and lifecycle messages carry full state, so a backlog can be
+        # collapsed to the latest per market; ticker_v2 deltas cannot.
+        pipeline.subscribe(
+            book.apply,
+            types=MarketBook.TYPES,
+            policy="block" if "ticker_v2" in channels else "coalesce",
+            name="market-book",
+        )
+        super().__init__(key_id, private_key, environment, pipeline=pipeline, **kwargs)
+        self.book = book
+        self.add_subscription(channels)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self.connect())
+        finally:
+            self._loop.close()
+
+    def start(self) -> None:
+        """Streams into the book from a daemon thread, reconnecting when dropped."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="market-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Closes the connection and stops reconnecting."""
+        if self._loop is not None and self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.close(), self._loop)
@@ -0,0 +1,214 @@
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from requests.exceptions import HTTPError, RequestException
+
+from clients import KalshiHttpClient
+
+
+class OrderRejected(Exception):
+    """Raised on an order's future when the exchange refuses it."""
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(f"Order rejected ({status_code}): {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+class OrderRouter:
+    """Submits orders from a background queue and resolves each one on a Future.
+
+    Orders queued within `linger` seconds of each other are sent together to
+    the batched order endpoint when the account has access to it. Failed
+    submissions are retried with the same client_order_id, so the exchange
+    can tell a resend from a new order.
+    """
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(
+        self,
+        client: KalshiHttpClient,
+        workers: int = 2,
+        batch_size: int = 20,
+        linger: float = 0.005,
+        max_retries: int = 3,
+        backoff: float = 0.2,
+        use_batch_endpoint: bool = True,
+    ):
+        """Initializes the router and starts its workers.
+
+        Args:
+            client (KalshiHttpClient): Client used to reach the exchange.
+            workers (int): Threads sending orders concurrently.
+            batch_size (int): Maximum orders per batched request.
+            linger (float): Seconds a worker waits to fill a batch.
+            max_retries (int): Resends per order after a transient failure.
+            backoff (float): Base delay between resends, doubled each time.
+            use_batch_endpoint (bool): Try POST /portfolio/orders/batched first.
+        """
+        self.client = client
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.batching = use_batch_endpoint and batch_size > 1
+        self.orders_path = client.portfolio_url + "/orders"
+
+        self._queue: "queue.Queue[Optional[Tuple[Dict[str, Any], Future]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.acked = 0
+        self.rejected = 0
+        self.retries = 0
+        self.batches = 0
+        self._workers = [
+            threading.Thread(target=self._run, name=f"order-router-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, order: Dict[str, Any]) -> Future:
+        """Queues an order and returns a Future resolving to the exchange's order record."""
+        order = dict(order)
+        order.setdefault("client_order_id", str(uuid.uuid4()))
+        future: Future = Future()
+        future.client_order_id = order["client_order_id"]
+        with self._lock:
+            self.submitted += 1
+        self._queue.put((order, future))
+        return future
+
+    def close(self) -> None:
+        """Stops the workers after the queued orders are sent."""
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+    def _next_batch(self) -> Optional[List[Tuple[Dict[str, Any], Future]]]:
+        item = self._queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.linger
+        while self.batching and len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Hand the shutdown signal back for this worker's next loop.
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            groups = [batch] if len(batch) > 1 and self.batching else [[item] for item in batch]
+            for group in groups:
+                try:
+                    if len(group) > 1:
+                        self._send_batch(group)
+                    else:
+                        self._send_one(*group[0])
+                except Exception as e:
+                    # A malformed response or a local failure (signing, say) fails
+                    # these orders on their futures instead of killing the worker.
+                    for _, future in group:
+                        if not future.done():
+                            self._resolve(future, error=e)
+
+    def _resolve(self, future: Future, order: Optional[Dict[str, Any]] = None, error: Optional[Exception] = None) -> None:
+        with self._lock:
+            if error is None:
+                self.acked += 1
+            else:
+                self.rejected += 1
+        if error is None:
+            future.set_result(order)
+        else:
+            future.set_exception(error)
+
+    def _send_batch(self, batch: List[Tuple[Dict[str, Any], Future]]) -> None:
+        try:
+            response = self.client.post(self.orders_path + "/batched", {"orders": [o for o, _ in batch]})
+        except HTTPError as e:
+            if e.response is not None and e.response.status_code in (403, 404, 405):
+                # The account cannot use batching; stop trying and send individually.
+                self.batching = False
+            for order, future in batch:
+                self._send_one(order, future)
+            return
+        except RequestException:
+            for order, future in batch:
+                self._send_one(order, future)
+            return
+
+        with self._lock:
+            self.batches += 1
+        for (order, future), result in zip(batch, response.get("orders", [])):
+            if result.get("order"):
+                self._resolve(future, result["order"])
+            elif (result.get("error") or {}).get("code") == "order_already_exists":
+                self._resolve_existing(order, future)
+            else:
+                self._resolve(future, error=OrderRejected(400, result.get("error")))
+        for order, future in batch[len(response.get("orders", [])):]:
+            self._send_one(order, future)
+
+    def _send_one(self, order: Dict[str, Any], future: Future) -> None:
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                with self._lock:
+                    self.retries += 1
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                self._resolve(future, self.client.post(self.orders_path, order)["order"])
+                return
+            except HTTPError as e:
+                status = e.response.status_code if e.response is not None else 0
+                if status == 409:
+                    # An earlier attempt reached the exchange; report that order.
+                    self._resolve_existing(order, future)
+                    return
+                if status not in self.RETRY_STATUSES or attempt == self.max_retries:
+                    self._resolve(future, error=OrderRejected(status, e.response.text if e.response is not None else e))
+                    return
+            except RequestException as e:
+                if attempt == self.max_retries:
+                    self._resolve(future, error=e)
+                    return
+
+    def _resolve_existing(self, order: Dict[str, Any], future: Future) -> None:
+        try:
+            orders = self.client.get(self.orders_path, {"ticker": order["ticker"]}).get("orders", [])
+        except RequestException as e:
+            self._resolve(future, error=e)
+            return
+        for existing in orders:
+            if existing.get("client_order_id") == order["client_order_id"]:
+                self._resolve(future, existing)
+                return
+        self._resolve(future, error=OrderRejected(409, "duplicate client_order_id not found"))
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns submission, acknowledgement and retry counters."""
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "acked": self.acked,
+                "rejected": self.rejected,
+                "retries": self.retries,
+                "batches": self.batches,
+                "queued": self._queue.qsize(),
+                "batching": self.batching,
+            }
@@ -0,0 +1,327 @@
+"""
+Decoding and fan-out of WebSocket frames off the event loop.
+
+The socket read loop only calls MessagePipeline.submit(), which puts the raw
+frame on a bounded queue and returns. A decoder thread parses frames and
+offers each message to the subscribers registered for its type. Every
+subscriber has its own queue, thread and overflow policy, so a slow
+consumer only ever delays or loses its own messages.
+"""
+import json
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+try:
+    import orjson
+    loads: Callable[[Any], Any] = orjson.loads
+except ImportError:  # the stdlib parser works, only slower
+    loads = json.loads
+
+Message = Dict[str, Any]
+
+
+def market_key(message: Message) -> Hashable:
+    """Coalescing key keeping the latest message of each type per market."""
+    return message.get("type"), (message.get("msg") or {}).get("market_ticker")
+
+
+class Subscriber:
+    """Delivers messages to a callback on its own thread.
+
+    Overflow policies once `maxsize` messages are waiting:
+        block        the decoder waits, pushing back on the frame queue
+        drop_oldest  the oldest waiting message is discarded
+        drop_newest  the incoming message is discarded
+        coalesce     a waiting message with the same key is replaced, so at
+                     most one per key waits; only safe for messages that
+                     carry full state rather than deltas
+    """
+    POLICIES = ("block", "drop_oldest", "drop_newest", "coalesce")
+
+    def __init__(
+        self,
+        callback: Callable[[Message], Any],
+        types: Optional[Iterable[str]] = None,
+        policy: str = "block",
+        maxsize: int = 10000,
+        key: Callable[[Message], Hashable] = market_key,
+        name: Optional[str] = None,
+    ):
+        """Initializes the subscriber; the pipeline starts its thread.
+
+        Args:
+            callback (Callable): Called with each decoded message.
+            types (Iterable[str]): Message types to receive; all types if omitted.
+            policy (str): One of POLICIES.
+            maxsize (int): Messages allowed to wait before the policy applies.
+            key (Callable): Coalescing key for the "coalesce" policy.
+            name (str): Name used in stats and the thread name.
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}; expected one of {self.POLICIES}")
+        self.callback = callback
+        self.types = frozenset(types) if types else None
+        self.policy = policy
+        self.maxsize = maxsize
+        self.key = key
+        self.name = name or getattr(callback, "__qualname__", "subscriber")
+        self._items: deque = deque()
+        self._pending: Dict[Hashable, Message] = {}
+        self._cond = threading.Condition()
+        self._busy = False
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def offer(self, messages: List[Message]) -> None:
+        """Queues a batch of messages, applying the overflow policy."""
+        with self._cond:
+            for message in messages:
+                if self.policy == "coalesce":
+                    key = self.key(message)
+                    if key in self._pending:
+                        self._pending[key] = message
+                        self.coalesced += 1
+                        continue
+                    # Distinct keys are bounded by the number of markets; wait if even that overflows.
+                    while len(self._items) >= self.maxsize and not self._stopped:
+                        self._cond.notify_all()
+                        self._cond.wait()
+                    self._pending[key] = message
+                    self._items.append(key)
+                    continue
+                while len(self._items) >= self.maxsize:
+                    if self.policy == "block" and not self._stopped:
+                        self._cond.notify_all()
+                        self._cond.wait()
+                    elif self.policy == "drop_newest":
+                        self.dropped += 1
+                        break
+                    else:
+                        self._items.popleft()
+                        self.dropped += 1
+                else:
+                    self._items.append(message)
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._items and not self._stopped:
+                    self._cond.wait()
+                if not self._items:
+                    return
+                # Take everything waiting in one go to keep lock traffic per message low.
+                if self.policy == "coalesce":
+                    batch = [self._pending.pop(key) for key in self._items]
+                else:
+                    batch = list(self._items)
+                self._items.clear()
+                self._busy = True
+                self._cond.notify_all()
+            for message in batch:
+                try:
+                    self.callback(message)
+                except Exception as e:
+                    self.errors += 1
+                    if self.errors == 1:
+                        print(f"Subscriber {self.name} failed: {e}")
+            with self._cond:
+                self.delivered += len(batch)
+                self._busy = False
+                self._cond.notify_all()
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name=f"subscriber-{self.name}", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the thread once the waiting messages are delivered."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until nothing is waiting or being delivered."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._items and not self._busy, timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "policy": self.policy,
+                "waiting": len(self._items),
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+            }
+
+
+class MessagePipeline:
+    """Bounded frame queue, one decoder thread and typed subscribers.
+
+    A single decoder keeps messages in arrival order, which sequence
+    checking relies on. `accept`, if set, runs on the decoder thread before
+    fan-out and can reject a message; KalshiWebSocketClient uses it for
+    subscription and sequence tracking.
+    """
+    def __init__(self, maxsize: int = 10000, parse: Callable[[Any], Any] = loads, record_path: Optional[str] = None):
+        """Initializes the pipeline without starting it.
+
+        Args:
+            maxsize (int): Raw frames allowed to wait for the decoder; further frames are dropped.
+            parse (Callable): Frame decoder; orjson when installed, else json.
+            record_path (str): Append every raw frame to this file, one per line, for replay.
+        """
+        self.parse = parse
+        self.maxsize = maxsize
+        self.accept: Optional[Callable[[Message], bool]] = None
+        # A deque append is atomic, so submit() only takes the lock to wake an idle decoder.
+        self._frames: deque = deque()
+        self._cond = threading.Condition()
+        self._idle = True
+        self._stopped = False
+        self._subscribers: List[Subscriber] = []
+        self._routes: Dict[Optional[str], List[Subscriber]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._record = open(record_path, "a", encoding="utf-8") if record_path else None
+        self.submitted = 0
+        self.frames_dropped = 0
+        self.decoded = 0
+        self.decode_errors = 0
+        self.errors = 0
+        self.rejected = 0
+
+    def subscribe(self, callback: Callable[[Message], Any], types: Optional[Iterable[str]] = None, **kwargs: Any) -> Subscriber:
+        """Registers a subscriber; see Subscriber for the keyword arguments."""
+        subscriber = Subscriber(callback, types, **kwargs)
+        self._subscribers.append(subscriber)
+        for kind in subscriber.types or (None,):
+            self._routes.setdefault(kind, []).append(subscriber)
+        if self._thread is not None:
+            subscriber.start()
+        return subscriber
+
+    def submit(self, frame: Any) -> bool:
+        """Queues a raw frame without blocking; returns False if it was dropped."""
+        self.submitted += 1
+        if len(self._frames) >= self.maxsize:
+            self.frames_dropped += 1
+            return False
+        self._frames.append(frame)
+        if self._idle:
+            with self._cond:
+                self._cond.notify_all()
+        return True
+
+    def _next_batch(self, limit: int = 512) -> Optional[List[Any]]:
+        frames = self._frames
+        with self._cond:
+            if not frames:
+                # Announce idleness before the last look at the queue: a submit() that still
+                # saw the decoder busy has already appended its frame, so the check below sees
+                # it, and one that sees it idle takes the lock and notifies.
+                self._idle = True
+                self._cond.notify_all()
+                while not frames:
+                    if self._stopped:
+                        return None
+                    self._cond.wait()
+            self._idle = False
+        batch = []
+        while frames and len(batch) < limit:
+            batch.append(frames.popleft())
+        return batch
+
+    def _decode(self) -> None:
+        catch_all = self._routes.get(None, [])
+        routed: Dict[int, List[Message]] = {id(s): [] for s in self._subscribers}
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if self._record is not None:
+                self._record.writelines((f.decode() if isinstance(f, bytes) else f) + "\n" for f in batch)
+                self._record.flush()
+            for frame in batch:
+                try:
+                    message = self.parse(frame)
+                except ValueError:
+                    self.decode_errors += 1
+                    continue
+                if not isinstance(message, dict):
+                    self.decode_errors += 1
+                    continue
+                try:
+                    accepted = self.accept is None or self.accept(message)
+                except Exception as e:
+                    # A malformed frame must not stop the decoder, or every later frame is lost
+                    self.errors += 1
+                    if self.errors == 1:
+                        print(f"Frame handling failed: {e}")
+                    continue
+                if not accepted:
+                    self.rejected += 1
+                    continue
+                self.decoded += 1
+                for subscriber in self._routes.get(message.get("type"), ()):
+                    routed[id(subscriber)].append(message)
+                for subscriber in catch_all:
+                    routed[id(subscriber)].append(message)
+            for subscriber in self._subscribers:
+                messages = routed[id(subscriber)]
+                if messages:
+                    subscriber.offer(messages)
+                    routed[id(subscriber)] = []
+
+    def start(self) -> None:
+        """Starts the decoder and subscriber threads; call it after subscribing."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped = False
+        for subscriber in self._subscribers:
+            subscriber.start()
+        self._thread = threading.Thread(target=self._decode, name="ws-decoder", daemon=True)
+        self._thread.start()
+
+    def drain(self, timeout: Optional[float] = None) -> None:
+        """Blocks until every queued frame has been decoded and delivered."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._idle and not self._frames, timeout)
+        for subscriber in self._subscribers:
+            subscriber.wait_idle(timeout)
+
+    def stop(self) -> None:
+        """Stops the threads after the queued frames are processed."""
+        if self._thread is not None:
+            with self._cond:
+                self._stopped = True
+                self._cond.notify_all()
+            self._thread.join()
+            self._thread = None
+        for subscriber in self._subscribers:
+            subscriber.stop()
+        if self._record is not None:
+            self._record.close()
+            self._record = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns frame, decode and per-subscriber counters."""
+        return {
+            "parser": getattr(self.parse, "__module__", None),
+            "queued": len(self._frames),
+            "submitted": self.submitted,
+            "frames_dropped": self.frames_dropped,
+            "decoded": self.decoded,
+            "decode_errors": self.decode_errors,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "subscribers": {s.name: s.stats() for s in self._subscribers},
+        }
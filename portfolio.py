@@ -0,0 +1,596 @@
+"""
+Balance, positions and open orders of the trading account, kept in memory.
+
+Portfolio is seeded from REST, kept current by the account's WebSocket
+channels (PortfolioFeed) and by the order router's acknowledgements, and
+reconciled with REST on a timer. Pre-trade risk checks then run against
+memory instead of costing a signed round trip per order.
+
+Every worker process keeps its own Portfolio, and the exchange's channels
+and snapshots tell each of them the whole account. Only the orders a
+worker has just placed are its own knowledge, so with several workers the
+holds of those orders go through SharedHolds, in the SharedDB, where every
+worker's check counts them.
+
+All amounts are in cents. A position is a signed contract count: positive
+for yes contracts and negative for no contracts, as Kalshi reports it.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Callable, Container, Dict, Iterator, List, Optional, Tuple
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from clients import Environment, KalshiWebSocketClient, Subscription
+from pipeline import MessagePipeline
+from shared_state import SharedDB
+
+Fetch = Callable[[str, Dict[str, Any]], Dict[str, Any]]
+
+
+class RiskRejected(Exception):
+    """Raised by Portfolio.reserve when an order fails a pre-trade check."""
+    def __init__(self, reason: str, detail: str):
+        super().__init__(detail)
+        self.reason = reason
+
+
+class Position:
+    """Holding in one market: signed contract count and its cost in cents."""
+    __slots__ = ("ticker", "position", "exposure", "realized_pnl")
+
+    def __init__(self, ticker: str, position: int = 0, exposure: int = 0, realized_pnl: int = 0):
+        self.ticker = ticker
+        self.position = position
+        self.exposure = exposure
+        self.realized_pnl = realized_pnl
+
+    def apply_fill(self, side: str, action: str, count: int, price: int) -> None:
+        # Buying yes or selling no adds yes contracts; a no contract counts as -1
+        change = count if (side == "yes") == (action == "buy") else -count
+        before, after = self.position, self.position + change
+        if before == 0 or (before > 0) == (change > 0):
+            self.exposure += count * price
+        elif abs(after) <= abs(before):
+            # Closing part of the position releases its share of the cost
+            self.exposure = self.exposure * abs(after) // abs(before)
+        else:
+            # Flipped from one side to the other; only the new side's contracts remain
+            self.exposure = abs(after) * price
+        self.position = after
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class OpenOrder:
+    """An order the exchange may still fill, and the cents it holds if it is a buy."""
+    __slots__ = ("order_id", "client_order_id", "ticker", "side", "action", "price", "remaining", "since")
+
+    def __init__(self, order_id: Optional[str], client_order_id: Optional[str], ticker: str, side: str, action: str,
+                 price: int, remaining: int):
+        self.order_id = order_id
+        self.client_order_id = client_order_id
+        self.ticker = ticker
+        self.side = side
+        self.action = action
+        self.price = price
+        self.remaining = remaining
+        self.since = time.monotonic()
+
+    @classmethod
+    def from_order(cls, order: Dict[str, Any]) -> "OpenOrder":
+        """Builds one from an order request or a REST order record."""
+        side = order.get("side", "yes")
+        price = order.get(f"{side}_price") or 0
+        remaining = order.get("remaining_count", order.get("count")) or 0
+        return cls(order.get("order_id"), order.get("client_order_id"), order["ticker"], side,
+                   order.get("action", "buy"), price, remaining)
+
+    @property
+    def held(self) -> int:
+        return self.remaining * self.price if self.action == "buy" else 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__ if name != "since"}
+
+
+class SharedHolds:
+    """Cents held by orders that workers have placed, shared across processes.
+
+    A row is added with the check that admits the order, under the same
+    database lock, so two workers cannot both spend the same balance. It
+    is removed when the exchange refuses or completes the order, and a
+    resting order's row expires once every worker's reconcile has had time
+    to load the order from REST; rows of a worker that died expire too.
+    """
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS portfolio_holds (client_order_id TEXT PRIMARY KEY, order_id TEXT, "
+        "owner INTEGER NOT NULL, ticker TEXT NOT NULL, cents INTEGER NOT NULL, expires REAL NOT NULL)",
+    )
+
+    def __init__(self, db: SharedDB, pending_seconds: float = 300.0):
+        """Creates the table if needed.
+
+        Args:
+            db (SharedDB): Database shared by the workers.
+            pending_seconds (float): How long a hold waits for the exchange's answer before it lapses.
+        """
+        self.db = db
+        self.pending_seconds = pending_seconds
+        with db.transaction() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def others(self, conn: sqlite3.Connection, ticker: str, known: Container[str]) -> Tuple[int, int]:
+        """Cents other workers hold in `ticker` and in total, skipping orders this worker already holds."""
+        market = total = 0
+        rows = conn.execute("SELECT order_id, ticker, cents FROM portfolio_holds WHERE owner != ? AND expires > ?",
+                            (os.getpid(), time.time()))
+        for order_id, held_ticker, cents in rows:
+            if order_id is not None and order_id in known:
+                continue
+            total += cents
+            if held_ticker == ticker:
+                market += cents
+        return market, total
+
+    def add(self, conn: sqlite3.Connection, order: "OpenOrder") -> None:
+        conn.execute("INSERT OR REPLACE INTO portfolio_holds VALUES (?, NULL, ?, ?, ?, ?)",
+                     (order.client_order_id, os.getpid(), order.ticker, order.held, time.time() + self.pending_seconds))
+
+    def placed(self, client_order_id: str, order_id: str, seconds: float) -> None:
+        """Keeps a resting order's hold for `seconds`, by when every worker's snapshot has it."""
+        with self.db.transaction() as conn:
+            conn.execute("UPDATE portfolio_holds SET order_id = ?, expires = ? WHERE client_order_id = ?",
+                         (order_id, time.time() + seconds, client_order_id))
+
+    def release(self, client_order_id: Optional[str] = None, order_id: Optional[str] = None) -> None:
+        with self.db.transaction() as conn:
+            if client_order_id is not None:
+                conn.execute("DELETE FROM portfolio_holds WHERE client_order_id = ?", (client_order_id,))
+            if order_id is not None:
+                conn.execute("DELETE FROM portfolio_holds WHERE order_id = ?", (order_id,))
+
+    def expire(self) -> None:
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM portfolio_holds WHERE expires < ?", (time.time(),))
+
+    def held_by_others(self) -> int:
+        (cents,) = self.db.connection().execute(
+            "SELECT COALESCE(SUM(cents), 0) FROM portfolio_holds WHERE owner != ? AND expires > ?",
+            (os.getpid(), time.time())).fetchone()
+        return cents
+
+
+class Portfolio:
+    """In-memory account state with local pre-trade risk checks.
+
+    Writers are the feed, the order router's callbacks and the reconcile
+    thread, so state changes take a lock; a check holds it for a few
+    dictionary operations. Buy orders that are pending or resting hold
+    their cost against the balance until they fill or are cancelled, which
+    is conservative if the exchange has already deducted it.
+
+    Fills that arrive while a reconcile snapshot is being fetched may be
+    counted by both or by neither; the next reconcile corrects them, so
+    the reconcile interval bounds the drift.
+
+    With several worker processes, pass `holds` so that each check also
+    counts the orders the other workers have placed; without it the
+    limits apply per process.
+    """
+    TYPES = ("fill", "market_position")
+
+    def __init__(
+        self,
+        fetch: Fetch,
+        max_market_exposure: int = 0,
+        max_total_exposure: int = 0,
+        reconcile_interval: float = 60.0,
+        min_balance: int = 0,
+        holds: Optional[SharedHolds] = None,
+    ):
+        """Initializes an empty portfolio; start() or reconcile() seeds it.
+
+        Args:
+            fetch (Fetch): Callable performing a signed GET for (path, params), paths relative to the API root.
+            max_market_exposure (int): Cents that positions and open buys may hold in one market; 0 for no limit.
+            max_total_exposure (int): Cents they may hold across all markets; 0 for no limit.
+            reconcile_interval (float): Seconds between REST snapshots.
+            min_balance (int): Cents an order must leave available.
+            holds (SharedHolds): Holds shared with the other worker processes, if there are any.
+        """
+        self.fetch = fetch
+        self.max_market_exposure = max_market_exposure
+        self.max_total_exposure = max_total_exposure
+        self.reconcile_interval = reconcile_interval
+        self.min_balance = min_balance
+        self.holds = holds
+
+        self._lock = threading.Lock()
+        self.balance = 0
+        self._positions: Dict[str, Position] = {}
+        self._orders: Dict[str, OpenOrder] = {}  # by order_id
+        self._pending: Dict[str, OpenOrder] = {}  # by client_order_id, until the exchange answers
+        self._held: Dict[str, int] = {}  # cents held by open buys, per market
+        self._held_total = 0
+        self._exposure_total = 0
+        self._early_fills: Dict[str, int] = {}  # contracts filled on orders not acknowledged yet
+
+        self.seeded_at: Optional[float] = None
+        self.reconciles = 0
+        self.reconcile_errors = 0
+        self.corrections = 0
+        self.fills = 0
+        self.position_updates = 0
+        self.checks = 0
+        self.rejections: Counter = Counter()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # Holds on the balance
+
+    def _hold(self, order: OpenOrder, sign: int) -> None:
+        held = sign * order.held
+        if held:
+            self._held[order.ticker] = self._held.get(order.ticker, 0) + held
+            self._held_total += held
+
+    def _add_order(self, order: OpenOrder) -> None:
+        if order.remaining > 0 and order.order_id not in self._orders:
+            self._orders[order.order_id] = order
+            self._hold(order, 1)
+
+    def _fill_order(self, order_id: str, count: int) -> bool:
+        # True once the order has filled completely
+        order = self._orders.get(order_id)
+        if order is None:
+            self._early_fills[order_id] = self._early_fills.get(order_id, 0) + count
+            return False
+        self._hold(order, -1)
+        order.remaining -= count
+        if order.remaining > 0:
+            self._hold(order, 1)
+            return False
+        del self._orders[order_id]
+        return True
+
+    def _position(self, ticker: str) -> Position:
+        position = self._positions.get(ticker)
+        if position is None:
+            position = self._positions[ticker] = Position(ticker)
+        return position
+
+    def _set_exposure(self, position: Position, exposure: int) -> None:
+        self._exposure_total += exposure - position.exposure
+        position.exposure = exposure
+
+    # Pre-trade checks
+
+    def reserve(self, order: Dict[str, Any]) -> None:
+        """Checks an order against the limits and holds its cost until the exchange answers.
+
+        Check and hold happen under one lock, so concurrent orders cannot
+        both spend the same balance; with shared holds the lock is the
+        database's, so orders from different workers cannot either. The
+        portfolio is seeded by start(), never here: until the first snapshot
+        lands, orders are rejected rather than fetching it on the request.
+
+        Raises:
+            RiskRejected: The order would overdraw the balance or exceed an exposure limit,
+                or the portfolio has not been loaded yet.
+        """
+        if self.seeded_at is None:
+            self.request_reconcile()
+            with self._lock:
+                self._reject("unavailable", "the portfolio has not been loaded from the exchange yet")
+        pending = OpenOrder.from_order(order)
+        if self.holds is None:
+            with self._lock:
+                self._check(pending, 0, 0)
+                self._add_pending(pending)
+            return
+        with self.holds.db.transaction() as conn:
+            with self._lock:
+                self._check(pending, *self.holds.others(conn, pending.ticker, self._orders))
+                self.holds.add(conn, pending)
+                self._add_pending(pending)
+
+    def _check(self, pending: OpenOrder, others_market: int, others_total: int) -> None:
+        # others_*: cents held by orders of other workers that this one does not know of yet
+        self.checks += 1
+        cost = pending.held
+        if not cost:
+            return
+        held_total = self._held_total + others_total
+        available = self.balance - held_total - self.min_balance
+        if cost > available:
+            self._reject("balance", f"costs {cost}¢ but only {max(available, 0)}¢ is available")
+        position = self._positions.get(pending.ticker)
+        market = (position.exposure if position else 0) + self._held.get(pending.ticker, 0) + others_market + cost
+        if self.max_market_exposure and market > self.max_market_exposure:
+            self._reject("market_exposure", f"would hold {market}¢ in {pending.ticker}, over the "
+                                            f"{self.max_market_exposure}¢ limit per market")
+        total = self._exposure_total + held_total + cost
+        if self.max_total_exposure and total > self.max_total_exposure:
+            self._reject("total_exposure", f"would hold {total}¢ across markets, over the "
+                                           f"{self.max_total_exposure}¢ limit")
+
+    def _add_pending(self, pending: OpenOrder) -> None:
+        self._pending[pending.client_order_id] = pending
+        self._hold(pending, 1)
+
+    def _reject(self, reason: str, detail: str) -> None:
+        self.rejections[reason] += 1
+        raise RiskRejected(reason, detail)
+
+    def record_ack(self, order: Dict[str, Any], future: Future) -> None:
+        """Moves a reserved order to the open orders, or releases it if the exchange refused it.
+
+        Meant as a done callback on the order router's future.
+        """
+        placed = None
+        with self._lock:
+            pending = self._pending.pop(order["client_order_id"], None)
+            if pending is not None:
+                self._hold(pending, -1)
+            if future.exception() is None:
+                record = future.result()
+                filled = self._early_fills.pop(record.get("order_id"), 0)
+                if record.get("status") in (None, "resting", "pending"):
+                    placed = OpenOrder.from_order({**order, **record})
+                    placed.remaining -= filled
+                    self._add_order(placed)
+        if self.holds is None:
+            return
+        # Outside the portfolio lock, which reserve() takes inside the database's
+        if placed is not None and placed.remaining > 0 and placed.order_id:
+            self.holds.placed(order["client_order_id"], placed.order_id, 2 * self.reconcile_interval)
+        else:
+            self.holds.release(client_order_id=order["client_order_id"])
+
+    # Writing from the WebSocket feed
+
+    def apply(self, message: Dict[str, Any]) -> bool:
+        """Applies one decoded fill or market_position message; returns False for anything else."""
+        kind = message.get("type")
+        msg = message.get("msg")
+        completed = False
+        with self._lock:
+            if kind == "fill":
+                completed = self._on_fill(msg)
+            elif kind == "market_position":
+                self._on_market_position(msg)
+            else:
+                return False
+        if completed and self.holds is not None:
+            self.holds.release(order_id=msg["order_id"])
+        return True
+
+    def _on_fill(self, msg: Dict[str, Any]) -> bool:
+        # True if the fill completed an open order
+        self.fills += 1
+        side, action, count = msg.get("side", "yes"), msg.get("action", "buy"), msg.get("count", 0)
+        price = msg.get(f"{side}_price")
+        if price is None:
+            price = 100 - msg.get("yes_price", 0) if side == "no" else msg.get("yes_price", 0)
+        position = self._position(msg["market_ticker"])
+        exposure = position.exposure
+        position.apply_fill(side, action, count, price)
+        self._exposure_total += position.exposure - exposure
+        # Fees are left for the next reconcile to pick up
+        self.balance += count * price if action == "sell" else -count * price
+        return bool(msg.get("order_id")) and self._fill_order(msg["order_id"], count)
+
+    def _on_market_position(self, msg: Dict[str, Any]) -> None:
+        # The exchange's own view of one market; its money fields are in centi-cents
+        self.position_updates += 1
+        position = self._position(msg["market_ticker"])
+        position.position = msg.get("position", position.position)
+        if "position_cost" in msg:
+            self._set_exposure(position, msg["position_cost"] // 100)
+        if "realized_pnl" in msg:
+            position.realized_pnl = msg["realized_pnl"] // 100
+
+    # Reconciling with REST
+
+    def _pages(self, path: str, key: str, params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        while True:
+            data = self.fetch(path, params)
+            yield from data.get(key) or []
+            if not data.get("cursor"):
+                return
+            params = {**params, "cursor": data["cursor"]}
+
+    def reconcile(self) -> Dict[str, Any]:
+        """Replaces the state with a REST snapshot and returns how far memory had drifted from it."""
+        started = time.monotonic()
+        balance = self.fetch("/portfolio/balance", {})["balance"]
+        positions = {
+            p["ticker"]: Position(p["ticker"], p.get("position", 0), p.get("market_exposure", 0), p.get("realized_pnl", 0))
+            for p in self._pages("/portfolio/positions", "market_positions", {"limit": 1000})
+        }
+        orders = [OpenOrder.from_order(o) for o in self._pages("/portfolio/orders", "orders", {"status": "resting", "limit": 1000})]
+        with self._lock:
+            drift = {
+                "balance": balance - self.balance,
+                "positions": sum(1 for t in positions.keys() | self._positions.keys()
+                                 if (positions[t].position if t in positions else 0)
+                                 != (self._positions[t].position if t in self._positions else 0)),
+            }
+            if self.seeded_at is not None and (drift["balance"] or drift["positions"]):
+                self.corrections += 1
+            self.balance = balance
+            self._positions = positions
+            self._exposure_total = sum(p.exposure for p in positions.values())
+            # Orders acknowledged after the snapshot was requested may be missing from it
+            recent = [o for o in self._orders.values() if o.since > started]
+            self._orders, self._held, self._held_total = {}, {}, 0
+            for order in orders + recent:
+                self._add_order(order)
+            for order in self._pending.values():
+                self._hold(order, 1)
+            self._early_fills.clear()
+            self.seeded_at = time.time()
+            self.reconciles += 1
+        if self.holds is not None:
+            self.holds.expire()
+        return drift
+
+    def request_reconcile(self) -> None:
+        """Asks the reconcile thread for a snapshot now, e.g. after fills may have been missed."""
+        self._wake.set()
+
+    def _reconcile_logged(self) -> None:
+        try:
+            self.reconcile()
+        except Exception as e:
+            self.reconcile_errors += 1
+            print(f"Portfolio reconcile failed: {e}")
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.reconcile_interval if self.seeded_at else min(5.0, self.reconcile_interval))
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            self._reconcile_logged()
+
+    def start(self) -> None:
+        """Seeds from REST now, then reconciles on a daemon thread.
+
+        A failed seed is retried by the thread; reserve() rejects orders until one succeeds.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._reconcile_logged()
+        self._thread = threading.Thread(target=self._run, name="portfolio-reconcile", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    # Reading
+
+    @property
+    def ready(self) -> bool:
+        return self.seeded_at is not None
+
+    def available(self) -> int:
+        """Cents not held by open buy orders."""
+        return self.balance - self._held_total
+
+    def position(self, ticker: str) -> Optional[Position]:
+        return self._positions.get(ticker)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns balance, non-zero positions and open orders."""
+        with self._lock:
+            return {
+                "balance": self.balance,
+                "available": self.balance - self._held_total,
+                "exposure": self._exposure_total,
+                "positions": [p.to_dict() for p in self._positions.values() if p.position],
+                "open_orders": [o.to_dict() for o in self._orders.values()],
+                "pending_orders": [o.to_dict() for o in self._pending.values()],
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns state sizes, check and rejection counters and reconcile freshness."""
+        others = self.holds.held_by_others() if self.holds is not None else None
+        with self._lock:
+            return {
+                "balance": self.balance,
+                "available": self.balance - self._held_total,
+                "exposure": self._exposure_total,
+                "held_by_orders": self._held_total,
+                "held_by_other_workers": others,
+                "positions": sum(1 for p in self._positions.values() if p.position),
+                "open_orders": len(self._orders),
+                "pending_orders": len(self._pending),
+                "checks": self.checks,
+                "rejections": dict(self.rejections),
+                "fills": self.fills,
+                "position_updates": self.position_updates,
+                "reconciles": self.reconciles,
+                "reconcile_errors": self.reconcile_errors,
+                "corrections": self.corrections,
+                "seconds_since_reconcile": time.time() - self.seeded_at if self.seeded_at else None,
+            }
+
+
+class PortfolioFeed(KalshiWebSocketClient):
+    """WebSocket client streaming the account's fills and positions into a Portfolio.
+
+    Neither channel replays what was missed, so a reconnect or a sequence
+    gap asks the portfolio for a REST reconcile instead of waiting for the
+    next scheduled one.
+    """
+    CHANNELS = ["fill", "market_positions"]
+
+    def __init__(
+        self,
+        key_id: str,
+        private_key: rsa.RSAPrivateKey,
+        portfolio: Portfolio,
+        environment: Environment = Environment.DEMO,
+        channels: Optional[List[str]] = None,
+        queue_size: int = 10000,
+        **kwargs: Any,
+    ):
+        """Initializes the feed without connecting.
+
+        Args:
+            key_id (str): Your Kalshi API key ID.
+            private_key (rsa.RSAPrivateKey): Your RSA private key.
+            portfolio (Portfolio): Portfolio the messages are applied to.
+            environment (Environment): Exchange the account trades on.
+            channels (List[str]): Account channels to subscribe to.
+            queue_size (int): Raw frames allowed to wait for the decoder.
+            **kwargs: Passed to KalshiWebSocketClient, e.g. signer or backoff.
+        """
+        pipeline = MessagePipeline(maxsize=queue_size)
+        # Fills are deltas, so none may be dropped or collapsed
+        pipeline.subscribe(portfolio.apply, types=Portfolio.TYPES, policy="block", name="portfolio")
+        super().__init__(key_id, private_key, environment, pipeline=pipeline, **kwargs)
+        self.portfolio = portfolio
+        self.add_subscription(channels or list(self.CHANNELS))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    async def on_open(self):
+        await super().on_open()
+        if self.connects > 1:
+            self.portfolio.request_reconcile()
+
+    async def resync(self, subscription: Subscription):
+        await super().resync(subscription)
+        self.portfolio.request_reconcile()
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self.connect())
+        finally:
+            self._loop.close()
+
+    def start(self) -> None:
+        """Streams into the portfolio from a daemon thread, reconnecting when dropped."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="portfolio-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Closes the connection and stops reconnecting."""
+        if self._loop is not None and self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.close(), self._loop)
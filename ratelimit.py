@@ -0,0 +1,234 @@
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from shared_state import SharedDB
+
+
+class TokenBucket:
+    """Thread-safe token bucket that can also be awaited from asyncio tasks.
+
+    Callers reserve tokens under a lock and then sleep off any deficit outside
+    it, so threads and coroutines share one budget without holding the lock
+    while they wait.
+    """
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """Initializes a full bucket.
+
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Maximum burst size; defaults to one second of tokens.
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.waited_seconds = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Takes tokens, possibly going into debt, and returns the seconds to wait."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            if wait:
+                self.waits += 1
+                self.waited_seconds += wait
+            return wait
+
+    def acquire(self, tokens: float = 1) -> None:
+        """Blocks the calling thread until the tokens are available."""
+        wait = self.reserve(tokens)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1) -> None:
+        """Waits without blocking the event loop until the tokens are available."""
+        wait = self.reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Holds back every caller for at least `seconds`, e.g. after a 429."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def throttle(self, factor: float = 0.5, floor: float = 1.0) -> None:
+        """Multiplicatively lowers the refill rate."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(floor, self.rate * factor)
+
+    def recover(self, step: float = 0.05) -> None:
+        """Additively restores the refill rate toward its configured maximum."""
+        if self.rate < self.max_rate:
+            with self._lock:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.max_rate * step)
+
+
+class SharedTokenBucket(TokenBucket):
+    """TokenBucket whose tokens and rate live in a SharedDB, so every process draws from one budget.
+
+    Each reservation is one short SQLite write transaction. Refills use wall
+    clock time, since monotonic clocks are not comparable across processes.
+    Wait counters stay per process.
+    """
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS buckets "
+              "(name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, rate REAL NOT NULL)")
+
+    def __init__(self, db: SharedDB, name: str, rate: float, capacity: Optional[float] = None):
+        """Joins the named bucket, creating it full if no process has yet.
+
+        Args:
+            db (SharedDB): Database holding the bucket.
+            name (str): Bucket name; processes using the same name share the budget.
+            rate (float): Tokens added per second.
+            capacity (float): Maximum burst size; defaults to one second of tokens.
+        """
+        super().__init__(rate, capacity)
+        self.db = db
+        self.name = name
+        with db.transaction() as conn:
+            conn.execute(self.SCHEMA)
+            # A lower configured rate takes effect at once; a higher one is reached through recover()
+            conn.execute("INSERT INTO buckets (name, tokens, updated, rate) VALUES (?, ?, ?, ?) "
+                         "ON CONFLICT (name) DO UPDATE SET rate = MIN(rate, excluded.rate)",
+                         (name, self.capacity, time.time(), rate))
+
+    def _update(self, change: Callable[[float, float], Tuple[float, float, Any]]) -> Any:
+        """Refills the shared bucket, applies change(tokens, rate) -> (tokens, rate, result) and stores it."""
+        with self.db.transaction() as conn:
+            tokens, updated, rate = conn.execute(
+                "SELECT tokens, updated, rate FROM buckets WHERE name = ?", (self.name,)).fetchone()
+            now = time.time()
+            tokens = min(self.capacity, tokens + max(0.0, now - updated) * rate)
+            tokens, rate, result = change(tokens, rate)
+            conn.execute("UPDATE buckets SET tokens = ?, updated = ?, rate = ? WHERE name = ?",
+                         (tokens, now, rate, self.name))
+        self.tokens, self.rate = tokens, rate
+        return result
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Takes tokens, possibly going into debt, and returns the seconds to wait."""
+        def take(available, rate):
+            available -= tokens
+            return available, rate, -available / rate if available < 0 else 0.0
+        wait = self._update(take)
+        if wait:
+            with self._lock:
+                self.waits += 1
+                self.waited_seconds += wait
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        """Holds back every caller, in every process, for at least `seconds`."""
+        self._update(lambda available, rate: (min(available, -seconds * rate), rate, None))
+
+    def throttle(self, factor: float = 0.5, floor: float = 1.0) -> None:
+        """Multiplicatively lowers the shared refill rate."""
+        self._update(lambda available, rate: (available, max(floor, rate * factor), None))
+
+    def recover(self, step: float = 0.05) -> None:
+        """Additively restores the shared refill rate toward its configured maximum."""
+        # self.rate is this process's last view; at full rate no transaction is needed
+        if self.rate < self.max_rate:
+            self._update(lambda available, rate: (available, min(self.max_rate, rate + self.max_rate * step), None))
+
+
+class RateLimiter:
+    """Separate read and write token buckets for one API host.
+
+    The buckets start at the configured budget, back off multiplicatively
+    when the server answers 429 or reports an exhausted quota, and creep back
+    up on successful responses.
+    """
+    READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+    def __init__(
+        self,
+        read_rate: float = 20,
+        write_rate: float = 10,
+        read_burst: Optional[float] = None,
+        write_burst: Optional[float] = None,
+        shared: Optional[SharedDB] = None,
+        name: str = "kalshi",
+    ):
+        """Initializes the limiter.
+
+        Args:
+            read_rate (float): Reads allowed per second.
+            write_rate (float): Writes allowed per second.
+            read_burst (float): Read burst capacity; defaults to read_rate.
+            write_burst (float): Write burst capacity; defaults to write_rate.
+            shared (SharedDB): Keep the budget there, shared with every process using the same name.
+            name (str): Name of the shared budget.
+        """
+        if shared is not None:
+            self.read = SharedTokenBucket(shared, name + ":read", read_rate, read_burst)
+            self.write = SharedTokenBucket(shared, name + ":write", write_rate, write_burst)
+        else:
+            self.read = TokenBucket(read_rate, read_burst)
+            self.write = TokenBucket(write_rate, write_burst)
+        self.shared = shared is not None
+        self.throttled = 0
+
+    def bucket(self, method: str) -> TokenBucket:
+        """Returns the bucket that a request with this method draws from."""
+        return self.read if method.upper() in self.READ_METHODS else self.write
+
+    def acquire(self, method: str) -> None:
+        """Blocks until a request with this method may be sent."""
+        self.bucket(method).acquire()
+
+    async def acquire_async(self, method: str) -> None:
+        """Awaits until a request with this method may be sent."""
+        await self.bucket(method).acquire_async()
+
+    def observe(self, method: str, response: Any) -> None:
+        """Adapts the budget to a response's status code and rate-limit headers."""
+        bucket = self.bucket(method)
+        headers = response.headers
+        if response.status_code == 429:
+            self.throttled += 1
+            bucket.throttle()
+            bucket.pause(self._retry_after(headers) or 1 / bucket.rate)
+            return
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is not None and remaining.strip() == "0":
+            reset = self._retry_after(headers, "X-RateLimit-Reset")
+            if reset:
+                bucket.pause(reset)
+            return
+        bucket.recover()
+
+    @staticmethod
+    def _retry_after(headers: Any, name: str = "Retry-After") -> Optional[float]:
+        value = headers.get(name)
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            return None
+        # Some servers send an epoch timestamp rather than a delay.
+        return max(0.0, seconds - time.time()) if seconds > 1e9 else seconds
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the current rates and how often callers had to wait."""
+        stats: Dict[str, Any] = {"throttled_responses": self.throttled, "shared": self.shared}
+        for name, bucket in (("read", self.read), ("write", self.write)):
+            stats[f"{name}_rate"] = bucket.rate
+            stats[f"{name}_max_rate"] = bucket.max_rate
+            stats[f"{name}_waits"] = bucket.waits
+            stats[f"{name}_waited_seconds"] = round(bucket.waited_seconds, 3)
+        return stats
@@ -0,0 +1,118 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class Resource:
+    """A value built by its factory on first call and shared by every thread after that.
+
+    A failed build is recorded and retried on the next call, so a resource
+    that needs the network or a missing file does not take the server down.
+    """
+    def __init__(self, name: str, factory: Callable[[], Any], critical: bool = True):
+        """Initializes the resource without building it.
+
+        Args:
+            name (str): Name reported by status().
+            factory (Callable): Builds the value; called at most once successfully.
+            critical (bool): Whether the app is not ready until this is loaded.
+        """
+        self.name = name
+        self.factory = factory
+        self.critical = critical
+        self.loaded = False
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._value: Any = None
+        self._lock = threading.Lock()
+
+    def __call__(self) -> Any:
+        if self.loaded:
+            return self._value
+        with self._lock:
+            if not self.loaded:
+                start = time.perf_counter()
+                try:
+                    self._value = self.factory()
+                except Exception as e:
+                    self.error = f"{type(e).__name__}: {e}"
+                    raise
+                self.load_seconds = time.perf_counter() - start
+                self.error = None
+                self.loaded = True
+        return self._value
+
+    def peek(self) -> Any:
+        """Returns the value if it has been built, without building it."""
+        return self._value if self.loaded else None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "critical": self.critical,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
+
+
+class Resources:
+    """Registry of lazily built resources with an optional background warm-up.
+
+    Importing the app only registers factories; nothing heavy happens until a
+    request needs it or warm() builds everything in registration order.
+    """
+    def __init__(self):
+        self._resources: Dict[str, Resource] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.created = time.monotonic()
+        self.warmed_seconds: Optional[float] = None
+
+    def register(self, name: str, critical: bool = True) -> Callable[[Callable[[], Any]], Resource]:
+        """Decorator turning a factory function into a registered Resource."""
+        def wrap(factory: Callable[[], Any]) -> Resource:
+            resource = Resource(name, factory, critical)
+            self._resources[name] = resource
+            return resource
+        return wrap
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._resources
+
+    def override(self, name: str, factory: Callable[[], Any]) -> None:
+        """Replaces a resource's factory before it is built, e.g. with a stub in a benchmark."""
+        resource = self._resources[name]
+        if resource.loaded:
+            raise RuntimeError(f"{name} is already loaded")
+        resource.factory = factory
+
+    def _warm_all(self) -> None:
+        for resource in list(self._resources.values()):
+            try:
+                resource()
+            except Exception as e:
+                print(f"Failed to load {resource.name}: {e}")
+        self.warmed_seconds = time.monotonic() - self.created
+
+    def warm(self, background: bool = True) -> None:
+        """Builds every resource, on a daemon thread unless background is False."""
+        if not background:
+            self._warm_all()
+            return
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._warm_all, name="warm-up", daemon=True)
+        self._thread.start()
+
+    def ready(self) -> bool:
+        """Returns True once every critical resource is loaded."""
+        return all(r.loaded for r in self._resources.values() if r.critical)
+
+    def status(self) -> Dict[str, Any]:
+        """Returns readiness and the load state and time of each resource."""
+        return {
+            "ready": self.ready(),
+            "warming": bool(self._thread and self._thread.is_alive()),
+            "uptime_seconds": time.monotonic() - self.created,
+            "warmed_seconds": self.warmed_seconds,
+            "resources": {name: r.status() for name, r in self._resources.items()},
+        }
@@ -0,0 +1,220 @@
+import math
+import re
+from array import array
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:  # typo tolerance is optional
+    process = None
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the this to "
+    "will with what when which who yes no buy sell contract contracts".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases text and splits it into indexable terms."""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _bigrams(term: str) -> set:
+    return {term[i:i + 2] for i in range(len(term) - 1)}
+
+
+def _by_document(ids: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # The lists are each sorted already, so a stable sort only merges them
+    order = np.argsort(ids, kind="stable")
+    return ids[order], weights[order]
+
+
+class SearchIndex:
+    """BM25 inverted index with exact top-k retrieval.
+
+    Term weights are computed once at build time and stored with each
+    posting, so a query sums whole posting lists with numpy rather than a
+    Python loop. Scores are exact BM25; only the top k are sorted.
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75, fuzzy_cutoff: float = 85):
+        """Initializes an empty index.
+
+        Args:
+            k1 (float): BM25 term-frequency saturation.
+            b (float): BM25 document-length normalization.
+            fuzzy_cutoff (float): Minimum rapidfuzz ratio for correcting an unknown term.
+        """
+        self.k1 = k1
+        self.b = b
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.doc_ids: List[Hashable] = []
+        self.postings: Dict[Tuple[str, Optional[str]], Tuple[np.ndarray, np.ndarray]] = {}
+        self._vocabulary: List[str] = []
+        self._by_length: Dict[int, np.ndarray] = {}  # vocabulary positions of the terms of each length
+        self._bigrams: Dict[Tuple[str, int], np.ndarray] = {}  # ... and of those containing a bigram, by (bigram, length)
+        self._corrections: Dict[str, Optional[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def build(self, docs: Iterable[Tuple]) -> "SearchIndex":
+        """Indexes documents, replacing any previous contents.
+
+        Args:
+            docs (Iterable[Tuple]): (doc_id, text) or (doc_id, text, groups) tuples. Groups
+                (e.g. categories) get their own posting lists so filtered queries stay cheap.
+        """
+        doc_ids: List[Hashable] = []
+        doc_groups: List[Tuple[str, ...]] = []
+        term_freqs: List[Counter] = []
+        lengths: List[int] = []
+        for doc in docs:
+            tokens = tokenize(doc[1])
+            doc_ids.append(doc[0])
+            doc_groups.append(tuple(doc[2]) if len(doc) > 2 else ())
+            term_freqs.append(Counter(tokens))
+            lengths.append(len(tokens))
+
+        n = len(doc_ids)
+        avgdl = (sum(lengths) / n) if n else 0.0
+        raw: Dict[str, List[Tuple[float, int]]] = {}
+        for idx, tf in enumerate(term_freqs):
+            norm = self.k1 * (1 - self.b + self.b * lengths[idx] / avgdl) if avgdl else self.k1
+            for term, count in tf.items():
+                raw.setdefault(term, []).append((count * (self.k1 + 1) / (count + norm), idx))
+
+        postings: Dict[Tuple[str, Optional[str]], Tuple[np.ndarray, np.ndarray]] = {}
+        for term, entries in raw.items():
+            # Entries are in document order, so every posting list is sorted by document
+            idf = math.log(1 + (n - len(entries) + 0.5) / (len(entries) + 0.5))
+            grouped: Dict[Optional[str], Tuple[array, array]] = {None: (array("i"), array("d"))}
+            for weight, idx in entries:
+                for group in (None,) + doc_groups[idx]:
+                    if group not in grouped:
+                        grouped[group] = (array("i"), array("d"))
+                    ids, weights = grouped[group]
+                    ids.append(idx)
+                    weights.append(weight * idf)
+            for group, (ids, weights) in grouped.items():
+                postings[term, group] = (np.frombuffer(ids, dtype=np.intc), np.frombuffer(weights, dtype=np.float64))
+
+        vocabulary = list(raw)
+        by_length: Dict[int, List[int]] = {}
+        bigrams: Dict[Tuple[str, int], List[int]] = {}
+        for position, term in enumerate(vocabulary):
+            by_length.setdefault(len(term), []).append(position)
+            for bigram in _bigrams(term):
+                bigrams.setdefault((bigram, len(term)), []).append(position)
+        self.doc_ids = doc_ids
+        self.postings = postings
+        self._vocabulary = vocabulary
+        self._by_length = {length: np.array(positions, dtype=np.intc) for length, positions in by_length.items()}
+        self._bigrams = {key: np.array(positions, dtype=np.intc) for key, positions in bigrams.items()}
+        self._corrections = {}
+        return self
+
+    def correct(self, term: str) -> Optional[str]:
+        """Maps an out-of-vocabulary term to its closest indexed term, if any."""
+        if process is None or not self._vocabulary:
+            return None
+        if term in self._corrections:
+            return self._corrections[term]
+        if len(self._corrections) >= 4096:
+            self._corrections.clear()
+        self._corrections[term] = corrected = self._closest(term)
+        return corrected
+
+    def _closest(self, term: str) -> Optional[str]:
+        # fuzz.ratio is 2 * matches / (len(a) + len(b)), so only terms of nearby lengths can reach the
+        # cutoff, each within the few insertions or deletions of `term` its length allows. Each of those
+        # breaks at most two of the term's bigrams, so a match shares the rest, and so contains one of
+        # its rarest bigrams. rapidfuzz then scores just those candidates, in vocabulary order, which
+        # picks the same term as scoring the whole vocabulary would.
+        cutoff = self.fuzzy_cutoff / 100
+        shortest = math.ceil(len(term) * cutoff / (2 - cutoff) - 1e-9)
+        longest = math.floor(len(term) * (2 - cutoff) / cutoff + 1e-9)
+        grams = _bigrams(term)
+        missing = np.zeros(0, dtype=np.intc)
+        parts: List[np.ndarray] = []
+        for length in range(shortest, longest + 1):
+            if length not in self._by_length:
+                continue
+            shared = len(grams) - 2 * math.floor((1 - cutoff) * (len(term) + length) + 1e-9)
+            if shared <= 0:
+                # Too short to rule anything out by bigrams
+                parts.append(self._by_length[length])
+                continue
+            # Sharing `shared` of the bigrams means holding one of the rarest len(grams) - shared + 1
+            found = sorted((self._bigrams.get((gram, length), missing) for gram in grams), key=len)
+            parts += found[:len(grams) - shared + 1]
+        if not parts:
+            return None
+        positions = np.sort(np.concatenate(parts))
+        positions = positions[np.diff(positions, prepend=-1) > 0]
+        vocabulary = self._vocabulary
+        terms = [vocabulary[position] for position in positions.tolist()]
+        match = process.extractOne(term, terms, scorer=fuzz.ratio, score_cutoff=self.fuzzy_cutoff)
+        return match[0] if match else None
+
+    def search(self, query: str, k: int = 25, groups: Optional[Iterable[str]] = None) -> List[Tuple[Hashable, float]]:
+        """Returns up to k (doc_id, score) pairs, best first.
+
+        Args:
+            query (str): Free text query.
+            k (int): Maximum number of results.
+            groups (Iterable[str]): Optional groups the results must belong to.
+        """
+        groups = [None] if groups is None else list(dict.fromkeys(groups))
+        postings = self.postings
+        id_parts: List[np.ndarray] = []
+        weight_parts: List[np.ndarray] = []
+        for term in set(tokenize(query)):
+            if (term, None) not in postings:
+                term = self.correct(term)
+                if term is None:
+                    continue
+            found = [postings[term, group] for group in groups if (term, group) in postings]
+            if len(found) == 1:
+                id_parts.append(found[0][0])
+                weight_parts.append(found[0][1])
+            elif found:
+                # A document filed under several requested groups counts once.
+                ids, weights = _by_document(np.concatenate([ids for ids, _ in found]),
+                                            np.concatenate([weights for _, weights in found]))
+                keep = np.diff(ids, prepend=-1) > 0
+                id_parts.append(ids[keep])
+                weight_parts.append(weights[keep])
+        if not id_parts or k <= 0:
+            return []
+
+        ids = np.concatenate(id_parts)
+        weights = np.concatenate(weight_parts)
+        n = len(self.doc_ids)
+        if len(ids) < n // 8:
+            # Few postings: sum them per document after a sort, without touching the whole collection
+            ids, weights = _by_document(ids, weights)
+            starts = np.flatnonzero(np.diff(ids, prepend=-1))
+            docs, scores = ids[starts], np.add.reduceat(weights, starts)
+        else:
+            # Many postings: sum into a score per document, then keep only those that can make the top k.
+            # The documents of the longest list are distinct, so the k-th best of their scores is a floor
+            # for the k-th best overall, and nothing below it needs partitioning.
+            scores = np.bincount(ids, weights=weights, minlength=n)
+            longest = max(id_parts, key=len)
+            if len(longest) > k:
+                sample = scores[longest]
+                floor = np.partition(sample, len(sample) - k)[len(sample) - k]
+                docs = np.flatnonzero(scores >= floor)
+            else:
+                docs = np.flatnonzero(scores)
+            scores = scores[docs]
+        top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        doc_ids = self.doc_ids
+        return [(doc_ids[idx], score) for idx, score in zip(docs[top].tolist(), scores[top].tolist())]
+
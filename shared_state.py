@@ -0,0 +1,190 @@
+"""
+State shared by every worker process on a host, kept in one SQLite file.
+
+Gunicorn workers (or any processes pointed at the same SHARED_STATE file)
+share:
+
+- catalog responses, through SharedCache, so N workers refreshing the
+  catalog cost Kalshi about as many requests as one worker does
+- the Kalshi rate-limit budget, through ratelimit.SharedTokenBucket
+- the cost of orders placed but not yet in every worker's portfolio
+  snapshot, through portfolio.SharedHolds
+
+Conversation history already lives in SQLite (conversations.py); workers
+only need to check their in-memory copy against it, which open_store does
+when shared=True. SQLite in WAL mode is the local stand-in for a
+Redis-style store: every operation here is a short transaction on one
+table, so the same schema maps directly onto one.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+Fetch = Callable[[str, Dict[str, Any]], Dict[str, Any]]
+
+
+class SharedDB:
+    """One SQLite file opened with a connection per thread."""
+    def __init__(self, path: str):
+        """Opens (and creates if needed) the database.
+
+        Args:
+            path (str): Database file; its directory is created if missing.
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._pid = os.getpid()
+
+    def connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, so a forked worker opens its own
+        if self._pid != os.getpid():
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def transaction(self) -> "_Transaction":
+        """A write transaction that takes the database lock up front, so read-modify-write is atomic."""
+        return _Transaction(self.connection())
+
+
+class _Transaction:
+    __slots__ = ("conn",)
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+class SharedCache:
+    """Cross-process cache of JSON responses with a TTL per entry.
+
+    A miss takes a short lease on the key before fetching, so when several
+    workers miss at once one of them fetches and the others wait for its
+    result, the cross-process counterpart of singleflight.SingleFlight.
+    """
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner INTEGER NOT NULL, expires REAL NOT NULL)",
+    )
+
+    def __init__(self, db: SharedDB, lease_seconds: float = 30.0, poll: float = 0.02):
+        """Creates the tables if needed.
+
+        Args:
+            db (SharedDB): Database holding the cache.
+            lease_seconds (float): How long a fetching worker holds a key before others may fetch it too.
+            poll (float): Seconds between checks while waiting on another worker's fetch.
+        """
+        self.db = db
+        self.lease_seconds = lease_seconds
+        self.poll = poll
+        with db.transaction() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+        self.hits = 0
+        self.misses = 0
+        self.waited = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self.db.connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires > ?", (key, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        now = time.time()
+        with self.db.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                         (key, json.dumps(value, separators=(",", ":")), now + ttl))
+            conn.execute("DELETE FROM leases WHERE key = ?", (key,))
+            # Keep the table from growing with keys nobody asks for again
+            conn.execute("DELETE FROM cache WHERE expires < ?", (now - ttl,))
+
+    def _lease(self, key: str) -> bool:
+        now = time.time()
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT expires FROM leases WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[0] > now:
+                return False
+            conn.execute("INSERT OR REPLACE INTO leases (key, owner, expires) VALUES (?, ?, ?)",
+                         (key, os.getpid(), now + self.lease_seconds))
+            return True
+
+    def _release(self, key: str) -> None:
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, os.getpid()))
+
+    def get_or_fetch(self, key: str, ttl: float, fetch: Callable[[], Any]) -> Any:
+        """Returns the cached value, or fetches, caches and returns it."""
+        value = self.get(key)
+        if value is not None:
+            self._count("hits")
+            return value
+        deadline = time.monotonic() + self.lease_seconds
+        while not self._lease(key):
+            # Another worker is fetching this key; use its result once it lands
+            time.sleep(self.poll)
+            value = self.get(key)
+            if value is not None:
+                self._count("waited")
+                return value
+            if time.monotonic() > deadline:
+                break
+        self._count("misses")
+        try:
+            value = fetch()
+        except BaseException:
+            self._release(key)
+            raise
+        self.set(key, value, ttl)
+        return value
+
+    def wrap(self, fetch: Fetch, ttls: Dict[str, float]) -> Fetch:
+        """Returns fetch with the responses of the given paths cached for their TTLs.
+
+        Args:
+            fetch (Fetch): Callable performing a GET for (path, params).
+            ttls (Dict[str, float]): Seconds to cache each path's responses; other paths are not cached.
+        """
+        def cached(path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+            ttl = ttls.get(path)
+            if not ttl:
+                return fetch(path, params)
+            key = path + "?" + json.dumps(params or {}, sort_keys=True, separators=(",", ":"))
+            return self.get_or_fetch(key, ttl, lambda: fetch(path, params))
+        return cached
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns this process's hit counters and the shared table's size."""
+        (entries,) = self.db.connection().execute(
+            "SELECT COUNT(*) FROM cache WHERE expires > ?", (time.time(),)).fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses + self.waited
+            return {
+                "path": self.db.path,
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "waited_for_other_worker": self.waited,
+                "hit_rate": (self.hits + self.waited) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,108 @@
+import base64
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+from tracing import tracer
+
+# Market data endpoints that Kalshi serves without authentication.
+PUBLIC_PATH_PREFIXES = (
+    "/trade-api/v2/series",
+    "/trade-api/v2/events",
+    "/trade-api/v2/markets",
+    "/trade-api/v2/exchange",
+)
+
+_PSS = padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.DIGEST_LENGTH)
+_SHA256 = hashes.SHA256()
+
+
+class RequestSigner:
+    """Builds Kalshi authentication headers.
+
+    Public GET endpoints skip RSA-PSS signing entirely. Private requests
+    are signed inline: every caller is already on a worker thread (request
+    handlers, the order router, the WebSocket feeds' own loops), so handing
+    the signature to a pool would only add a hop.
+    """
+    def __init__(
+        self,
+        key_id: str,
+        private_key: rsa.RSAPrivateKey,
+        public_prefixes: Iterable[str] = PUBLIC_PATH_PREFIXES,
+    ):
+        """Initializes the signer.
+
+        Args:
+            key_id (str): Your Kalshi API key ID.
+            private_key (rsa.RSAPrivateKey): Your RSA private key.
+            public_prefixes (Iterable[str]): Path prefixes whose GETs need no signature.
+        """
+        self.key_id = key_id
+        self.private_key = private_key
+        self.public_prefixes = tuple(public_prefixes)
+        self._lock = threading.Lock()
+        self.sign_count = 0
+        self.skipped_count = 0
+        self.sign_seconds = 0.0
+        self.max_sign_seconds = 0.0
+
+    def is_public(self, method: str, path: str) -> bool:
+        return method == "GET" and path.startswith(self.public_prefixes)
+
+    def _record(self, seconds: float) -> None:
+        with self._lock:
+            self.sign_count += 1
+            self.sign_seconds += seconds
+            if seconds > self.max_sign_seconds:
+                self.max_sign_seconds = seconds
+
+    def sign(self, text: str) -> str:
+        """Signs the text using RSA-PSS and returns the base64 encoded signature."""
+        start = time.perf_counter()
+        try:
+            with tracer.span("kalshi.sign"):
+                signature = self.private_key.sign(text.encode("utf-8"), _PSS, _SHA256)
+        except InvalidSignature as e:
+            raise ValueError("RSA sign PSS failed") from e
+        self._record(time.perf_counter() - start)
+        return base64.b64encode(signature).decode("utf-8")
+
+    def _prepare(self, method: str, path: str):
+        # Query params are not part of the signed message.
+        path = path.split("?")[0]
+        if self.is_public(method, path):
+            with self._lock:
+                self.skipped_count += 1
+            return None, None
+        timestamp = str(int(time.time() * 1000))
+        return timestamp, timestamp + method + path
+
+    def _headers(self, timestamp: Optional[str], signature: Optional[str]) -> Dict[str, Any]:
+        if timestamp is None:
+            return {"Content-Type": "application/json"}
+        return {
+            "Content-Type": "application/json",
+            "KALSHI-ACCESS-KEY": self.key_id,
+            "KALSHI-ACCESS-SIGNATURE": signature,
+            "KALSHI-ACCESS-TIMESTAMP": timestamp,
+        }
+
+    def headers(self, method: str, path: str) -> Dict[str, Any]:
+        """Returns the headers for a request, signing inline when required."""
+        timestamp, text = self._prepare(method, path)
+        return self._headers(timestamp, self.sign(text) if text else None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns signing counts and per-signature timing."""
+        with self._lock:
+            return {
+                "signed": self.sign_count,
+                "skipped_public": self.skipped_count,
+                "mean_sign_ms": 1000 * self.sign_seconds / self.sign_count if self.sign_count else 0.0,
+                "max_sign_ms": 1000 * self.max_sign_seconds,
+            }
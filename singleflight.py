@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one.
+
+    The first caller for a key runs the call; callers arriving with the same
+    key while it is in flight wait for it and get the same result (or
+    exception) instead of making their own. Nothing is cached: once the call
+    finishes, the next caller starts a new one. Threads and asyncio tasks
+    share the same in-flight calls, so a blocking call made from a thread
+    pool and an awaited one for the same key still go upstream once.
+
+    Results are handed to every waiter as-is, so callers must not mutate them.
+    """
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def _join(self, key: Hashable):
+        """Returns (future, leader): the key's in-flight call, and whether the caller must run it."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = self._calls[key] = Future()
+            self.calls += 1
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future, result: Any = None, error: BaseException = None) -> None:
+        with self._lock:
+            del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Calls fn, or waits for the in-flight call with the same key, and returns its result."""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Awaits fn(), or the in-flight call with the same key, and returns its result.
+
+        fn may also be a blocking callable, which then runs in the default executor.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            if asyncio.iscoroutinefunction(fn):
+                result = await fn()
+            else:
+                result = await asyncio.to_thread(fn)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the calls made, the calls deduplicated and the calls in flight."""
+        with self._lock:
+            requests = self.calls + self.shared
+            return {
+                "calls": self.calls,
+                "deduplicated": self.shared,
+                "dedup_rate": self.shared / requests if requests else 0.0,
+                "in_flight": len(self._calls),
+            }
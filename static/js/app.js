@@ -71,36 +71,174 @@ async function sendMessage() {
   showTypingIndicator();
 
   try {
-    const response = await fetch("/api/chat", {
-      method: "POST",
-      headers: {
-        "Content-Type": "application/json",
-      },
-      body: JSON.stringify({
-        message: message,
-        conversation_id: currentConversationId,
-        refresh_markets: true, // Always get fresh market data for trading queries
-      }),
-    });
+    await streamChat(message);
+  } catch (error) {
+    // streamChat only throws before the first stage, so nothing has been ordered yet
+    console.error("Streaming failed, falling back to /api/chat:", error);
+    try {
+      const response = await fetch("/api/chat", {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+        },
+        body: JSON.stringify({
+          message: message,
+          conversation_id: currentConversationId,
+          refresh_markets: true, // Always get fresh market data for trading queries
+        }),
+      });
 
-    const data = await response.json();
+      const data = await response.json();
 
-    // Hide typing indicator
-    hideTypingIndicator();
+      // Hide typing indicator
+      hideTypingIndicator();
 
-    // Add assistant response to chat
-    addMessageToChat("assistant", data.response);
+      // Add assistant response to chat
+      addMessageToChat("assistant", data.response);
 
-    // Update conversation history
-    updateConversationHistory();
+      // Update conversation history
+      updateConversationHistory();
+    } catch (error) {
+      console.error("Error sending message:", error);
+      hideTypingIndicator();
+      addMessageToChat(
+        "assistant",
+        "Sorry, I encountered an error. Please try again."
+      );
+    }
+  }
+}
+
+// Stream the response stages over SSE, showing each one as it arrives
+async function streamChat(message) {
+  const response = await fetch("/api/chat/stream", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify({
+      message: message,
+      conversation_id: currentConversationId,
+    }),
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`HTTP ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let stages = null;
+  let finished = false;
+  let ordered = false;
+
+  try {
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Events are separated by a blank line
+      let boundary;
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let event = "message";
+        let data = "";
+        block.split("\n").forEach((line) => {
+          if (line.startsWith("event:")) event = line.slice(6).trim();
+          else if (line.startsWith("data:")) data += line.slice(5).trim();
+        });
+        if (event === "done") {
+          finished = true;
+          continue;
+        }
+
+        if (!stages) {
+          hideTypingIndicator();
+          stages = addStagesToChat();
+        }
+        ordered = ordered || event === "order";
+        renderStage(stages, event, data ? JSON.parse(data) : {});
+      }
+    }
   } catch (error) {
-    console.error("Error sending message:", error);
-    hideTypingIndicator();
-    addMessageToChat(
-      "assistant",
-      "Sorry, I encountered an error. Please try again."
-    );
+    // Before any stage the caller may safely retry with /api/chat
+    if (!stages) throw error;
+    console.error("Stream interrupted:", error);
   }
+
+  if (!stages) {
+    throw new Error("Stream ended without any stage");
+  }
+  if (!finished) {
+    // Resending could place the order twice, so report the interruption instead
+    renderStage(stages, "error", {
+      text: ordered
+        ? "The connection dropped after your order was sent, so it was not resubmitted. The exchange's answer will appear in this conversation's history."
+        : "The connection dropped before the reply arrived. Please try again.",
+    });
+  }
+  updateConversationHistory();
+}
+
+// Add an assistant message whose stage lines are filled in as they stream
+function addStagesToChat() {
+  addMessageToChat("assistant", "");
+  const chatContainer = document.getElementById("chatContainer");
+  const content = chatContainer.lastElementChild.querySelector(".message-content");
+  const list = document.createElement("div");
+  list.className = "stages";
+  const reply = document.createElement("div");
+  reply.className = "stage-reply";
+  content.appendChild(list);
+  content.appendChild(reply);
+  return { list: list, reply: reply };
+}
+
+function describeStage(event, data) {
+  switch (event) {
+    case "intent":
+      return `Understood: ${data.action || "buy"} ${data.volume} ${data.side} on "${data.query}"`;
+    case "events":
+      return `Found ${data.count} candidate events`;
+    case "market":
+      return data.market_ticker
+        ? `Market: ${data.market_ticker}`
+        : `No open market for ${data.event_ticker}`;
+    case "order":
+      return `Order sent: ${data.action} ${data.count} ${data.side} @ ${data[data.side + "_price"]}¢`;
+    case "ack":
+      return data.error
+        ? `Exchange: ${data.error}`
+        : `Exchange accepted order ${data.order_id || ""}`.trim();
+    default:
+      return null;
+  }
+}
+
+// Render one streamed stage with its timing
+function renderStage(stages, event, data) {
+  if (event === "reply" || event === "error") {
+    stages.reply.textContent = data.text;
+  } else {
+    const text = describeStage(event, data);
+    if (text) {
+      const line = document.createElement("div");
+      line.className = `stage stage-${event}`;
+      line.textContent = text;
+      if (data.stage_ms !== undefined) {
+        const timing = document.createElement("span");
+        timing.className = "stage-time";
+        timing.textContent = ` ${Math.round(data.stage_ms)} ms`;
+        line.appendChild(timing);
+      }
+      stages.list.appendChild(line);
+    }
+  }
+  const chatContainer = document.getElementById("chatContainer");
+  chatContainer.scrollTop = chatContainer.scrollHeight;
 }
 
 // Add message to chat interface
@@ -0,0 +1,416 @@
+"""
+Tracing spans, latency histograms and a sampling profiler.
+
+A span times one step of a request (an OpenAI call, a Kalshi fetch, a
+signature, a transcription). Every finished span is counted in a latency
+histogram keyed by its name and labels, which /metrics serves in the
+Prometheus text format. Spans opened inside another span on the same
+thread or asyncio task become its children, and each finished root span
+is kept with its children in a short ring buffer of recent traces.
+
+Labels become Prometheus labels, so they must have few distinct values
+(an HTTP method, an endpoint template); per-request details such as a
+ticker or a query go in span attributes, which are only kept in traces.
+"""
+import bisect
+import collections
+import contextvars
+import itertools
+import math
+import os
+import re
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Seconds; from a cached lookup up to a slow model call or transcription
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRIC_NAME_RE = re.compile(r"[^a-zA-Z0-9_]")
+ID_SEGMENT_RE = re.compile(r"[A-Z0-9]")
+
+_current: contextvars.ContextVar = contextvars.ContextVar("span", default=None)
+_ids = itertools.count(1)
+
+
+def path_label(path: str) -> str:
+    """Endpoint template for a Kalshi path: segments holding tickers or ids become {id}."""
+    path = path.split("?")[0]
+    return "/".join("{id}" if ID_SEGMENT_RE.search(segment) and segment != "v2" else segment for segment in path.split("/"))
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds."""
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """Returns (cumulative bucket counts including +Inf, sum, count)."""
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        return list(itertools.accumulate(counts)), total, count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th quantile, as Prometheus' histogram_quantile would bound it."""
+        cumulative, _, count = self.snapshot()
+        if not count:
+            return None
+        i = bisect.bisect_left(cumulative, q * count)
+        return self.buckets[i] if i < len(self.buckets) else math.inf
+
+
+class Span:
+    """One timed step; use Tracer.span or Tracer.start and Tracer.end."""
+    __slots__ = ("name", "labels", "attrs", "trace_id", "span_id", "parent_id", "root", "started", "start", "duration", "error", "children")
+
+    def __init__(self, name: str, labels: Dict[str, str], parent: Optional["Span"]):
+        self.name = name
+        self.labels = labels
+        self.attrs: Dict[str, Any] = {}
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent else None
+        self.root = parent.root if parent else self
+        self.trace_id = self.root.span_id
+        self.started = time.time() if parent is None else None
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self.children: List["Span"] = []
+
+    def set(self, **attrs: Any) -> None:
+        """Adds attributes kept with the trace, not in the metrics."""
+        self.attrs.update(attrs)
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        origin = self.start if origin is None else origin
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "offset_ms": round(1000 * (self.start - origin), 3),
+            "duration_ms": round(1000 * self.duration, 3) if self.duration is not None else None,
+            "labels": self.labels,
+            "attrs": self.attrs,
+            "error": self.error,
+        }
+
+
+class _NullSpan:
+    """Stands in for a span while tracing is off."""
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Scope:
+    """Context manager returned by Tracer.span."""
+    __slots__ = ("tracer", "name", "parent", "labels", "span", "token")
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional[Span], labels: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.parent = parent
+        self.labels = labels
+
+    def __enter__(self) -> Span:
+        self.span = self.tracer.start(self.name, self.parent, **self.labels)
+        self.token = _current.set(self.span) if self.span is not NULL_SPAN else None
+        return self.span
+
+    def __exit__(self, kind, error, traceback) -> None:
+        if self.token is not None:
+            _current.reset(self.token)
+            self.tracer.end(self.span, error)
+
+
+class Tracer:
+    """Records spans into histograms and keeps the most recent traces."""
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, max_traces: int = 200, enabled: bool = True, prefix: str = "talk2trade"):
+        """Initializes the tracer.
+
+        Args:
+            buckets (Tuple[float]): Histogram bucket upper bounds in seconds.
+            max_traces (int): Finished root traces kept for /api/traces.
+            enabled (bool): Whether spans are recorded at all.
+            prefix (str): Prefix of every exported metric name.
+        """
+        self.buckets = buckets
+        self.enabled = enabled
+        self.prefix = prefix
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+        self._errors: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], int] = collections.Counter()
+        self._traces = collections.deque(maxlen=max_traces)
+        self._gauges: List[Tuple[str, Callable[[], Optional[Dict[str, Any]]]]] = []
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: bool = True, max_traces: int = 200) -> None:
+        """Turns recording on or off and resizes the trace buffer."""
+        self.enabled = enabled
+        self._traces = collections.deque(self._traces, maxlen=max_traces)
+
+    @staticmethod
+    def current() -> Optional[Span]:
+        """The innermost open span on this thread or task."""
+        return _current.get()
+
+    def start(self, name: str, parent: Optional[Span] = None, **labels: Any) -> Span:
+        """Opens a span without making it current; end it with end().
+
+        For spans that outlive a block, such as one covering a generator
+        whose stages run between yields.
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        if parent is None or parent is NULL_SPAN:
+            parent = _current.get()
+        return Span(name, {k: str(v) for k, v in labels.items()} if labels else labels, parent)
+
+    def end(self, span: Span, error: Optional[BaseException] = None) -> None:
+        """Closes a span and records its duration."""
+        if span is NULL_SPAN or span.duration is not None:
+            return
+        span.duration = time.perf_counter() - span.start
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        key = (span.name, tuple(sorted(span.labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.buckets))
+        histogram.observe(span.duration)
+        if error is not None:
+            with self._lock:
+                self._errors[key] += 1
+        if span.root is span:
+            self._traces.append(span)
+        else:
+            span.root.children.append(span)
+
+    def span(self, name: str, parent: Optional[Span] = None, **labels: Any) -> "_Scope":
+        """Times a with block as a child of `parent`, or of the current span.
+
+        Must not be held across a yield: the span is current for the block
+        and the current span is per thread and per task.
+        """
+        return _Scope(self, name, parent, labels)
+
+    def traces(self, limit: int = 20, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recent finished traces, newest first, each with its spans in start order."""
+        found = []
+        for root in reversed(self._traces):
+            if name is not None and root.name != name:
+                continue
+            spans = sorted(list(root.children), key=lambda s: s.start)
+            found.append({
+                "trace_id": root.trace_id,
+                "started": root.started,
+                **root.to_dict(root.start),
+                "spans": [s.to_dict(root.start) for s in spans],
+            })
+            if len(found) >= limit:
+                break
+        return found
+
+    def gauges(self, name: str, collect: Callable[[], Optional[Dict[str, Any]]]) -> None:
+        """Exports the numbers in collect()'s dict (one level of nesting) as gauges named <prefix>_<name>_<key>.
+
+        collect() may return None, e.g. for a resource that is not loaded yet.
+        """
+        self._gauges.append((name, collect))
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """p50/p99 bucket bounds, count and mean per span name and labels, in milliseconds."""
+        with self._lock:
+            items = list(self._histograms.items())
+        result = {}
+        for (name, labels), histogram in sorted(items):
+            _, total, count = histogram.snapshot()
+            key = name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+            p50, p99 = histogram.quantile(0.5), histogram.quantile(0.99)
+            result[key] = {
+                "count": count,
+                "mean_ms": round(1000 * total / count, 3) if count else None,
+                "p50_ms_le": 1000 * p50 if p50 is not None else None,
+                "p99_ms_le": 1000 * p99 if p99 is not None else None,
+            }
+        return result
+
+    def render(self) -> str:
+        """Metrics in the Prometheus text exposition format (version 0.0.4)."""
+        metric = f"{self.prefix}_span_seconds"
+        lines = [f"# HELP {metric} Duration of traced spans.", f"# TYPE {metric} histogram"]
+        with self._lock:
+            items = sorted(self._histograms.items())
+            errors = sorted(self._errors.items())
+        for (name, labels), histogram in items:
+            cumulative, total, count = histogram.snapshot()
+            base = _labels((("span", name),) + labels)
+            for bound, value in zip(self.buckets + (math.inf,), cumulative):
+                le = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(f"{metric}_bucket{{{base},le=\"{le}\"}} {value}")
+            lines.append(f"{metric}_sum{{{base}}} {total!r}")
+            lines.append(f"{metric}_count{{{base}}} {count}")
+
+        metric = f"{self.prefix}_span_errors_total"
+        lines += [f"# HELP {metric} Spans that ended with an exception.", f"# TYPE {metric} counter"]
+        for (name, labels), count in errors:
+            lines.append(f"{metric}{{{_labels((('span', name),) + labels)}}} {count}")
+
+        for name, collect in self._gauges:
+            try:
+                values = collect()
+            except Exception as e:
+                lines.append(f"# {name}: {type(e).__name__}: {e}")
+                continue
+            for key, value in _flatten(values or {}):
+                gauge = METRIC_NAME_RE.sub("_", f"{self.prefix}_{name}_{key}")
+                lines += [f"# TYPE {gauge} gauge", f"{gauge} {float(value)!r}"]
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._errors.clear()
+            self._traces.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(pairs: Tuple[Tuple[str, str], ...]) -> str:
+    return ",".join(f"{METRIC_NAME_RE.sub('_', k)}=\"{_escape(v)}\"" for k, v in pairs)
+
+
+def _flatten(values: Dict[str, Any], prefix: str = "", depth: int = 0) -> Iterator[Tuple[str, float]]:
+    for key, value in values.items():
+        if isinstance(value, bool) or (isinstance(value, (int, float)) and math.isfinite(value)):
+            yield prefix + str(key), value
+        elif isinstance(value, dict) and depth < 1:
+            yield from _flatten(value, f"{prefix}{key}_", depth + 1)
+
+
+class SamplingProfiler:
+    """Samples the stack of every thread at an interval and counts each distinct stack.
+
+    Stacks are reported in the folded format of flamegraph.pl and
+    speedscope: one "thread;module:function;... count" line per stack,
+    outermost frame first. Nothing runs while it is stopped.
+    """
+    def __init__(self, interval: float = 0.01, max_depth: int = 64):
+        """Initializes a stopped profiler.
+
+        Args:
+            interval (float): Seconds between samples.
+            max_depth (int): Innermost frames kept per stack.
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self.started: Optional[float] = None
+        self.sampled_seconds = 0.0
+        self.overhead_seconds = 0.0
+        self._counts: Dict[str, int] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None) -> None:
+        """Starts sampling, keeping what earlier runs collected."""
+        with self._lock:
+            if interval:
+                self.interval = interval
+            if self.running:
+                return
+            self._stop.clear()
+            self.started = time.time()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+            self.sampled_seconds += time.time() - self.started
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+            self.samples = 0
+            self.sampled_seconds = 0.0
+            self.overhead_seconds = 0.0
+            if self.running:
+                self.started = time.time()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            began = time.perf_counter()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.splitext(os.path.basename(code.co_filename))[0]}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                key = ";".join(reversed(stack))
+                with self._lock:
+                    self._counts[key] += 1
+            self.samples += 1
+            self.overhead_seconds += time.perf_counter() - began
+
+    def folded(self, limit: Optional[int] = None) -> str:
+        """The sampled stacks in folded format, most frequent first."""
+        with self._lock:
+            stacks = sorted(self._counts.items(), key=lambda item: -item[1])
+        return "".join(f"{stack} {count}\n" for stack, count in stacks[:limit])
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Functions by samples in which they were the innermost frame."""
+        leaves = collections.Counter()
+        with self._lock:
+            for stack, count in self._counts.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [{"function": name, "samples": count, "share": round(count / total, 4)} for name, count in leaves.most_common(limit)]
+
+    def stats(self) -> Dict[str, Any]:
+        seconds = self.sampled_seconds + (time.time() - self.started if self.running else 0.0)
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "samples": self.samples,
+            "stacks": len(self._counts),
+            "seconds": round(seconds, 3),
+            # Time spent taking samples, which holds the GIL
+            "overhead_seconds": round(self.overhead_seconds, 3),
+        }
+
+
+# Shared by every module, like the logging module's root logger
+tracer = Tracer()
+profiler = SamplingProfiler()
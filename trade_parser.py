@@ -0,0 +1,275 @@
+"""
+Deterministic parser for the trade part of a request.
+
+Reads the action, volume and side from a leading clause ("Buy 10 yes
+contracts that ...", "I'd like to sell twenty-five no on ...") or a
+trailing one ("... , 10 yes"), and returns the rest as the query. Anything
+it cannot read with certainty (dollar amounts, two orders in one message,
+conflicting sides, a bare "no" that may belong to the question) is marked
+not confident so the caller can ask the LLM instead.
+
+A number is only read as the volume when it is tied to the trade: right
+after the action ("buy 5") or right before a side or unit ("5 yes",
+"5 contracts", "5 on no"). Any other number, such as the year in "buy yes
+on the 2028 election", stays in the query. When trade words are left in
+the query ("for 3 ...", "... for 5 yes on ...") the parse is not confident.
+"""
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+from search import tokenize
+
+# Digits glued to letters ("49ers", "3rd", "q3") are one word, never a number and a word
+TOKEN_RE = re.compile(r"\$?\d[\d,]*(?:\.\d+)?[k%]?(?![a-z\d])|[a-z\d]*\d[a-z\d]*|[a-z]+(?:'[a-z]+)?|[,;:!?.\-–—]")
+NUMBER_RE = re.compile(r"\$?\d[\d,]*(?:\.\d+)?[k%]?")
+YEAR_RE = re.compile(r"(?:19|20)\d\d")
+PUNCTUATION = frozenset(",;:!?.-–—")
+
+POLITE = frozenset("i i'd id i'll ill want would like to please let's lets can could you me my gonna wanna just go ahead and".split())
+BUY = frozenset("buy purchase get take bet put place grab long".split())
+SELL = frozenset("sell dump unload offload".split())
+UNITS = frozenset("contract contracts share shares unit units lot lots x".split())
+SIDES = {"yes": "yes", "yeses": "yes", "no": "no", "nos": "no"}
+CONNECTORS = frozenset("on that for of the side betting whether saying at".split())
+TRAILING = frozenset("for on of please".split())
+NEGATIONS = frozenset("don't dont not never unless instead cancel".split())
+
+NUMBER_WORDS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14, "fifteen": 15,
+    "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19, "dozen": 12,
+}
+TENS_WORDS = {"twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90}
+SCALE_WORDS = {"hundred": 100, "thousand": 1000}
+ORDER_NOUNS = frozenset("order orders trade position bet".split())
+_COUNT = r"(?:\d[\d,]*k?|" + "|".join(list(NUMBER_WORDS) + list(TENS_WORDS)) + r")"
+# Trade words the clauses did not take: "5 yes", "ten contracts", "for no" inside the query
+LEFTOVER_RE = re.compile(rf"\b{_COUNT}\s+(?:yes|no|contracts?|shares?)\b|\b(?:on|for|of)\s+(?:yes|no)\b")
+SECOND_ORDER_RE = re.compile(r"\b(?:and|then|plus|also)\s+(?:\d+|yes|no|buy|sell)\b|\b(?:buy|sell)\s+(?:\d+|yes|no)\b")
+
+MAX_VOLUME = 1_000_000
+
+
+class ParsedTrade(NamedTuple):
+    """Result of parse_trade. `reason` says why it is not confident."""
+    volume: int
+    side: str
+    action: str
+    query: str
+    confident: bool
+    reason: Optional[str] = None
+
+
+class _Token(NamedTuple):
+    text: str
+    start: int
+    end: int
+
+
+def _number(tokens: List[_Token], i: int) -> Optional[Tuple[object, int]]:
+    """Reads a volume starting at tokens[i]; returns (value, next index), or None.
+
+    The value is a str naming the problem when the number is not a contract count.
+    """
+    text = tokens[i].text
+    if text[0] == "$":
+        return "a dollar amount", i + 1
+    if text[0].isdigit():
+        if not NUMBER_RE.fullmatch(text):
+            return None
+        if text.endswith("%"):
+            return "a percentage", i + 1
+        if "." in text:
+            return "a fractional volume", i + 1
+        if YEAR_RE.fullmatch(text):
+            return "a year-like number", i + 1
+        value = int(text.rstrip("k").replace(",", "")) * (1000 if text.endswith("k") else 1)
+        return value, i + 1
+    if text in ("a", "an"):
+        # "a yes contract", "a dozen": only a volume when a count word follows
+        following = tokens[i + 1].text if i + 1 < len(tokens) else ""
+        if following in ("dozen", "hundred", "thousand"):
+            return _number(tokens, i + 1)
+        if following in SIDES or following in UNITS or following in ("single", "couple"):
+            return (2 if following == "couple" else 1), i + 1 + (following in ("single", "couple"))
+        return None
+    value, seen, j = 0, False, i
+    current = 0
+    while j < len(tokens):
+        word = tokens[j].text
+        if word in NUMBER_WORDS:
+            current += NUMBER_WORDS[word]
+        elif word in TENS_WORDS:
+            current += TENS_WORDS[word]
+        elif word in SCALE_WORDS:
+            current = max(current, 1) * SCALE_WORDS[word]
+            if SCALE_WORDS[word] == 1000:
+                value, current = value + current, 0
+        elif word == "-" and seen and j + 1 < len(tokens) and tokens[j + 1].text in NUMBER_WORDS:
+            pass  # twenty-five
+        elif word == "and" and seen and j + 1 < len(tokens) and (tokens[j + 1].text in NUMBER_WORDS or tokens[j + 1].text in TENS_WORDS):
+            pass  # one hundred and five
+        else:
+            break
+        seen = True
+        j += 1
+    return (value + current, j) if seen else None
+
+
+class _Clause:
+    """Trade words read from one end of the message."""
+    def __init__(self):
+        self.action: Optional[str] = None
+        self.volume: Optional[int] = None
+        self.side: Optional[str] = None
+        self.units = False
+        self.connector = False
+        self.connector_after_side = False
+        self.problem: Optional[str] = None
+
+    def set(self, name: str, value: object) -> None:
+        current = getattr(self, name)
+        if current is not None and current != value:
+            self.problem = f"conflicting {name}"
+        setattr(self, name, value)
+
+
+def _tied(tokens: List[_Token], i: int, j: int) -> bool:
+    """Whether the number in tokens[i:j] is the volume: after the action, or before a side or unit."""
+    if i > 0 and (tokens[i - 1].text in BUY or tokens[i - 1].text in SELL):
+        return True
+    following = tokens[j].text if j < len(tokens) else ""
+    if following in SIDES or following in UNITS:
+        return True
+    # "10 on yes for ..."
+    return following == "on" and j + 1 < len(tokens) and tokens[j + 1].text in SIDES
+
+
+def _read(clause: _Clause, tokens: List[_Token], i: int, trailing: bool) -> Optional[int]:
+    """Reads one trade word at tokens[i] into the clause; returns the next index or None."""
+    text = tokens[i].text
+    if text in BUY or text in SELL:
+        clause.set("action", "buy" if text in BUY else "sell")
+        return i + 1
+    number = _number(tokens, i)
+    if number is not None:
+        value, j = number
+        if not trailing and not _tied(tokens, i, j):
+            # A number not next to the action, a side or a unit belongs to the question
+            return None
+        if isinstance(value, str):
+            clause.problem = value
+        elif clause.volume is not None:
+            clause.problem = "more than one volume"
+        else:
+            clause.volume = value
+        return j
+    if text in SIDES:
+        if clause.connector and clause.side == SIDES[text]:
+            # "buy 2 yes on Yes Bank": the side is already read, so this one starts the query
+            return None
+        clause.set("side", SIDES[text])
+        return i + 1
+    if text in UNITS:
+        clause.units = True
+        return i + 1
+    if text in NEGATIONS:
+        clause.problem = f"negation ({text})"
+        return i + 1
+    if text in PUNCTUATION:
+        return i + 1
+    if trailing:
+        return i + 1 if text in TRAILING else None
+    if text in POLITE:
+        return i + 1
+    if text in ("a", "an") and i + 1 < len(tokens) and tokens[i + 1].text in ORDER_NOUNS:
+        # "place an order for ..."
+        return i + 2
+    if text in CONNECTORS:
+        clause.connector = True
+        if clause.side is not None:
+            clause.connector_after_side = True
+        return i + 1
+    return None
+
+
+def parse_trade(message: str) -> ParsedTrade:
+    """Parses action, volume, side and the trimmed query from a trade request.
+
+    Volume defaults to 1, side to "yes" and action to "buy", as the LLM
+    prompt does.
+    """
+    lowered = message.lower()
+    tokens = [_Token(m.group(), m.start(), m.end()) for m in TOKEN_RE.finditer(lowered)]
+
+    lead = _Clause()
+    i = 0
+    while i < len(tokens):
+        j = _read(lead, tokens, i, trailing=False)
+        if j is None:
+            break
+        i = j
+    start = i
+
+    # Trailing clause, read backwards: "..., 10 yes" or "... yes". A bare number is
+    # only taken after a separator, so "Lakers win game 7 yes" keeps its 7.
+    tail = _Clause()
+    end = len(tokens)
+    k = end
+    while k > start:
+        text = tokens[k - 1].text
+        if text in SIDES or text in UNITS or text in BUY or text in SELL or text in TRAILING or text in PUNCTUATION:
+            k -= 1
+        elif NUMBER_RE.fullmatch(text) or text in NUMBER_WORDS or text in TENS_WORDS:
+            k -= 1
+        else:
+            break
+    if k < end:
+        suffix = tokens[k:end]
+        separated = k > start and tokens[k].text in PUNCTUATION
+        has_side = any(t.text in SIDES for t in suffix)
+        has_words = any(t.text in UNITS or t.text in BUY or t.text in SELL for t in suffix)
+        if has_side and not (separated or has_words):
+            # Only the side words right at the end, and a "for" or "on" before them, belong to the clause.
+            k = end
+            while k > start and (tokens[k - 1].text in SIDES or tokens[k - 1].text in PUNCTUATION):
+                k -= 1
+            while k > start and tokens[k - 1].text in TRAILING:
+                k -= 1
+        if has_side or has_words:
+            j = k
+            while j < end:
+                j = _read(tail, tokens, j, trailing=True) or j + 1
+            end = k
+
+    query = message[tokens[start].start:tokens[end - 1].end] if start < end else ""
+    query = query.strip(" \t\n,;:!?.-–—")
+
+    problem = lead.problem or tail.problem
+    for name in ("action", "volume", "side"):
+        a, b = getattr(lead, name), getattr(tail, name)
+        if a is not None and b is not None and a != b:
+            problem = problem or f"conflicting {name}"
+    action = lead.action or tail.action or "buy"
+    volume = lead.volume if lead.volume is not None else tail.volume
+    side = lead.side or tail.side or "yes"
+
+    if problem is None:
+        if lead.side is not None and not (lead.action or lead.volume is not None or lead.units or lead.connector_after_side):
+            problem = "side word may belong to the question"
+        elif volume is not None and not 0 < volume <= MAX_VOLUME:
+            problem = f"volume {volume} out of range"
+        elif not tokenize(query):
+            problem = "no query"
+        elif "$" in query:
+            problem = "a dollar amount"
+        elif SECOND_ORDER_RE.search(query.lower()):
+            problem = "more than one order"
+        elif LEFTOVER_RE.search(query.lower()) or tokens[end - 1].text in CONNECTORS:
+            problem = "trade words left in the query"
+        elif NUMBER_RE.fullmatch(tokens[start].text) and not YEAR_RE.fullmatch(tokens[start].text) \
+                or tokens[start].text in NUMBER_WORDS or tokens[start].text in TENS_WORDS:
+            problem = "number at the start of the query may be the volume"
+        elif query.lower().split()[0] in NEGATIONS:
+            problem = "negated request"
+    return ParsedTrade(volume or 1, side, action, query, problem is None, problem)
@@ -0,0 +1,492 @@
+"""
+Whisper transcription served by a persistent model process.
+
+The model server owns one or more Whisper replicas and a bounded job queue.
+Web processes talk to it through TranscriptionService over a local socket,
+so no request thread loads or contends on a model. Every worker process of
+a deployment shares one server: the first to find none starts it, holding
+a lock file so that workers starting together do not each load a model.
+
+The socket lives in a per-user directory only its owner can enter, and the
+connection is authenticated with a key that is random per deployment: kept
+in a 0600 file beside the socket unless TRANSCRIPTION_AUTHKEY supplies one.
+A server bound to a TCP address other than loopback requires the
+environment key, since nothing else would stand between it and the network.
+
+Run a server by hand from the repository root:
+    python -m transcription --workers 2 --model turbo
+"""
+import argparse
+import fcntl
+import ipaddress
+import itertools
+import os
+import queue
+import secrets
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, wait
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, Iterator, Optional, Union
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 30  # Whisper's native window
+RUNTIME_DIR = os.path.join(tempfile.gettempdir(), f"talk2trade-{os.getuid()}")
+DEFAULT_ADDRESS = os.path.join(RUNTIME_DIR, "whisper.sock")
+
+
+class QueueFull(Exception):
+    """Raised when the transcription queue has no room for another request."""
+
+
+def decode_audio(data: bytes, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decodes an in-memory audio file to mono float32 PCM by piping it through ffmpeg."""
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-",
+    ]
+    try:
+        out = subprocess.run(cmd, input=data, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='ignore')}") from e
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def parse_address(address: str):
+    """Returns a Listener/Client address: host:port for TCP, otherwise a Unix socket path."""
+    host, _, port = address.rpartition(":")
+    return (host, int(port)) if host and port.isdigit() else address
+
+
+def is_loopback(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+
+def private_dir(path: str) -> str:
+    """Creates `path` with mode 0700 if missing and refuses one that other users can reach."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{path} must be a directory owned by this user with mode 0700")
+    return path
+
+
+def runtime_path(address, suffix: str) -> str:
+    """Path of a file that belongs with the server at `address`: beside its socket, or in RUNTIME_DIR for TCP."""
+    if isinstance(address, str):
+        private_dir(os.path.dirname(os.path.abspath(address)))
+        return address + suffix
+    return os.path.join(private_dir(RUNTIME_DIR), f"whisper-{address[1]}{suffix}")
+
+
+def load_authkey(address: str) -> bytes:
+    """Returns the connection key for the server at `address`.
+
+    TRANSCRIPTION_AUTHKEY wins when set. Otherwise the first process to ask
+    writes a random key to a 0600 file beside the socket and every later one
+    reads it, so the workers and the server of one deployment agree on it.
+
+    Args:
+        address (str): Unix socket path or host:port of the model server.
+
+    Raises:
+        PermissionError: The address is TCP on a non-loopback interface and
+            TRANSCRIPTION_AUTHKEY is not set.
+    """
+    key = os.environ.get("TRANSCRIPTION_AUTHKEY")
+    if key:
+        return key.encode()
+    address = parse_address(address)
+    if not isinstance(address, str) and not is_loopback(address[0]):
+        raise PermissionError(f"TRANSCRIPTION_AUTHKEY must be set to use the non-loopback address {address[0]}")
+    path = runtime_path(address, ".key")
+    if not os.path.exists(path):
+        # Written aside and linked into place, so a reader never sees a partial key
+        staged = f"{path}.{os.getpid()}.{threading.get_ident()}"
+        fd = os.open(staged, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+        try:
+            os.write(fd, secrets.token_hex(32).encode())
+            os.close(fd)
+            os.link(staged, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(staged)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# Server side
+
+class ModelServer:
+    """Runs Whisper replicas on worker threads behind a bounded job queue.
+
+    PyTorch releases the GIL while it computes, so replicas on separate
+    threads of one process transcribe in parallel across cores.
+    """
+    def __init__(self, model_name: str, device: Optional[str], workers: int, max_queue: int):
+        self.model_name = model_name
+        self.device = device
+        self.workers = workers
+        # Sized so a burst of `workers` requests never bounces off idle replicas.
+        self.jobs: "queue.Queue" = queue.Queue(maxsize=workers + max_queue)
+        self.loaded = 0
+        self.busy = 0
+        self.completed = 0
+        self._lock = threading.Lock()
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f"whisper-{i}", daemon=True).start()
+
+    def _work(self) -> None:
+        import whisper
+        model = whisper.load_model(self.model_name, device=self.device)
+        with self._lock:
+            self.loaded += 1
+        while True:
+            reply, request_id, audio = self.jobs.get()
+            with self._lock:
+                self.busy += 1
+            try:
+                if isinstance(audio, bytes):
+                    audio = decode_audio(audio)
+                reply(request_id, True, model.transcribe(audio)["text"])
+            except Exception as e:
+                reply(request_id, False, f"{type(e).__name__}: {e}")
+            finally:
+                with self._lock:
+                    self.busy -= 1
+                    self.completed += 1
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.loaded > 0,
+                "replicas_loaded": self.loaded,
+                "busy": self.busy,
+                "queue_depth": self.jobs.qsize(),
+                "completed": self.completed,
+            }
+
+    def handle(self, conn: Connection) -> None:
+        send_lock = threading.Lock()
+
+        def reply(request_id: int, ok: bool, result: Any) -> None:
+            with send_lock:
+                try:
+                    conn.send((request_id, ok, result))
+                except (OSError, EOFError):
+                    pass
+
+        while True:
+            try:
+                request_id, op, payload = conn.recv()
+            except (OSError, EOFError):
+                return
+            if op == "status":
+                reply(request_id, True, self.status())
+                continue
+            try:
+                self.jobs.put_nowait((reply, request_id, payload))
+            except queue.Full:
+                reply(request_id, False, QueueFull.__name__)
+
+
+def serve(address: str, authkey: bytes, model_name: str, device: Optional[str], workers: int, max_queue: int) -> None:
+    """Loads the models and serves transcription requests until killed."""
+    address = parse_address(address)
+    if isinstance(address, str):
+        private_dir(os.path.dirname(os.path.abspath(address)))
+        if os.path.exists(address):
+            os.unlink(address)
+    server = ModelServer(model_name, device, workers, max_queue)
+    with Listener(address, authkey=authkey) as listener:
+        if isinstance(address, str):
+            os.chmod(address, 0o600)
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=server.handle, args=(conn,), daemon=True).start()
+
+
+# Client side
+
+class TranscriptionService:
+    """Client for the Whisper model server, starting it on first use if needed.
+
+    Admission is bounded on both ends: submit() raises QueueFull when this
+    process already has `max_queue + workers` requests outstanding, and a
+    request the server cannot queue fails with QueueFull too.
+    """
+    def __init__(
+        self,
+        model_name: str = "turbo",
+        device: Optional[str] = None,
+        workers: int = 1,
+        max_queue: int = 8,
+        address: Optional[str] = None,
+        authkey: Optional[bytes] = None,
+        spawn_server: bool = True,
+    ):
+        """Initializes the client; nothing is started until warm() or first use.
+
+        Args:
+            model_name (str): Whisper model the server loads.
+            device (str): Torch device for the model, e.g. "cpu" or "cuda".
+            workers (int): Model replicas in the server.
+            max_queue (int): Requests allowed to wait beyond those being transcribed.
+            address (str): Unix socket path or host:port of the model server;
+                defaults to a socket in this user's private runtime directory.
+            authkey (bytes): Shared secret for the connection; defaults to
+                the deployment's key from load_authkey().
+            spawn_server (bool): Start a server process if none is listening.
+        """
+        self.model_name = model_name
+        self.device = device
+        self.workers = workers
+        self.max_queue = max_queue
+        self.capacity = workers + max_queue
+        self.address = address or DEFAULT_ADDRESS
+        self.authkey = authkey
+        self.spawn_server = spawn_server
+
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._conn: Optional[Connection] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._spawn_lock: Optional[int] = None
+        self._pending: Dict[int, Future] = {}
+        self._ids = itertools.count()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+
+    def _connect(self, timeout: float = 30.0) -> Connection:
+        with self._lock:
+            if self._conn is not None:
+                return self._conn
+            address = parse_address(self.address)
+            if self.authkey is None:
+                self.authkey = load_authkey(self.address)
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    conn = Client(address, authkey=self.authkey)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    if self.spawn_server and self._process is None and self._lock_spawn():
+                        self._process = self.start_server()
+                    if time.monotonic() > deadline:
+                        self._unlock_spawn()
+                        raise
+                    time.sleep(0.05)
+            self._unlock_spawn()
+            self._conn = conn
+            threading.Thread(target=self._read, args=(conn,), name="whisper-client", daemon=True).start()
+            return conn
+
+    def _lock_spawn(self) -> bool:
+        """Takes the cross-process spawn lock; False if another process holds it and is starting a server."""
+        if self._spawn_lock is not None:
+            return True
+        fd = os.open(runtime_path(parse_address(self.address), ".lock"), os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._spawn_lock = fd
+        return True
+
+    def _unlock_spawn(self) -> None:
+        # Held until the server answers, so a later failure can start a new one
+        if self._spawn_lock is not None:
+            os.close(self._spawn_lock)
+            self._spawn_lock = None
+
+    def start_server(self) -> subprocess.Popen:
+        """Starts a model server process for this client's address and returns it."""
+        cmd = [
+            sys.executable, "-m", "transcription",
+            "--address", self.address,
+            "--model", self.model_name,
+            "--workers", str(self.workers),
+            "--max-queue", str(self.max_queue),
+        ]
+        if self.device:
+            cmd += ["--device", self.device]
+        if self.authkey is None:
+            self.authkey = load_authkey(self.address)
+        env = dict(os.environ, TRANSCRIPTION_AUTHKEY=self.authkey.decode())
+        return subprocess.Popen(cmd, cwd=os.path.dirname(os.path.abspath(__file__)), env=env)
+
+    def _read(self, conn: Connection) -> None:
+        while True:
+            try:
+                request_id, ok, result = conn.recv()
+            except (OSError, EOFError):
+                break
+            future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(result)
+            elif result == QueueFull.__name__:
+                future.set_exception(QueueFull("Transcription server queue is full"))
+            else:
+                future.set_exception(RuntimeError(result))
+        # The server went away; fail whatever was outstanding and reconnect on next use.
+        with self._lock:
+            self._conn = None
+            if self._process is not None and self._process.poll() is not None:
+                self._process = None
+        for request_id in list(self._pending):
+            future = self._pending.pop(request_id, None)
+            if future is not None:
+                future.set_exception(ConnectionError("Transcription server disconnected"))
+
+    def _call(self, op: str, payload: Any = None) -> Future:
+        conn = self._connect()
+        request_id = next(self._ids)
+        future: Future = Future()
+        self._pending[request_id] = future
+        with self._send_lock:
+            try:
+                conn.send((request_id, op, payload))
+            except (OSError, EOFError):
+                self._pending.pop(request_id, None)
+                raise
+        return future
+
+    def warm(self) -> None:
+        """Starts or connects to the server so models begin loading now."""
+        self._connect()
+
+    def status(self, timeout: float = 2.0) -> Dict[str, Any]:
+        """Returns the server's readiness and queue depth."""
+        return self._call("status").result(timeout=timeout)
+
+    def _reserve(self, count: int) -> None:
+        """Takes `count` admission slots, all or none, raising QueueFull for none."""
+        taken = 0
+        while taken < count and self._slots.acquire(blocking=False):
+            taken += 1
+        if taken < count:
+            for _ in range(taken):
+                self._slots.release()
+            with self._lock:
+                self.rejected += 1
+            raise QueueFull(f"Transcription queue is full ({self.capacity} requests)")
+
+    def _submit(self, audio: Union[bytes, np.ndarray]) -> Future:
+        self._reserve(1)
+        return self._send(audio)
+
+    def _send(self, audio: Union[bytes, np.ndarray]) -> Future:
+        """Sends a request whose slot is already reserved; the slot is released when it completes."""
+        with self._lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+
+        def release(error: Optional[BaseException]) -> None:
+            with self._lock:
+                self.in_flight -= 1
+                if error is None:
+                    self.completed += 1
+                    self.busy_seconds += time.perf_counter() - start
+                elif isinstance(error, QueueFull):
+                    self.rejected += 1
+            self._slots.release()
+
+        try:
+            future = self._call("transcribe", audio)
+        except Exception as e:
+            release(e)
+            raise
+        future.add_done_callback(lambda done: release(done.exception()))
+        return future
+
+    def submit(self, data: bytes) -> Future:
+        """Queues an encoded audio buffer and returns a Future of its transcript."""
+        return self._submit(data)
+
+    def transcribe(self, data: bytes, timeout: Optional[float] = None) -> str:
+        """Transcribes an encoded audio buffer, blocking until done."""
+        return self.submit(data).result(timeout=timeout)
+
+    def stream(self, data: bytes, chunk_seconds: int = CHUNK_SECONDS) -> Iterator[str]:
+        """Yields the transcript chunk by chunk, in order, as each chunk finishes.
+
+        All chunks are queued at once so several replicas can work on one
+        recording. Their slots are reserved together, so a full queue raises
+        QueueFull before any chunk is sent; if sending a later chunk fails,
+        the chunks already sent are waited for before the error is raised,
+        leaving nothing in flight for a request that has failed.
+        """
+        audio = decode_audio(data)
+        step = chunk_seconds * SAMPLE_RATE
+        chunks = [audio[offset:offset + step] for offset in range(0, max(len(audio), 1), step)]
+        self._reserve(len(chunks))
+        futures = []
+        try:
+            for chunk in chunks:
+                futures.append(self._send(chunk))
+        except Exception:
+            # _send released the failed chunk's slot; the unsent ones are still held
+            for _ in range(len(chunks) - len(futures) - 1):
+                self._slots.release()
+            wait(futures)
+            raise
+        for future in futures:
+            yield future.result().strip()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns this process's queue counters merged with the server's status."""
+        with self._lock:
+            stats = {
+                "model": self.model_name,
+                "in_flight": self.in_flight,
+                "capacity": self.capacity,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "mean_seconds": self.busy_seconds / self.completed if self.completed else 0.0,
+            }
+        try:
+            stats["server"] = self.status()
+        except Exception as e:
+            stats["server"] = {"ready": False, "error": str(e)}
+        return stats
+
+    def shutdown(self) -> None:
+        """Disconnects, and stops the server if this client started it."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            if self._process is not None:
+                self._process.terminate()
+                self._process = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help="Unix socket path or host:port; a non-loopback host needs TRANSCRIPTION_AUTHKEY")
+    parser.add_argument("--model", default=os.environ.get("WHISPER_MODEL", "turbo"))
+    parser.add_argument("--device", default=os.environ.get("WHISPER_DEVICE") or None)
+    parser.add_argument("--workers", type=int, default=1, help="model replicas")
+    parser.add_argument("--max-queue", type=int, default=8)
+    args = parser.parse_args()
+    serve(args.address, load_authkey(args.address), args.model, args.device, args.workers, args.max_queue)
+
+
+if __name__ == "__main__":
+    main()